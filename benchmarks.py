@@ -0,0 +1,383 @@
+"""Benchmarks del simulador - motor, agenda, llegadas, movimiento y dibujo, con comparación contra una base
+
+Uso:
+    python benchmarks.py                      corre todo y guarda benchmarks/AAAAMMDD-HHMMSS.json
+    python benchmarks.py --rapido             menos repeticiones y curvas más cortas
+    python benchmarks.py --guardar-base       además lo deja como benchmarks/base.json
+    python benchmarks.py --base OTRO.json     compara contra otra corrida
+    python benchmarks.py --importacion        solo el presupuesto de importación del núcleo
+
+Cada medición es el mejor de varias repeticiones (como timeit): lo que se
+compara entre corridas es el costo del código, no el ruido de la máquina.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # el dibujo se mide sin ventana
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import config
+from muestreo import muestrear_dias, estadisticas_dias, estadisticas_dia
+from simulacion import SimuladorResonador, generar_agenda_flexible, pacientes_desde_muestra
+
+DIRECTORIO = 'benchmarks'
+ARCHIVO_BASE = os.path.join(DIRECTORIO, 'base.json')
+TOLERANCIA = 0.10  # peor que la base en más de un 10% = regresión
+
+# Núcleo de simulación: importarlo solo puede cargar la biblioteca estándar y NumPy
+NUCLEO = ('config', 'paciente', 'recursos', 'llegadas', 'rutas', 'muestreo', 'registro', 'estadisticas', 'perfilador',
+          'simulacion', 'motor_eventos', 'motor_recursivo', 'montecarlo', 'traza', 'cache_resultados', 'optimizador')
+EXTERNOS_PERMITIDOS = {'numpy'}
+PRESUPUESTO_IMPORTACION_MS = 150  # todo NUCLEO en un proceso nuevo, NumPy incluido
+
+LARGOS_AGENDA = (10, 25, 50, 100, 250, 500, 1000)
+PACIENTES_EN_PANTALLA = (1, 10, 50, 100, 250, 500)
+
+
+def medir(funcion, repeticiones=5, minimo_s=0.2):
+    """Segundos por llamada de `funcion`: el mejor de `repeticiones` tandas
+    de al menos `minimo_s` segundos cada una"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        llamadas = 0
+        inicio = time.perf_counter()
+        while True:
+            funcion()
+            llamadas += 1
+            transcurrido = time.perf_counter() - inicio
+            if transcurrido >= minimo_s:
+                break
+        mejor = min(mejor, transcurrido / llamadas)
+    return mejor
+
+
+def _escalar(valor, unidad, mayor_es_mejor):
+    return {'valor': valor, 'unidad': unidad, 'mayor_es_mejor': mayor_es_mejor}
+
+
+def _curva(puntos, unidad, variable):
+    return {'curva': [[x, y] for x, y in puntos], 'unidad': unidad, 'variable': variable,
+            'mayor_es_mejor': False}
+
+
+# ----------------------------------------------------------------------------
+# Cargas de trabajo
+# ----------------------------------------------------------------------------
+
+_SCRIPT_IMPORTACION = """
+import json, sys, time
+antes = set(sys.modules)
+inicio = time.perf_counter()
+import {modulos}
+ms = (time.perf_counter() - inicio) * 1e3
+nuevos = {{m.split('.')[0] for m in set(sys.modules) - antes}}
+print(json.dumps([ms, sorted(nuevos - set(sys.stdlib_module_names))]))
+"""
+
+
+def _importar(modulos, repeticiones):
+    """(ms, módulos de fuera de la biblioteca estándar) de importar `modulos`
+    en un proceso nuevo; el mejor de `repeticiones` procesos"""
+    script = _SCRIPT_IMPORTACION.format(modulos=', '.join(modulos))
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    mejor, externos = float('inf'), []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', script], cwd=directorio, check=True,
+                                capture_output=True, text=True).stdout
+        ms, externos = json.loads(salida.splitlines()[-1])
+        mejor = min(mejor, ms)
+    return mejor, externos
+
+
+def bench_importacion(repeticiones):
+    """Tiempo de importar el núcleo (y NumPy solo, como referencia) en frío"""
+    nucleo_ms, externos = _importar(NUCLEO, repeticiones)
+    numpy_ms, _ = _importar(('numpy',), repeticiones)
+    return {
+        'importacion.nucleo_ms': _escalar(nucleo_ms, 'ms', False),
+        'importacion.numpy_ms': _escalar(numpy_ms, 'ms', False),
+        'importacion.externos': {'modulos': sorted(set(externos) - set(NUCLEO))},
+    }
+
+
+def verificar_importacion(resultados, presupuesto=PRESUPUESTO_IMPORTACION_MS):
+    """Problemas del presupuesto de importación (lista vacía si se cumple)"""
+    problemas = []
+    ms = resultados['importacion.nucleo_ms']['valor']
+    if ms > presupuesto:
+        problemas.append(f"importar el núcleo tarda {ms:.1f} ms (presupuesto {presupuesto} ms)")
+    prohibidos = set(resultados['importacion.externos']['modulos']) - EXTERNOS_PERMITIDOS
+    if prohibidos:
+        problemas.append(f"el núcleo carga {', '.join(sorted(prohibidos))}")
+    return problemas
+
+
+def bench_motor(repeticiones):
+    """SimuladorResonador.actualizar: ticks por segundo y días completos por segundo"""
+    def dia():
+        sim = SimuladorResonador(0, mostrar_agenda=False)
+        ticks = 0
+        while not sim.finalizada:
+            sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+            ticks += 1
+        return ticks
+
+    ticks = dia()  # siempre el mismo día: la cantidad de ticks no cambia
+    segundos_dia = medir(dia, repeticiones, minimo_s=0.5)
+    return {
+        'motor.ticks_por_segundo': _escalar(ticks / segundos_dia, 'ticks/s', True),
+        'motor.dias_por_segundo': _escalar(1 / segundos_dia, 'dias/s', True),
+    }
+
+
+def bench_motores_dia(repeticiones):
+    """Días por segundo del motor de eventos, de la recursión en tándem y
+    del muestreo vectorizado"""
+    from motor_eventos import SimuladorEventos
+    from motor_recursivo import simular_tandem, estadisticas_tandem
+    rng = np.random.default_rng(0)
+
+    def eventos():
+        SimuladorEventos(rng=rng).ejecutar()
+
+    def recursivo():
+        muestras = muestrear_dias(1000, rng)
+        estadisticas_tandem(muestras, simular_tandem(muestras))
+
+    return {
+        'eventos.dias_por_segundo': _escalar(1 / medir(eventos, repeticiones), 'dias/s', True),
+        'recursivo.dias_por_segundo': _escalar(1000 / medir(recursivo, repeticiones), 'dias/s', True),
+        'vectorizado.dias_por_segundo': _escalar(
+            1000 / medir(lambda: estadisticas_dias(muestrear_dias(1000, rng)), repeticiones), 'dias/s', True),
+    }
+
+
+def bench_agenda(repeticiones, largos):
+    """Costo de armar la agenda (lo que hace _generar_agenda_flexible y
+    simular_dia_completo_rapido) y del resumen vectorizado según la
+    cantidad de pacientes del día"""
+    rng = np.random.default_rng(0)
+
+    def agenda(n):
+        m = muestrear_dias(1, rng, pacientes_por_dia=n)
+        return pacientes_desde_muestra(m, 0, range(n), m['turno'][0], estado='COMPLETADO')
+
+    def resumen(n):
+        return estadisticas_dia(estadisticas_dias(muestrear_dias(1, rng, pacientes_por_dia=n)))
+
+    sim = SimuladorResonador(0, mostrar_agenda=False)
+    return {
+        'agenda.ms': _curva([(n, 1e3 * medir(lambda: agenda(n), repeticiones)) for n in largos],
+                            'ms', 'pacientes'),
+        'resumen_rapido.ms': _curva([(n, 1e3 * medir(lambda: resumen(n), repeticiones)) for n in largos],
+                                    'ms', 'pacientes'),
+        'simular_dia_completo_rapido.ms': _escalar(
+            1e3 * medir(sim.simular_dia_completo_rapido, repeticiones), 'ms', False),
+    }
+
+
+def bench_llegadas(repeticiones, largos):
+    """llegadas.CalendarioLlegadas con 10..1000 pacientes por llegar: lo que
+    cuesta en cada paso ver al próximo y lo que cuesta que llegue uno y se
+    sume un sobreturno"""
+    from llegadas import CalendarioLlegadas
+    rng = np.random.default_rng(0)
+    n_max = max(largos)
+    m = muestrear_dias(1, rng, pacientes_por_dia=n_max)
+    pacientes = pacientes_desde_muestra(m, 0, range(n_max), m['turno'][0])
+    proximo, llegada = [], []
+    for n in largos:
+        calendario = CalendarioLlegadas(pacientes[:n])
+
+        def llega_y_entra_otro():
+            calendario.agregar(calendario.sacar())
+
+        proximo.append((n, 1e6 * medir(calendario.proximo, repeticiones)))
+        llegada.append((n, 1e6 * medir(llega_y_entra_otro, repeticiones)))
+    return {'llegadas.us_por_proximo': _curva(proximo, 'us', 'pacientes por llegar'),
+            'llegadas.us_por_llegada': _curva(llegada, 'us', 'pacientes por llegar')}
+
+
+def bench_dibujo(repeticiones, cantidades):
+    """Visualizador._dibujar con 1..500 pacientes en pantalla (driver SDL dummy)"""
+    from visualizacion import Visualizador
+    rng = np.random.default_rng(0)
+    sim = SimuladorResonador(0, mostrar_agenda=False)
+    vis = Visualizador(sim)
+    n_max = max(cantidades)
+    m = muestrear_dias(1, rng, pacientes_por_dia=n_max)
+    pacientes = pacientes_desde_muestra(m, 0, range(n_max), m['turno'][0])
+    # Los pacientes de salida se dibujan tal cual están: se reparten por el plano
+    ancho, alto = config.VENTANA_ANCHO, config.VENTANA_ALTO - 60
+    posiciones = rng.uniform((20, 60), (ancho - 20, alto), (n_max, 2))
+    for p, (x, y) in zip(pacientes, posiciones):
+        p.estado = 'SALIENDO'
+        p.posicion = [float(x), float(y)]
+
+    curva = []
+    for n in cantidades:
+        sim.pacientes_saliendo = pacientes[:n]
+        vis.redibujar_todo = True
+        vis._dibujar()
+        paso = [0]
+
+        def cuadro():
+            # Todos se mueven un poco por cuadro, como durante la simulación
+            paso[0] += 1
+            d = 1.0 if paso[0] % 2 else -1.0
+            for p in sim.pacientes_saliendo:
+                p.posicion[0] += d
+            vis._dibujar()
+
+        curva.append((n, 1e3 * medir(cuadro, repeticiones)))
+    sim.pacientes_saliendo = []
+    return {'dibujo.ms_por_cuadro': _curva(curva, 'ms', 'pacientes en pantalla')}
+
+
+def bench_movimiento(repeticiones, cantidades):
+    """rutas.Movimientos con 1..500 pacientes caminando: avanzar (cada
+    sub-paso) y ubicar (cada cuadro dibujado)"""
+    from rutas import Movimientos
+    pacientes = generar_agenda_flexible(None, rng=0)
+    n_max = max(cantidades)
+    pacientes = (pacientes * (n_max // len(pacientes) + 1))[:n_max]
+    rutas = list(config.RUTAS)
+    avanzar, ubicar = [], []
+    for n in cantidades:
+        movimientos = Movimientos()
+        for i, p in enumerate(pacientes[:n]):
+            p.moviendo = False
+            movimientos.iniciar(p, rutas[i % len(rutas)])
+        # Nadie llega: se mide el costo de seguir caminando
+        avanzar.append((n, 1e6 * medir(lambda: movimientos.avanzar(0.0), repeticiones)))
+        ubicar.append((n, 1e6 * medir(movimientos.ubicar, repeticiones)))
+    return {'movimiento.us_por_paso': _curva(avanzar, 'us', 'pacientes caminando'),
+            'movimiento.us_por_ubicar': _curva(ubicar, 'us', 'pacientes caminando')}
+
+
+# ----------------------------------------------------------------------------
+# Resultados
+# ----------------------------------------------------------------------------
+
+def ejecutar(rapido=False):
+    repeticiones = 2 if rapido else 5
+    largos = LARGOS_AGENDA[:4] if rapido else LARGOS_AGENDA
+    cantidades = PACIENTES_EN_PANTALLA[:4] if rapido else PACIENTES_EN_PANTALLA
+    resultados = {}
+    for nombre, carga in (('importacion', lambda: bench_importacion(repeticiones)),
+                          ('motor', lambda: bench_motor(repeticiones)),
+                          ('motores_dia', lambda: bench_motores_dia(repeticiones)),
+                          ('agenda', lambda: bench_agenda(repeticiones, largos)),
+                          ('llegadas', lambda: bench_llegadas(repeticiones, largos)),
+                          ('movimiento', lambda: bench_movimiento(repeticiones, cantidades)),
+                          ('dibujo', lambda: bench_dibujo(repeticiones, cantidades))):
+        inicio = time.perf_counter()
+        resultados.update(carga())
+        print(f"  {nombre:12s} {time.perf_counter() - inicio:6.1f} s")
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'maquina': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'plataforma': platform.platform(), 'procesador': platform.processor()},
+        'rapido': rapido,
+        'resultados': resultados,
+    }
+
+
+def _cambio(actual, base, mayor_es_mejor):
+    """Cambio relativo con signo: positivo = mejor que la base"""
+    if not base:
+        return 0.0
+    relativo = (actual - base) / base
+    return relativo if mayor_es_mejor else -relativo
+
+
+def comparar(corrida, base, tolerancia=TOLERANCIA):
+    """Líneas de texto con el cambio de cada métrica y la lista de regresiones"""
+    lineas, regresiones = [], []
+    for nombre, actual in corrida['resultados'].items():
+        anterior = base['resultados'].get(nombre)
+        if 'valor' not in actual and 'curva' not in actual:
+            continue
+        if anterior is None:
+            lineas.append(f"  {nombre:34s} (nuevo)")
+            continue
+        if 'valor' in actual:
+            puntos = [(None, actual['valor'], anterior['valor'])]
+        else:
+            previos = dict((x, y) for x, y in anterior['curva'])
+            puntos = [(x, y, previos[x]) for x, y in actual['curva'] if x in previos]
+        for x, valor, valor_base in puntos:
+            cambio = _cambio(valor, valor_base, actual['mayor_es_mejor'])
+            etiqueta = nombre if x is None else f"{nombre}[{x}]"
+            marca = ''
+            if cambio < -tolerancia:
+                marca = '  << REGRESIÓN'
+                regresiones.append(etiqueta)
+            lineas.append(f"  {etiqueta:34s} {valor:12.3f} {actual['unidad']:8s} "
+                          f"base {valor_base:12.3f}  {cambio:+6.1%}{marca}")
+    return lineas, regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del simulador")
+    parser.add_argument('--salida', help="archivo JSON de resultados (por defecto benchmarks/<fecha>.json)")
+    parser.add_argument('--base', default=ARCHIVO_BASE, help="corrida contra la que comparar")
+    parser.add_argument('--guardar-base', action='store_true', help="guarda esta corrida como base")
+    parser.add_argument('--rapido', action='store_true', help="menos repeticiones y curvas más cortas")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help="empeoramiento admitido (0.10 = 10%%)")
+    parser.add_argument('--importacion', action='store_true',
+                        help="solo verifica el presupuesto de importación del núcleo")
+    args = parser.parse_args()
+
+    if args.importacion:
+        resultados = bench_importacion(5)
+        print(f"Núcleo: {resultados['importacion.nucleo_ms']['valor']:.1f} ms "
+              f"(NumPy solo: {resultados['importacion.numpy_ms']['valor']:.1f} ms, "
+              f"presupuesto {PRESUPUESTO_IMPORTACION_MS} ms)")
+        problemas = verificar_importacion(resultados)
+        print('\n'.join(f"✗ {p}" for p in problemas) or "✓ Dentro del presupuesto")
+        return 1 if problemas else 0
+
+    print("Ejecutando benchmarks...")
+    corrida = ejecutar(args.rapido)
+
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    salida = args.salida or os.path.join(DIRECTORIO, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(corrida, f, indent=2, ensure_ascii=False)
+    print(f"✓ Resultados en {salida}")
+
+    regresiones = []
+    if os.path.exists(args.base) and not args.guardar_base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        print(f"\nComparación con {args.base} ({base['fecha']}):")
+        lineas, regresiones = comparar(corrida, base, args.tolerancia)
+        print('\n'.join(lineas))
+        print(f"\n{len(regresiones)} regresiones" if regresiones else "\nSin regresiones")
+    else:
+        for nombre, r in corrida['resultados'].items():
+            if 'valor' in r:
+                print(f"  {nombre:34s} {r['valor']:12.3f} {r['unidad']}")
+            elif 'curva' in r:
+                print(f"  {nombre:34s} " + '  '.join(f"{x}:{y:.3f}" for x, y in r['curva']) + f" {r['unidad']}")
+
+    problemas = verificar_importacion(corrida['resultados'])
+    for p in problemas:
+        print(f"✗ Presupuesto de importación: {p}")
+    regresiones += problemas
+
+    if args.guardar_base:
+        with open(ARCHIVO_BASE, 'w', encoding='utf-8') as f:
+            json.dump(corrida, f, indent=2, ensure_ascii=False)
+        print(f"✓ Base guardada en {ARCHIVO_BASE}")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""Caché en disco de resultados Monte Carlo, indexada por el contenido del escenario"""
+import hashlib
+import json
+import os
+import pickle
+import config
+
+# Cambia si cambia lo que se guarda o cómo se simula: invalida la caché vieja
+VERSION_CACHE = 5
+
+# Parámetros de config.py que cambian el resultado de una réplica
+_PREFIJOS_ESCENARIO = ('TIEMPO_', 'PROB_LLEGADA_', 'CAPACIDAD_')
+_NOMBRES_ESCENARIO = ('TIPOS_ESTUDIO', 'HORA_INICIO', 'HORA_FIN', 'INTERVALO_TURNOS',
+                      'LIMITE_TURNOS', 'DISCIPLINA_COLAS', 'VELOCIDAD_PACIENTE',
+                      'PASO_SIMULACION', 'PASO_VISUAL', 'TICKS_POR_MINUTO', 'RUTAS', 'WAYPOINTS')
+
+
+def parametros_escenario():
+    """Valores de config.py que definen el escenario (los que afectan la simulación)"""
+    return {nombre: getattr(config, nombre) for nombre in sorted(dir(config))
+            if nombre in _NOMBRES_ESCENARIO or nombre.startswith(_PREFIJOS_ESCENARIO)}
+
+
+def clave_escenario(motor, raiz, tam_bloque, metodo='simple'):
+    """Hash SHA-256 del escenario, el motor, la semilla raíz, el tamaño de
+    bloque y el método de muestreo.
+
+    La cantidad de réplicas no entra en la clave: se guarda cada bloque por
+    separado y una corrida más larga reusa los bloques que ya estén.
+    """
+    return _hash({
+        'version': VERSION_CACHE,
+        'escenario': parametros_escenario(),
+        'motor': motor,
+        'semilla': [raiz.entropy, list(raiz.spawn_key)],
+        'tam_bloque': tam_bloque,
+        'metodo': metodo,
+    })
+
+
+def hash_parametros():
+    """Hash SHA-256 de parametros_escenario(): cambia si cambia el escenario"""
+    return _hash(parametros_escenario())
+
+
+def _hash(contenido):
+    # JSON canónico: claves ordenadas, tuplas como listas, floats con repr
+    texto = json.dumps(contenido, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheResultados:
+    """Un archivo por bloque de réplicas en `directorio`.
+
+    El orden LRU es la fecha de modificación: leer un bloque la actualiza y,
+    al guardar, si el total supera `max_bytes` se borran los más viejos.
+    """
+
+    def __init__(self, directorio=None, max_bytes=None):
+        self.directorio = directorio or config.CACHE_DIRECTORIO
+        self.max_bytes = max_bytes if max_bytes is not None else config.CACHE_MAX_BYTES
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, clave, indice, n):
+        return os.path.join(self.directorio, f"{clave[:32]}-{indice:06d}-{n}.pkl")
+
+    def leer(self, clave, indice, n):
+        """(estadísticas por día, acumulador) del bloque, o None si no está"""
+        ruta = self._ruta(clave, indice, n)
+        try:
+            with open(ruta, 'rb') as f:
+                guardado = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if guardado.get('clave') != clave:
+            return None
+        os.utime(ruta)  # usado recién: último en desalojarse
+        return guardado['parcial'], guardado['acumulador']
+
+    def guardar(self, clave, indice, n, parcial, acumulador):
+        ruta = self._ruta(clave, indice, n)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'wb') as f:
+            pickle.dump({'clave': clave, 'parcial': parcial, 'acumulador': acumulador}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)  # otro proceso nunca ve un archivo a medio escribir
+        self.desalojar()
+
+    def desalojar(self):
+        """Borra los bloques usados hace más tiempo hasta quedar bajo max_bytes"""
+        archivos = []
+        total = 0
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith('.pkl'):
+                try:
+                    info = entrada.stat()
+                except OSError:  # lo borró otro proceso
+                    continue
+                archivos.append((info.st_mtime, info.st_size, entrada.path))
+                total += info.st_size
+        archivos.sort()
+        for _, tamano, ruta in archivos:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            total -= tamano
+        return total
+
+    def tamano(self):
+        return sum(e.stat().st_size for e in os.scandir(self.directorio) if e.name.endswith('.pkl'))
+
+    def limpiar(self):
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith('.pkl'):
+                os.remove(entrada.path)
@@ -6,6 +6,8 @@
 HORA_INICIO = 8
 HORA_FIN = 20
 INTERVALO_TURNOS = 30
+# Último minuto (desde HORA_INICIO) en que todavía se puede dar un turno: 690
+LIMITE_TURNOS = (HORA_FIN - HORA_INICIO) * 60 - INTERVALO_TURNOS
 
 # ============================================================================
 # TIPOS DE ESTUDIOS Y PROBABILIDADES
@@ -45,11 +47,74 @@ TIEMPO_VALIDACION = (3, 7)
 TIEMPO_BOX = (8, 12)  # ~10 min promedio = 2 seg visuales con velocidad 5x
 TIEMPO_SALIDA = (3, 5)
 
+# Traslados fijos que suma la agenda (minutos simulados)
+TIEMPO_CAMINO_VESTUARIO = 2.0
+TIEMPO_CAMINO_SALIDA = 2.0
+
 # Probabilidades de llegada
 PROB_LLEGADA_TEMPRANO = 0.20
 PROB_LLEGADA_PUNTUAL = 0.30
 PROB_LLEGADA_TARDE = 0.50
 
+# ============================================================================
+# RECURSOS (puestos en paralelo de cada etapa)
+# ============================================================================
+CAPACIDAD_SALA_ESPERA = 1   # pacientes que pueden esperar a la vez
+CAPACIDAD_MESAS = 1
+CAPACIDAD_BOXES = 1
+CAPACIDAD_RESONADORES = 1   # la agenda reparte los turnos entre resonadores
+DISCIPLINA_COLAS = 'FIFO'   # 'FIFO' o 'TURNO' (primero el de turno más temprano)
+
+# ============================================================================
+# OPTIMIZADOR DE AGENDA (optimizador.py)
+# ============================================================================
+COSTO_MINUTO_HORA_EXTRA = 2.0  # por cada minuto que el último paciente termina después de HORA_FIN
+COSTO_MINUTO_OCIO = 1.0        # por cada minuto de resonador libre dentro de la jornada
+
+# ============================================================================
+# CACHÉ DE RESULTADOS (cache_resultados.py)
+# ============================================================================
+CACHE_DIRECTORIO = '.cache_resultados'
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # al superarlo se borran los bloques usados hace más tiempo
+
+# ============================================================================
+# EXPORTACIÓN DE PACIENTES (exportacion.py)
+# ============================================================================
+EXPORTACION_FILAS_POR_PARTE = 1 << 18  # ~17 MB de buffer; cada parte es un .npy por columna
+
+# ============================================================================
+# INFORMES EN PDF (resumen.py)
+# ============================================================================
+INFORME_DIAS = 5000                # días simulados por escenario
+INFORME_SEMILLA = 1                # fija: repetir un informe no vuelve a simular
+INFORME_DIRECTORIO = 'informes'    # PDF de cada escenario con --escenarios
+INFORME_CACHE = '.cache_resultados/informes'  # agregado de cada informe, por hash del escenario
+
+# ============================================================================
+# HORIZONTE DE VARIAS SEMANAS (horizonte.py)
+# ============================================================================
+# Horario de cada día de la semana (0 = lunes): (hora de apertura, hora de
+# cierre). Los días que no figuran no se atiende.
+HORARIO_SEMANAL = {
+    0: (HORA_INICIO, HORA_FIN),
+    1: (HORA_INICIO, HORA_FIN),
+    2: (HORA_INICIO, HORA_FIN),
+    3: (HORA_INICIO, HORA_FIN),
+    4: (HORA_INICIO, HORA_FIN),
+    5: (8, 13),
+}
+FERIADOS = ()  # fechas 'AAAA-MM-DD' sin atención
+# Minutos después del cierre en que todavía puede empezar un estudio: los que
+# no llegaron al resonador pasan primeros a la agenda del siguiente día hábil
+# (None = sin corte)
+MAXIMO_HORAS_EXTRAS = 30
+
+# ============================================================================
+# PERFILADO (perfilador.py)
+# ============================================================================
+PERFIL_ACTIVO = False   # medir desde el arranque (F3 lo prende y apaga en la ventana)
+PERFIL_VENTANA = 600    # muestras recientes por fase para los percentiles
+
 # ============================================================================
 # INTERFAZ GRÁFICA
 # ============================================================================
@@ -113,6 +178,25 @@ WAYPOINTS = {
     'salida_final': (150, 950)
 }
 
+# Recorridos de cada transición (nombres de WAYPOINTS)
+RUTAS = {
+    'llegada': ['esperando', 'entrada', 'sala_espera'],
+    'validacion': ['sala_espera', 'mesa'],
+    'box': ['salida_sala', 'pasillo_v', 'pasillo_v_arriba', 'pasillo_h',
+            'pasillo_h_derecha', 'entrada_vestuario', 'vestuario', 'box'],
+    'resonador': ['vuelta_vestuario', 'entrada_resonancia', 'resonancia', 'resonador'],
+    'salida': ['salida_resonancia', 'salida_vestuario', 'salida_pasillo_h',
+               'salida_pasillo_v', 'retorno_sala', 'salida_final']
+}
+
+# Separación entre puestos paralelos de la etapa a la que lleva cada ruta (px)
+PASO_PUESTOS = {
+    'llegada': (40, 0),
+    'validacion': (40, 0),
+    'box': (-40, 0),
+    'resonador': (45, 0)
+}
+
 ESTADOS_PACIENTE = {
     'PROGRAMADO': 'Programado',
     'LLEGADA': 'Llegando',
@@ -126,8 +210,27 @@ ESTADOS_PACIENTE = {
 
 # Velocidad
 VELOCIDAD_PACIENTE = 120
-VELOCIDAD_SIMULACION_DEFAULT = 5
+VELOCIDAD_SIMULACION_DEFAULT = 5  # minutos simulados por segundo real (= 300x)
 FPS = 60
+
+# Reloj de simulación desacoplado de los cuadros: el modelo siempre avanza en
+# sub-pasos fijos de PASO_SIMULACION minutos, como a velocidad normal a FPS
+# cuadros por segundo, así el recorrido no depende de la velocidad elegida
+PASO_SIMULACION = VELOCIDAD_SIMULACION_DEFAULT / FPS
+PASO_VISUAL = 1.0 / FPS  # segundos "visuales" (a velocidad normal) por sub-paso
+# El reloj cuenta ticks enteros (no suma minutos en coma flotante): con
+# 60 * FPS ticks por minuto cada sub-paso es un número entero de ticks
+TICKS_POR_MINUTO = 60 * FPS
+VELOCIDAD_MIN_X = 1      # 1x = tiempo real
+VELOCIDAD_MAX_X = 960    # 960x = 16 minutos simulados por segundo
+FACTOR_AJUSTE_VELOCIDAD = 1.25  # cada pulsación de +/- multiplica o divide por esto
+MAX_SUBPASOS_POR_CUADRO = 120   # acota el tiempo de cuadro si la máquina no da abasto
+
+# Línea de tiempo: una foto del estado cada INTERVALO_KEYFRAMES minutos simulados;
+# saltar a un minuto = restaurar la foto anterior y avanzar solo el resto
+INTERVALO_KEYFRAMES = 15
+SALTO_LINEA_TIEMPO = 15  # minutos por pulsación de ←/→
+LINEA_TIEMPO_MAX_MIN = (HORA_FIN - HORA_INICIO + 1) * 60  # mínimo; se alarga si el día termina después
 MOSTRAR_RESUMEN_FINAL = True
 
 # Tiempos visuales mínimos (en segundos reales, no minutos simulados)
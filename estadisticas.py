@@ -0,0 +1,258 @@
+"""Estadísticas en línea y combinables (Welford, t-digest, histograma de horas extras)"""
+import math
+from bisect import bisect_left
+import numpy as np
+import config
+from muestreo import TIPOS, min_a_hora
+
+JORNADA_MIN = (config.HORA_FIN - config.HORA_INICIO) * 60
+
+# Clases del histograma de horas extras (minutos después de HORA_FIN):
+# 0 = sin extras, 1 = (0, 15], 2 = (15, 30], 3 = (30, 60], 4 = (60, 120], 5 = más de 120
+BORDES_HORAS_EXTRAS = (0, 15, 30, 60, 120)
+
+
+class Welford:
+    """Media y varianza en una pasada; combinable (fórmula de Chan)"""
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def agregar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+
+    def agregar_lote(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        if valores.size:
+            otro = Welford()
+            otro.n = valores.size
+            otro.media = float(valores.mean())
+            otro.m2 = float(((valores - otro.media) ** 2).sum())
+            self.combinar(otro)
+
+    def combinar(self, otro):
+        if not otro.n:
+            return
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.n = n
+
+    def varianza(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def desvio(self):
+        return math.sqrt(self.varianza())
+
+
+class TDigest:
+    """Cuantiles aproximados con memoria acotada (t-digest con fusión).
+
+    Los valores nuevos se acumulan en un buffer y se funden con los
+    centroides cuando el buffer se llena. Dos digests se combinan fundiendo
+    sus centroides, así que sirve para juntar réplicas y procesos.
+    """
+
+    def __init__(self, compresion=200):
+        self.compresion = compresion
+        self.n = 0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._medias = np.empty(0)
+        self._pesos = np.empty(0)
+        self._buffer = []
+        self._buffer_pesos = []
+
+    def agregar(self, x, peso=1):
+        self._buffer.append(x)
+        self._buffer_pesos.append(peso)
+        self.n += peso
+        if x < self.minimo:
+            self.minimo = x
+        if x > self.maximo:
+            self.maximo = x
+        if len(self._buffer) >= 5 * self.compresion:
+            self._comprimir()
+
+    def agregar_lote(self, valores):
+        valores = np.asarray(valores, dtype=float).ravel()
+        if not valores.size:
+            return
+        self._fundir(valores, np.ones_like(valores))
+        self.n += valores.size
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+
+    def combinar(self, otro):
+        otro._comprimir()
+        if not otro.n:
+            return
+        self._fundir(otro._medias, otro._pesos)
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def _comprimir(self):
+        if self._buffer:
+            medias, pesos = np.array(self._buffer, dtype=float), np.array(self._buffer_pesos, dtype=float)
+            self._buffer, self._buffer_pesos = [], []
+            self._fundir(medias, pesos)
+
+    def _fundir(self, medias, pesos):
+        """Funde puntos nuevos con los centroides: agrupa por unidad de la
+        escala k1, que deja centroides chicos en las colas"""
+        self._comprimir()
+        medias = np.concatenate((self._medias, medias))
+        pesos = np.concatenate((self._pesos, pesos))
+        orden = np.argsort(medias, kind='stable')
+        medias, pesos = medias[orden], pesos[orden]
+
+        acumulado = np.cumsum(pesos)
+        q = np.clip((acumulado - pesos / 2) / acumulado[-1], 0.0, 1.0)
+        k = self.compresion / (2 * math.pi) * np.arcsin(2 * q - 1)
+        grupo = np.floor(k - k[0]).astype(np.int64)
+        inicios = np.concatenate(([0], np.flatnonzero(np.diff(grupo)) + 1))
+
+        self._pesos = np.add.reduceat(pesos, inicios)
+        self._medias = np.add.reduceat(medias * pesos, inicios) / self._pesos
+
+    def cuantil(self, q):
+        self._comprimir()
+        if not self.n:
+            return math.nan
+        # Interpola entre los centros acumulados de cada centroide
+        centros = np.cumsum(self._pesos) - self._pesos / 2
+        x = np.concatenate(([0.0], centros, [self.n]))
+        y = np.concatenate(([self.minimo], self._medias, [self.maximo]))
+        return float(np.interp(q * self.n, x, y))
+
+
+def clase_horas_extras(hora_fin_min):
+    """Índice en el histograma de horas extras para un minuto de finalización"""
+    return bisect_left(BORDES_HORAS_EXTRAS, max(0.0, hora_fin_min - JORNADA_MIN))
+
+
+class EstadisticasDia:
+    """Lo que calcula obtener_estadisticas_dia, actualizado en cada paciente
+    completado. Leerlo cuesta O(1) y no necesita la lista de pacientes."""
+
+    def __init__(self):
+        self.circuito = Welford()
+        self.digest_circuito = TDigest()
+        self.estudios = {}
+        self.ultimo_turno_min = 0
+        self.hora_finalizacion_min = 0
+
+    def registrar(self, p):
+        circuito = p.calcular_tiempo_circuito()
+        self.registrar_valores(p.tipo_estudio, circuito, p.turno_asignado,
+                               p.hora_llegada_real + circuito)
+
+    def registrar_valores(self, tipo, circuito, turno, hora_fin):
+        self.circuito.agregar(circuito)
+        self.digest_circuito.agregar(circuito)
+        self.estudios[tipo] = self.estudios.get(tipo, 0) + 1
+        self.ultimo_turno_min = turno
+        self.hora_finalizacion_min = hora_fin
+
+    def como_dict(self):
+        """Mismo formato que calcular_estadisticas_dia"""
+        if not self.circuito.n:
+            return {
+                'estudios_por_tipo': {},
+                'tiempo_promedio_total': 0,
+                'total_pacientes': 0,
+                'ultimo_turno_min': 0,
+                'ultimo_turno_hora': '00:00',
+                'hora_finalizacion_min': 0,
+                'hora_finalizacion_hora': '00:00'
+            }
+        return {
+            'estudios_por_tipo': dict(self.estudios),
+            'tiempo_promedio_total': self.circuito.media,
+            'total_pacientes': self.circuito.n,
+            'ultimo_turno_min': self.ultimo_turno_min,
+            'ultimo_turno_hora': min_a_hora(self.ultimo_turno_min),
+            'hora_finalizacion_min': self.hora_finalizacion_min,
+            'hora_finalizacion_hora': min_a_hora(self.hora_finalizacion_min)
+        }
+
+
+class AcumuladorEstadisticas:
+    """Resumen entre días (réplicas). Se combina entre bloques y procesos."""
+
+    def __init__(self):
+        self.dias = 0
+        self.circuito = Welford()            # por paciente
+        self.digest_circuito = TDigest()
+        self.fin = Welford()                 # por día
+        self.digest_fin = TDigest()
+        self.promedio = Welford()            # tiempo_promedio_total por día
+        self.pacientes = Welford()           # total_pacientes por día
+        self.estudios = np.zeros(len(TIPOS), dtype=np.int64)
+        self.horas_extras = np.zeros(len(BORDES_HORAS_EXTRAS) + 1, dtype=np.int64)
+
+    def agregar_dia(self, dia):
+        """Suma un EstadisticasDia cerrado. Un día sin pacientes también
+        cuenta (termina en el minuto 0), como en agregar_dias"""
+        self.dias += 1
+        self.circuito.combinar(dia.circuito)
+        self.digest_circuito.combinar(dia.digest_circuito)
+        self.fin.agregar(dia.hora_finalizacion_min)
+        self.digest_fin.agregar(dia.hora_finalizacion_min)
+        self.promedio.agregar(dia.circuito.media)
+        self.pacientes.agregar(dia.circuito.n)
+        for tipo, cantidad in dia.estudios.items():
+            self.estudios[TIPOS.index(tipo)] += cantidad
+        self.horas_extras[clase_horas_extras(dia.hora_finalizacion_min)] += 1
+
+    def agregar_dias(self, estadisticas, circuitos=None):
+        """Suma el resultado de muestreo.estadisticas_dias (y, si se pasan,
+        los tiempos de circuito de cada paciente)"""
+        fin = np.asarray(estadisticas['hora_finalizacion_min'], dtype=float)
+        self.dias += len(fin)
+        self.fin.agregar_lote(fin)
+        self.digest_fin.agregar_lote(fin)
+        self.promedio.agregar_lote(estadisticas['tiempo_promedio_total'])
+        self.pacientes.agregar_lote(estadisticas['total_pacientes'])
+        self.estudios += np.asarray(estadisticas['estudios_por_tipo']).sum(axis=0)
+        clases = np.searchsorted(BORDES_HORAS_EXTRAS, np.maximum(0.0, fin - JORNADA_MIN), side='left')
+        self.horas_extras += np.bincount(clases, minlength=len(self.horas_extras))
+        if circuitos is not None:
+            self.circuito.agregar_lote(circuitos)
+            self.digest_circuito.agregar_lote(circuitos)
+
+    def combinar(self, otro):
+        self.dias += otro.dias
+        self.circuito.combinar(otro.circuito)
+        self.digest_circuito.combinar(otro.digest_circuito)
+        self.fin.combinar(otro.fin)
+        self.digest_fin.combinar(otro.digest_fin)
+        self.promedio.combinar(otro.promedio)
+        self.pacientes.combinar(otro.pacientes)
+        self.estudios += otro.estudios
+        self.horas_extras += otro.horas_extras
+
+    def resumen(self):
+        """Medias, desvíos, cuantiles e histograma de horas extras"""
+        def cuantiles(digest):
+            return {f'p{int(q * 100)}': digest.cuantil(q) for q in (0.05, 0.5, 0.95)}
+
+        return {
+            'dias': self.dias,
+            'tiempo_circuito': {'media': self.circuito.media, 'desvio': self.circuito.desvio(),
+                                **cuantiles(self.digest_circuito)},
+            'hora_finalizacion_min': {'media': self.fin.media, 'desvio': self.fin.desvio(),
+                                      **cuantiles(self.digest_fin)},
+            'tiempo_promedio_total': {'media': self.promedio.media, 'desvio': self.promedio.desvio()},
+            'total_pacientes': {'media': self.pacientes.media, 'desvio': self.pacientes.desvio()},
+            'estudios_por_tipo': dict(zip(TIPOS, self.estudios.tolist())),
+            'horas_extras': self.horas_extras.tolist(),
+            'prob_horas_extras': float(self.horas_extras[1:].sum() / self.dias) if self.dias else 0.0,
+        }
@@ -15,14 +15,34 @@ def mostrar_arbol():
     archivos = {
         'Archivos principales (Python)': [
             'main.py                  ⭐ EJECUTA ESTE',
+            'lote.py                  Corrida por lotes sin ventana (CLI)',
+            'horizonte.py             Semanas de días hábiles con arrastre entre días (CLI)',
             'config.py                Configuración',
             'paciente.py              Clase Paciente',
             'simulacion.py            Motor de simulación',
+            'motor_eventos.py         Motor de eventos discretos (sin ventana)',
+            'motor_recursivo.py       Recursión en tándem vectorizada entre días (sin ventana)',
+            'muestreo.py              Muestreo vectorizado de días (NumPy)',
+            'montecarlo.py            Réplicas Monte Carlo en paralelo',
+            'cache_resultados.py      Caché en disco de resultados Monte Carlo',
+            'optimizador.py           Optimizador de políticas de agenda',
+            'registro.py              Registro compacto de pacientes completados',
+            'exportacion.py           Exportación por columnas de los pacientes de un lote',
+            'estadisticas.py          Estadísticas en línea combinables',
+            'recursos.py              Pools de mesas, boxes y resonadores',
+            'llegadas.py              Calendario de llegadas (heap por hora de llegada)',
+            'rutas.py                 Rutas compiladas y movimiento vectorizado',
+            'traza.py                 Traza binaria de transiciones y reproducción',
+            'perfilador.py            Tiempos por fase de simulación y dibujo',
+            'benchmarks.py            Benchmarks de motor, agenda y dibujo',
             'visualizacion.py         Interfaz gráfica V2.0',
             'visualizacion_old.py     Backup V1.0',
-            'generar_resumen_pdf.py   Genera PDF',
+            'resumen.py               Informe PDF con resultados simulados',
             'verificar.py             Verifica instalación'
         ],
+        'Pruebas': [
+            'tests/                   Pruebas de los motores (python -m pytest)'
+        ],
         'Configuración': [
             'requirements.txt         Dependencias',
             '.gitignore               Archivos ignorados por Git'
@@ -36,7 +56,8 @@ def mostrar_arbol():
             'COMO_AGREGAR_ARCHIVOS.md Guía para agregar archivos'
         ],
         'Generados': [
-            'Resumen_Ejecutivo_Simulacion_Resonador.pdf'
+            'Resumen_Ejecutivo_Simulacion_Resonador.pdf',
+            'informes/                PDF por escenario (resumen.py --escenarios)'
         ]
     }
     
@@ -0,0 +1,203 @@
+"""Exportación columnar por partes de los pacientes de corridas largas
+
+Cada columna de cada parte es un .npy propio (`<columna>-<parte>.npy`), así
+que el lector las abre con memmap y un análisis solo lee las columnas y
+partes que usa. Con formato='csv' cada parte es un CSV (más lento y sin
+memmap, pero se abre en cualquier lado). manifiesto.json guarda columnas,
+tipos y filas de cada parte.
+
+El escritor junta filas en un buffer de `filas_por_parte` y lo vuelca al
+llenarse: la memoria no depende del largo de la corrida.
+"""
+import csv
+import json
+import os
+import numpy as np
+import config
+from registro import DTYPE_REGISTRO
+from muestreo import TIPOS
+
+# Las columnas del registro más la réplica (día) y el tiempo nominal del
+# circuito (el de Paciente.calcular_tiempo_circuito, que usan las
+# estadísticas: sin esperas). El tiempo real en el sistema es
+# t_completado - t_llegada.
+DTYPE_EXPORTACION = np.dtype([('replica', np.uint32)] + DTYPE_REGISTRO.descr + [('tiempo_circuito', np.float32)])
+
+FORMATOS = ('npy', 'csv')
+MANIFIESTO = 'manifiesto.json'
+
+
+def _tiempo_circuito(filas):
+    """Desvío de llegada, servicio y caminos de cada fila (sin esperas)"""
+    return (np.abs(filas['desvio']) + filas['validacion'] + filas['box'] + filas['resonador'] +
+            filas['salida'] + config.TIEMPO_CAMINO_VESTUARIO + config.TIEMPO_CAMINO_SALIDA)
+
+
+def filas_registro(filas, replica):
+    """Filas de un RegistroPacientes (un día) en formato de exportación"""
+    salida = np.zeros(len(filas), dtype=DTYPE_EXPORTACION)
+    for campo in DTYPE_REGISTRO.names:
+        salida[campo] = filas[campo]
+    salida['replica'] = replica
+    salida['tiempo_circuito'] = _tiempo_circuito(filas)
+    return salida
+
+
+def filas_muestra(muestras, replica_inicial=0):
+    """Filas de los pacientes agendados de muestreo.muestrear_dias. El muestreo
+    no simula la cola: de las marcas solo se conocen llegada y fin."""
+    agendado = muestras['agendado']
+    dias, columnas = np.nonzero(agendado)
+    salida = np.zeros(len(dias), dtype=DTYPE_EXPORTACION)
+    for campo in ('t_validacion', 't_box', 't_resonador', 't_saliendo'):
+        salida[campo] = np.nan
+    circuito = (np.abs(muestras['desvio']) + muestras['servicio'])[agendado]
+    salida['replica'] = replica_inicial + dias
+    salida['id'] = columnas + 1
+    salida['tipo'] = muestras['tipo'][agendado]
+    salida['turno'] = muestras['turno'][agendado]
+    salida['hora_llegada'] = muestras['llegada'][agendado]
+    for campo in ('desvio', 'validacion', 'box', 'resonador', 'salida'):
+        salida[campo] = muestras[campo][agendado]
+    salida['t_llegada'] = salida['hora_llegada']
+    salida['t_completado'] = muestras['llegada'][agendado] + circuito
+    salida['tiempo_circuito'] = circuito
+    return salida
+
+
+def filas_tandem(muestras, tiempos, replica_inicial=0):
+    """Filas de motor_recursivo.simular_tandem: las mismas del motor de
+    eventos, cada día en el orden en que terminan los pacientes"""
+    from motor_recursivo import MARCAS, orden_completados
+    completados = orden_completados(tiempos)
+    activo = np.take_along_axis(tiempos['activo'], completados, axis=1)
+    dias = np.nonzero(activo)[0]
+    columnas = np.take_along_axis(tiempos['orden'], completados, axis=1)[activo]
+    salida = np.zeros(len(dias), dtype=DTYPE_EXPORTACION)
+    salida['replica'] = replica_inicial + dias
+    salida['id'] = columnas + 1
+    salida['tipo'] = muestras['tipo'][dias, columnas]
+    salida['turno'] = muestras['turno'][dias, columnas]
+    salida['hora_llegada'] = muestras['llegada'][dias, columnas]
+    for campo in ('desvio', 'validacion', 'box', 'resonador', 'salida'):
+        salida[campo] = muestras[campo][dias, columnas]
+    for marca in MARCAS:
+        salida[marca] = np.take_along_axis(tiempos[marca], completados, axis=1)[activo]
+    salida['tiempo_circuito'] = _tiempo_circuito(salida)
+    return salida
+
+
+class EscritorColumnar:
+    """Escribe filas de DTYPE_EXPORTACION en partes de `filas_por_parte`"""
+
+    def __init__(self, directorio, formato='npy', filas_por_parte=None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato} (opciones: {', '.join(FORMATOS)})")
+        os.makedirs(directorio, exist_ok=True)
+        if os.path.exists(os.path.join(directorio, MANIFIESTO)):
+            raise FileExistsError(f"{directorio} ya tiene una exportación")
+        self.directorio = directorio
+        self.formato = formato
+        self.filas_por_parte = filas_por_parte or config.EXPORTACION_FILAS_POR_PARTE
+        self._buffer = np.empty(self.filas_por_parte, dtype=DTYPE_EXPORTACION)
+        self._n = 0
+        self.partes = []  # filas de cada parte ya escrita
+        self.cerrado = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def __len__(self):
+        return sum(self.partes) + self._n
+
+    def escribir(self, filas):
+        """Agrega filas (array de DTYPE_EXPORTACION); vuelca cada parte que se llena"""
+        inicio = 0
+        while inicio < len(filas):
+            k = min(len(filas) - inicio, self.filas_por_parte - self._n)
+            self._buffer[self._n:self._n + k] = filas[inicio:inicio + k]
+            self._n += k
+            inicio += k
+            if self._n == self.filas_por_parte:
+                self.vaciar()
+
+    def vaciar(self):
+        if not self._n:
+            return
+        parte = len(self.partes)
+        datos = self._buffer[:self._n]
+        if self.formato == 'npy':
+            for columna in DTYPE_EXPORTACION.names:
+                np.save(self._ruta(columna, parte), np.ascontiguousarray(datos[columna]))
+        else:
+            with open(self._ruta('parte', parte), 'w', newline='', encoding='utf-8') as f:
+                escritor = csv.writer(f)
+                escritor.writerow(DTYPE_EXPORTACION.names)
+                escritor.writerows(datos.tolist())
+        self.partes.append(self._n)
+        self._n = 0
+
+    def _ruta(self, columna, parte):
+        extension = 'npy' if self.formato == 'npy' else 'csv'
+        return os.path.join(self.directorio, f"{columna}-{parte:05d}.{extension}")
+
+    def cerrar(self):
+        if self.cerrado:
+            return
+        self.vaciar()
+        manifiesto = {
+            'formato': self.formato,
+            'columnas': {nombre: DTYPE_EXPORTACION[nombre].str for nombre in DTYPE_EXPORTACION.names},
+            'tipos_estudio': TIPOS,
+            'partes': self.partes,
+        }
+        with open(os.path.join(self.directorio, MANIFIESTO), 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        self.cerrado = True
+
+
+class LectorColumnar:
+    """Lee una exportación; las partes .npy se abren con memmap"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        with open(os.path.join(directorio, MANIFIESTO), encoding='utf-8') as f:
+            self.manifiesto = json.load(f)
+        self.formato = self.manifiesto['formato']
+        self.columnas = list(self.manifiesto['columnas'])
+        self.tipos_estudio = self.manifiesto['tipos_estudio']
+        self.partes = self.manifiesto['partes']
+
+    def __len__(self):
+        return sum(self.partes)
+
+    def _ruta(self, columna, parte):
+        return os.path.join(self.directorio, f"{columna}-{parte:05d}.{self.formato}")
+
+    def _leer_csv(self, parte, columnas):
+        # ndmin=1: una parte de una sola fila no vuelve como array 0-d
+        datos = np.genfromtxt(self._ruta('parte', parte), delimiter=',', names=True,
+                              dtype=None, encoding='utf-8', ndmin=1)
+        return {c: datos[c].astype(self.manifiesto['columnas'][c]) for c in columnas}
+
+    def parte(self, indice, columnas=None):
+        """{columna: array} de una parte (memmap de solo lectura con npy)"""
+        columnas = columnas or self.columnas
+        if self.formato == 'csv':
+            return self._leer_csv(indice, columnas)
+        return {c: np.load(self._ruta(c, indice), mmap_mode='r') for c in columnas}
+
+    def iterar(self, columnas=None):
+        """Recorre las partes de a una: memoria acotada por el tamaño de parte"""
+        for i in range(len(self.partes)):
+            yield self.parte(i, columnas)
+
+    def columna(self, nombre):
+        """Una columna completa en memoria (solo esa columna)"""
+        partes = [p[nombre] for p in self.iterar([nombre])]
+        if not partes:
+            return np.empty(0, dtype=self.manifiesto['columnas'][nombre])
+        return np.concatenate(partes)
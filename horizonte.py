@@ -0,0 +1,247 @@
+"""
+HORIZONTE DE VARIAS SEMANAS - SIN VENTANA
+=========================================
+Simula días hábiles seguidos de un calendario: cada día de la semana con su
+horario (config.HORARIO_SEMANAL), sin los feriados (config.FERIADOS) y con
+arrastre entre días. Pasados config.MAXIMO_HORAS_EXTRAS minutos del cierre no
+empieza ningún estudio más: los que todavía no llegaron al resonador se
+reprograman primeros en la agenda del siguiente día hábil y le quitan lugar
+a los turnos nuevos.
+
+Cada día se simula con el motor de eventos (reloj propio, en minutos desde
+su apertura) y se entrega apenas termina: en memoria solo queda el día en
+curso y los pacientes arrastrados, sin importar el largo del horizonte.
+
+    python horizonte.py --semanas 4 --semilla 1
+    python horizonte.py --semanas 52 --desde 2025-03-03 --salida dias.csv --pacientes anio/
+"""
+import argparse
+import csv
+import itertools
+import sys
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import config
+from muestreo import TIPOS, asignar_turnos, muestrear_dias, min_a_hora
+from simulacion import pacientes_desde_muestra
+from motor_eventos import SimuladorEventos
+
+
+def jornadas(desde, hasta, horario=None, feriados=None):
+    """(fecha, hora de apertura, hora de cierre) de cada día hábil en [desde, hasta)"""
+    horario = config.HORARIO_SEMANAL if horario is None else horario
+    feriados = config.FERIADOS if feriados is None else feriados
+    feriados = {date.fromisoformat(f) if isinstance(f, str) else f for f in feriados}
+    for dia_semana, (apertura, cierre) in horario.items():
+        if not 0 <= dia_semana <= 6 or not 0 <= apertura < cierre <= 24:
+            raise ValueError(f"Horario inválido para el día {dia_semana}: {apertura}-{cierre}")
+    fecha = desde
+    while fecha < hasta:
+        if fecha.weekday() in horario and fecha not in feriados:
+            apertura, cierre = horario[fecha.weekday()]
+            yield fecha, apertura, cierre
+        fecha += timedelta(days=1)
+
+
+def limite_turnos(apertura, cierre):
+    """Último minuto (desde la apertura) en que se puede dar un turno, como
+    config.LIMITE_TURNOS para la jornada de config"""
+    return (cierre - apertura) * 60 - config.INTERVALO_TURNOS
+
+
+def armar_agenda(rng, arrastrados, limite, fecha_inicio, ids):
+    """Agenda de un día: primero los arrastrados (en su orden) y después los
+    turnos nuevos, todos en la grilla flexible hasta `limite`.
+
+    Devuelve (agenda, arrastrados que tampoco entran). Sin arrastrados es
+    la misma agenda que generar_agenda_flexible con ese límite. ids:
+    iterador de ids para los pacientes nuevos (únicos en todo el horizonte).
+    """
+    m = muestrear_dias(1, rng, limite_turnos=limite)
+    servicio = np.concatenate([[p.calcular_tiempo_servicio() for p in arrastrados], m['servicio'][0]])
+    turno = asignar_turnos(servicio[None])[0]
+    entran = int((turno < limite).sum())
+    k = min(len(arrastrados), entran)
+    for p, t in zip(arrastrados[:k], turno[:k].tolist()):
+        p.turno = p.turno_asignado = t
+        p.hora_llegada_real = t + p.desvio_llegada
+        p.estado = 'PROGRAMADO'
+        p.marcas = {}
+        p.ts_inicio = None
+        p.puesto = 0
+        p.listo = False
+    n = entran - k
+    nuevos = pacientes_desde_muestra(m, 0, range(n), turno[len(arrastrados):len(arrastrados) + n], fecha_inicio)
+    for p in nuevos:
+        p.id = next(ids)
+    return arrastrados[:k] + nuevos, arrastrados[k:]
+
+
+def simular_jornada(agenda, fecha_inicio, jornada_min, maximo_extras=None):
+    """Simula un día con el motor de eventos sin empezar estudios después de
+    `maximo_extras` minutos del cierre. Devuelve el simulador y los que no
+    llegaron al resonador, primero los más avanzados en el circuito."""
+    cierre = None if maximo_extras is None else jornada_min + maximo_extras
+    sim = SimuladorEventos(agenda, fecha_inicio=fecha_inicio, cierre=cierre)
+    sim.ejecutar()
+    reprogramados = [p for pool in (sim.boxes, sim.mesas, sim.sala) for p in pool.ocupantes()]
+    reprogramados.extend(sim.pacientes_programados)
+    return sim, reprogramados
+
+
+def simular_horizonte(desde, hasta, rng=None, horario=None, feriados=None, sin_corte=False,
+                      exportar=None):
+    """Simula los días hábiles de [desde, hasta) y entrega uno por vez.
+
+    Cada día es un dict con las estadísticas de obtener_estadisticas_dia
+    (horas desde su apertura) más fecha, horario, fin real, horas extras y
+    cuántos pacientes llegaron arrastrados y cuántos pasaron al día
+    siguiente. sin_corte: recibe a todos aunque sea tarde (ignora
+    config.MAXIMO_HORAS_EXTRAS). exportar: exportacion.EscritorColumnar opcional; la réplica
+    de cada paciente es el número de día hábil.
+    """
+    rng = np.random.default_rng(rng)
+    maximo_extras = None if sin_corte else config.MAXIMO_HORAS_EXTRAS
+    arrastrados = []
+    ids = itertools.count(1)
+    for indice, (fecha, apertura, cierre) in enumerate(jornadas(desde, hasta, horario, feriados)):
+        inicio = datetime(fecha.year, fecha.month, fecha.day, apertura)
+        jornada_min = (cierre - apertura) * 60
+        llegan_arrastrados = len(arrastrados)
+        agenda, arrastrados = armar_agenda(rng, arrastrados, limite_turnos(apertura, cierre), inicio, ids)
+        sim, reprogramados = simular_jornada(agenda, inicio, jornada_min, maximo_extras)
+        arrastrados = reprogramados + arrastrados
+        if exportar is not None:
+            from exportacion import filas_registro
+            exportar.escribir(filas_registro(sim.pacientes_completados.filas(), indice))
+
+        dia = sim.obtener_estadisticas_dia()
+        for campo in ('ultimo_turno', 'hora_finalizacion'):
+            dia[f"{campo}_hora"] = min_a_hora(dia[f"{campo}_min"], apertura)
+        dia.update({
+            'fecha': fecha.isoformat(),
+            'dia_semana': fecha.weekday(),
+            'apertura': apertura,
+            'cierre': cierre,
+            'fin_real_min': sim.tiempo_actual,
+            'horas_extras_min': max(0.0, sim.tiempo_actual - jornada_min),
+            'arrastrados': llegan_arrastrados,
+            'reprogramados': len(arrastrados),
+        })
+        yield dia
+
+
+CAMPOS_CSV = ('fecha', 'dia_semana', 'apertura', 'cierre', 'total_pacientes', 'tiempo_promedio_total',
+              'ultimo_turno_min', 'ultimo_turno_hora', 'hora_finalizacion_min', 'hora_finalizacion_hora',
+              'fin_real_min', 'horas_extras_min', 'arrastrados', 'reprogramados')
+
+
+def fila_csv(dia):
+    fila = {campo: dia[campo] for campo in CAMPOS_CSV}
+    for tipo in TIPOS:
+        fila[f"estudios_{tipo}"] = dia['estudios_por_tipo'].get(tipo, 0)
+    return fila
+
+
+class ResumenSemana:
+    """Totales de una semana (lunes a domingo), para imprimir al cerrarla"""
+
+    def __init__(self, lunes):
+        self.lunes = lunes
+        self.dias = 0
+        self.pacientes = 0
+        self.horas_extras_min = 0.0
+        self.dias_con_extras = 0
+        self.reprogramados = 0
+
+    def agregar(self, dia):
+        self.dias += 1
+        self.pacientes += dia['total_pacientes']
+        self.horas_extras_min += dia['horas_extras_min']
+        self.dias_con_extras += dia['horas_extras_min'] > 0
+        self.reprogramados += dia['reprogramados']
+
+    def linea(self):
+        return (f"  Semana del {self.lunes.isoformat()}: {self.dias} días, {self.pacientes:5d} pacientes, "
+                f"{self.horas_extras_min:7.1f} min extra ({self.dias_con_extras} días), "
+                f"{self.reprogramados} reprogramados")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula semanas de días hábiles con arrastre entre días")
+    parser.add_argument('--semanas', type=int, required=True, help="largo del horizonte")
+    parser.add_argument('--desde', type=date.fromisoformat, default=None,
+                        help="primer día AAAA-MM-DD (por defecto, el lunes próximo)")
+    parser.add_argument('--semilla', type=int, default=None, help="semilla (sin ella se elige y se informa una)")
+    parser.add_argument('--sin-corte', action='store_true',
+                        help="recibe a todos aunque sea tarde (ignora MAXIMO_HORAS_EXTRAS)")
+    parser.add_argument('--salida', help="archivo .csv con un día hábil por fila (se escribe a medida que avanza)")
+    parser.add_argument('--pacientes', metavar='DIRECTORIO',
+                        help="exporta cada paciente por columnas (ver exportacion.py)")
+    parser.add_argument('--formato', choices=('npy', 'csv'), default='npy', help="formato de --pacientes")
+    args = parser.parse_args()
+
+    desde = args.desde
+    if desde is None:
+        hoy = date.today()
+        desde = hoy + timedelta(days=7 - hoy.weekday())
+    hasta = desde + timedelta(weeks=args.semanas)
+    semilla = args.semilla if args.semilla is not None else np.random.SeedSequence().entropy
+    maximo_extras = None if args.sin_corte else config.MAXIMO_HORAS_EXTRAS
+    print(f"Simulando del {desde.isoformat()} al {(hasta - timedelta(days=1)).isoformat()} "
+          f"(semilla {semilla}, corte {'sin corte' if maximo_extras is None else f'{maximo_extras} min después del cierre'})")
+
+    exportar = None
+    if args.pacientes:
+        from exportacion import EscritorColumnar
+        exportar = EscritorColumnar(args.pacientes, args.formato)
+    archivo = open(args.salida, 'w', newline='', encoding='utf-8') if args.salida else None
+    escritor = None
+    total = ResumenSemana(desde)
+    semana = None
+    inicio = time.perf_counter()
+    try:
+        for dia in simular_horizonte(desde, hasta, semilla, sin_corte=args.sin_corte, exportar=exportar):
+            fecha = date.fromisoformat(dia['fecha'])
+            lunes = fecha - timedelta(days=fecha.weekday())
+            if semana is None or semana.lunes != lunes:
+                if semana is not None:
+                    print(semana.linea())
+                semana = ResumenSemana(lunes)
+            semana.agregar(dia)
+            total.agregar(dia)
+            if archivo is not None:
+                fila = fila_csv(dia)
+                if escritor is None:
+                    escritor = csv.DictWriter(archivo, fieldnames=list(fila))
+                    escritor.writeheader()
+                escritor.writerow(fila)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrumpido: se conservan los días ya simulados", file=sys.stderr)
+    finally:
+        if archivo is not None:
+            archivo.close()
+        if exportar is not None:
+            exportar.cerrar()
+    if semana is not None:
+        print(semana.linea())
+    if not total.dias:
+        print("Ningún día hábil en el horizonte")
+        return 1
+
+    print()
+    print(f"✓ {total.dias} días hábiles en {time.perf_counter() - inicio:.1f} s: {total.pacientes:,} pacientes "
+          f"({total.pacientes / total.dias:.1f} por día)")
+    print(f"  Días con horas extras: {total.dias_con_extras / total.dias:.1%}, "
+          f"{total.horas_extras_min / total.dias:.1f} min por día en promedio")
+    print(f"  Pacientes reprogramados al día siguiente: {total.reprogramados}")
+    if args.salida:
+        print(f"✓ Días en {args.salida}")
+    if exportar is not None:
+        print(f"✓ {len(exportar):,} pacientes en {args.pacientes} ({len(exportar.partes)} partes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
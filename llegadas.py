@@ -0,0 +1,88 @@
+"""Calendario de llegadas - pacientes agendados que todavía no llegaron"""
+import heapq
+
+
+class CalendarioLlegadas:
+    """Pacientes por llegar, ordenados por hora_llegada_real.
+
+    Es un heap de [hora, secuencia, paciente]: ver al próximo cuesta O(1) y
+    sacarlo, agregar uno (sobreturno, paciente sin turno) o reprogramarlo
+    O(log n). Cancelar es O(1): la entrada queda marcada en el heap y se
+    descarta cuando llega al tope. A igual hora llega primero el que se
+    agregó antes, como con el sort estable de la lista que reemplaza.
+    """
+
+    def __init__(self, pacientes=()):
+        self._entradas = {}  # id(paciente) -> su entrada vigente en el heap
+        self._heap = []
+        self._secuencia = 0
+        for p in pacientes:
+            self._heap.append(self._nueva_entrada(p))
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, p):
+        return id(p) in self._entradas
+
+    def __iter__(self):
+        """Pacientes en orden de llegada (ordena: para mostrar, no en cada paso)"""
+        return (entrada[2] for entrada in sorted(self._entradas.values()))
+
+    def _nueva_entrada(self, p):
+        if id(p) in self._entradas:
+            raise ValueError(f"P#{p.id} ya está en el calendario")
+        entrada = [p.hora_llegada_real, self._secuencia, p]
+        self._secuencia += 1
+        self._entradas[id(p)] = entrada
+        return entrada
+
+    def agregar(self, p):
+        """Agenda a `p` para su hora_llegada_real"""
+        heapq.heappush(self._heap, self._nueva_entrada(p))
+
+    def cancelar(self, p):
+        """Saca a `p` del calendario (ValueError si no estaba)"""
+        entrada = self._entradas.pop(id(p), None)
+        if entrada is None:
+            raise ValueError(f"P#{p.id} no está en el calendario")
+        entrada[2] = None
+        # Si las canceladas son mayoría se rearma el heap: la memoria no crece
+        if len(self._heap) > 2 * len(self._entradas) + 32:
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+
+    def reprogramar(self, p, hora):
+        """Mueve la llegada de `p` a `hora` (pasa detrás de los que ya
+        llegaban a esa hora)"""
+        self.cancelar(p)
+        p.hora_llegada_real = hora
+        self.agregar(p)
+
+    def _descartar_canceladas(self):
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+
+    def proximo(self):
+        """Próximo en llegar, sin sacarlo (None si no queda nadie)"""
+        self._descartar_canceladas()
+        return self._heap[0][2] if self._heap else None
+
+    def sacar(self):
+        """Saca y devuelve al próximo en llegar"""
+        self._descartar_canceladas()
+        p = heapq.heappop(self._heap)[2]
+        del self._entradas[id(p)]
+        return p
+
+    def estado(self):
+        """Copia del estado interno (para keyframes)"""
+        return [list(e) for e in self._heap if e[2] is not None], self._secuencia
+
+    def restaurar(self, estado):
+        entradas, self._secuencia = estado
+        self._heap = [list(e) for e in entradas]
+        heapq.heapify(self._heap)
+        self._entradas = {id(e[2]): e for e in self._heap}
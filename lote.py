@@ -0,0 +1,171 @@
+"""
+CORRIDA POR LOTES - SIN VENTANA
+===============================
+Simula N días del escenario de config.py en paralelo y resume los
+resultados (los mismos campos que obtener_estadisticas_dia, más percentiles
+entre réplicas).
+
+    python lote.py --dias 10000
+    python lote.py --dias 50000 --motor eventos --trabajadores 8 --semilla 1 --salida dias.csv
+    python lote.py --dias 2000 --salida resultados.json
+    python lote.py --dias 100000 --pacientes corrida/      un .npy por columna y parte
+
+Ctrl-C corta la corrida y conserva los bloques ya terminados.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+import numpy as np
+import config
+from montecarlo import CAMPOS, MOTORES, TAM_BLOQUE, ejecutar_montecarlo
+from muestreo import TIPOS, METODOS_MUESTREO, min_a_hora
+from exportacion import EscritorColumnar, FORMATOS
+
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+
+class Progreso:
+    """Línea de avance con ETA en stderr (se reescribe en el lugar)"""
+
+    def __init__(self, total, activo=True):
+        self.total = total
+        self.activo = activo
+        self.inicio = time.perf_counter()
+
+    def __call__(self, completadas, total):
+        if not self.activo:
+            return
+        transcurrido = time.perf_counter() - self.inicio
+        fraccion = completadas / total
+        eta = transcurrido * (1 - fraccion) / fraccion if fraccion else float('inf')
+        sys.stderr.write(f"\r  {completadas:>9,}/{total:,} días ({fraccion:6.1%})  "
+                         f"{transcurrido:7.1f} s  ETA {eta:7.1f} s ")
+        sys.stderr.flush()
+
+    def cerrar(self):
+        if self.activo:
+            sys.stderr.write("\n")
+
+
+def resumir(resultado, percentiles=PERCENTILES):
+    """Media, desvío y percentiles de cada campo entre las réplicas completas"""
+    m = resultado.completos()
+    salida = {}
+    for campo in CAMPOS:
+        v = resultado.dias[campo][m]
+        fila = {'media': float(v.mean()), 'desvio': float(v.std(ddof=1)) if len(v) > 1 else 0.0}
+        fila.update({f"p{q}": float(x) for q, x in zip(percentiles, np.percentile(v, percentiles))})
+        salida[campo] = fila
+    estudios = resultado.dias['estudios_por_tipo'][m]
+    salida['estudios_por_tipo'] = dict(zip(TIPOS, estudios.mean(axis=0).tolist()))
+    for campo in ('ultimo_turno', 'hora_finalizacion', 'fin_real'):
+        salida[f"{campo}_hora"] = {k: min_a_hora(v) for k, v in salida[f"{campo}_min"].items() if k != 'desvio'}
+    salida['prob_horas_extras'] = resultado.resumen()['prob_horas_extras']
+    return salida
+
+
+def filas_dias(resultado):
+    """Una fila por réplica con los campos de obtener_estadisticas_dia"""
+    m = np.flatnonzero(resultado.completos())
+    d = resultado.dias
+    for i in m:
+        fila = {'dia': int(i)}
+        fila['total_pacientes'] = int(d['total_pacientes'][i])
+        fila['tiempo_promedio_total'] = float(d['tiempo_promedio_total'][i])
+        fila['ultimo_turno_min'] = float(d['ultimo_turno_min'][i])
+        fila['ultimo_turno_hora'] = min_a_hora(fila['ultimo_turno_min'])
+        fila['hora_finalizacion_min'] = float(d['hora_finalizacion_min'][i])
+        fila['hora_finalizacion_hora'] = min_a_hora(fila['hora_finalizacion_min'])
+        fila['fin_real_min'] = float(d['fin_real_min'][i])
+        fila['fin_real_hora'] = min_a_hora(fila['fin_real_min'])
+        for tipo, n in zip(TIPOS, d['estudios_por_tipo'][i].tolist()):
+            fila[f"estudios_{tipo}"] = n
+        yield fila
+
+
+def escribir(ruta, resultado, resumen, parametros):
+    """.csv: una fila por día simulado. .json: parámetros, resumen y días."""
+    if ruta.endswith('.csv'):
+        with open(ruta, 'w', newline='', encoding='utf-8') as f:
+            escritor = None
+            for fila in filas_dias(resultado):
+                if escritor is None:
+                    escritor = csv.DictWriter(f, fieldnames=list(fila))
+                    escritor.writeheader()
+                escritor.writerow(fila)
+        return
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'parametros': parametros, 'resumen': resumen, 'dias': list(filas_dias(resultado))},
+                  f, indent=1, ensure_ascii=False)
+
+
+def imprimir(resumen, percentiles=PERCENTILES):
+    columnas = ['media', 'desvio'] + [f"p{q}" for q in percentiles]
+    print(f"  {'':24s}" + ''.join(f"{c:>9s}" for c in columnas))
+    for campo in CAMPOS:
+        print(f"  {campo:24s}" + ''.join(f"{resumen[campo][c]:9.1f}" for c in columnas))
+    for campo in ('ultimo_turno_hora', 'hora_finalizacion_hora', 'fin_real_hora'):
+        print(f"  {campo:24s}" + f"{resumen[campo]['media']:>9s}" + ' ' * 9 +
+              ''.join(f"{resumen[campo][f'p{q}']:>9s}" for q in percentiles))
+    print()
+    print("  Estudios por día: " + ', '.join(f"{t} {n:.2f}" for t, n in resumen['estudios_por_tipo'].items()))
+    print(f"  Días con horas extras: {resumen['prob_horas_extras']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula N días sin ventana y resume los resultados")
+    parser.add_argument('--dias', type=int, required=True, help="cantidad de días (réplicas)")
+    parser.add_argument('--motor', choices=list(MOTORES), default='eventos',
+                        help="eventos (por defecto), recursivo, vectorizado o cuadros")
+    parser.add_argument('--trabajadores', type=int, default=None, help="procesos (por defecto, uno por CPU)")
+    parser.add_argument('--semilla', type=int, default=None, help="semilla (sin ella se elige y se informa una)")
+    parser.add_argument('--salida', help="archivo .csv (un día por fila) o .json (resumen y días)")
+    parser.add_argument('--metodo', choices=METODOS_MUESTREO, default='simple', help="muestreo de los días")
+    parser.add_argument('--tam-bloque', type=int, default=TAM_BLOQUE, help="días por tarea")
+    parser.add_argument('--cache', action='store_true', help="reusa bloques ya calculados (requiere --semilla)")
+    parser.add_argument('--pacientes', metavar='DIRECTORIO',
+                        help="exporta cada paciente por columnas (ver exportacion.py)")
+    parser.add_argument('--formato', choices=FORMATOS, default='npy', help="formato de --pacientes")
+    parser.add_argument('--silencioso', action='store_true', help="sin línea de avance")
+    args = parser.parse_args()
+    if args.cache and args.semilla is None:
+        parser.error("--cache requiere --semilla (sin semilla fija la corrida no se repite)")
+
+    print(f"Simulando {args.dias:,} días con el motor '{args.motor}' "
+          f"(jornada {config.HORA_INICIO}-{config.HORA_FIN} h)...")
+    progreso = Progreso(args.dias, activo=not args.silencioso)
+    exportar = EscritorColumnar(args.pacientes, args.formato) if args.pacientes else None
+    try:
+        resultado = ejecutar_montecarlo(args.dias, args.motor, args.semilla, args.trabajadores,
+                                        args.tam_bloque, args.cache, args.metodo, progreso, exportar)
+    finally:
+        if exportar is not None:
+            exportar.cerrar()
+    progreso.cerrar()
+    transcurrido = time.perf_counter() - progreso.inicio
+
+    if resultado.interrumpida:
+        print(f"⚠️  Interrumpido: se conservan {resultado.completadas:,} de {args.dias:,} días")
+    if not resultado.completadas:
+        return 130 if resultado.interrumpida else 1
+    print(f"✓ {resultado.completadas:,} días en {transcurrido:.1f} s "
+          f"({resultado.completadas / transcurrido:,.0f} días/s), semilla {resultado.entropia}")
+    print()
+
+    resumen = resumir(resultado)
+    imprimir(resumen)
+    if args.salida:
+        parametros = {'dias': args.dias, 'completados': resultado.completadas, 'motor': args.motor,
+                      'metodo': args.metodo, 'semilla': resultado.entropia, 'tam_bloque': args.tam_bloque,
+                      'interrumpida': resultado.interrumpida}
+        escribir(args.salida, resultado, resumen, parametros)
+        print(f"\n✓ Resultados en {args.salida}")
+    if exportar is not None:
+        print(f"✓ {len(exportar):,} pacientes en {args.pacientes} ({len(exportar.partes)} partes)")
+    return 130 if resultado.interrumpida else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
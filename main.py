@@ -4,10 +4,18 @@ SIMULADOR DE RESONADOR V3.2 - GRILLA FLEXIBLE
 Sistema automático con llegadas visuales realistas
 """
 
+import argparse
+import config
 from simulacion import SimuladorResonador
-from visualizacion import Visualizador
 
 def main():
+    parser = argparse.ArgumentParser(description="Simulador de resonador")
+    parser.add_argument('--grabar', metavar='ARCHIVO', help="graba la traza de los días simulados")
+    parser.add_argument('--reproducir', metavar='ARCHIVO', help="reproduce una traza grabada sin simular")
+    parser.add_argument('--dia', type=int, default=0, help="día de la traza a reproducir (R pasa al siguiente)")
+    parser.add_argument('--perfil', action='store_true', help="arranca con el perfilador y su panel prendidos (F3)")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("SIMULADOR DE RESONADOR V3.2 - GRILLA FLEXIBLE")
     print("=" * 70)
@@ -33,8 +41,13 @@ def main():
     print("CONTROLES:")
     print("  - ESPACIO: Pausar/Reanudar")
     print("  - V: Velocidad x2")
+    print("  - +/- (o flechas arriba/abajo): Ajustar velocidad entre 1x y 960x")
+    print(f"  - Flechas izquierda/derecha: Retroceder/avanzar {config.SALTO_LINEA_TIEMPO:g} min")
+    print("  - INICIO: Volver al comienzo del día")
+    print("  - Clic o arrastre en la línea de tiempo: Ir a ese minuto")
     print("  - S: Ver resumen día completo")
     print("  - R: Reiniciar")
+    print("  - F3: Perfilador (p50/p99 por fase) | F4: Volcarlo a archivo")
     print("  - ESC: Salir")
     print()
     print("=" * 70)
@@ -42,9 +55,29 @@ def main():
     print("Iniciando simulación automática...")
     print()
     
-    simulador = SimuladorResonador()
+    if args.perfil:
+        from perfilador import PERFILADOR
+        PERFILADOR.activo = True
+    
+    traza = None
+    if args.reproducir:
+        from traza import LectorTraza, ReproductorTraza
+        simulador = ReproductorTraza(LectorTraza(args.reproducir), args.dia)
+    elif args.grabar:
+        from traza import EscritorTraza
+        traza = EscritorTraza(args.grabar)
+        simulador = SimuladorResonador(traza=traza)
+    else:
+        simulador = SimuladorResonador()
+    
+    # pygame se carga recién cuando hace falta la ventana
+    from visualizacion import Visualizador
     visualizador = Visualizador(simulador)
-    visualizador.ejecutar()
+    try:
+        visualizador.ejecutar()
+    finally:
+        if traza is not None:
+            traza.cerrar()
 
 if __name__ == "__main__":
     main()
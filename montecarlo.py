@@ -0,0 +1,479 @@
+"""Monte Carlo en paralelo - réplicas de un escenario repartidas en procesos"""
+import os
+import numpy as np
+import config
+from muestreo import (TIPOS, CONTROLES, METODOS_MUESTREO, muestrear_dias, estadisticas_dias,
+                      controles_dias)
+from estadisticas import AcumuladorEstadisticas, JORNADA_MIN
+from simulacion import SimuladorResonador, pacientes_desde_muestra
+from motor_eventos import SimuladorEventos
+
+# Réplicas por bloque. Es fijo (no depende de la cantidad de procesos) para
+# que cada bloque tenga siempre la misma semilla y el resultado sea idéntico
+# bit a bit con 1 o con N trabajadores.
+TAM_BLOQUE = 500
+
+# hora_finalizacion_min es la nominal (llegada + desvío + servicio del último
+# en terminar, sin esperas); fin_real_min es el minuto simulado en que
+# termina el último paciente (el mismo que el nominal con 'vectorizado', que
+# no simula las colas)
+CAMPOS = ('tiempo_promedio_total', 'total_pacientes', 'ultimo_turno_min', 'hora_finalizacion_min',
+          'fin_real_min')
+
+# Motores que no simulan las colas: su fin "real" es el nominal
+MOTORES_SIN_COLAS = ('vectorizado',)
+
+# El simulador por cuadros avanza con los mismos sub-pasos fijos que la ventana
+_MAX_MINUTOS_CUADROS = 24 * 60  # corta réplicas que no terminan en un día
+
+
+def _estadisticas_a_arrays(lista):
+    """Convierte una lista de dicts de obtener_estadisticas_dia en arrays"""
+    salida = {campo: np.array([e[campo] for e in lista], dtype=float) for campo in CAMPOS}
+    salida['estudios_por_tipo'] = np.array(
+        [[e['estudios_por_tipo'].get(t, 0) for t in TIPOS] for e in lista], dtype=np.int64
+    ).reshape(len(lista), len(TIPOS))
+    return salida
+
+
+# Cada motor recibe (semilla, n, metodo, pacientes) y devuelve (estadísticas
+# por día como arrays, AcumuladorEstadisticas del bloque). `metodo` es el de
+# muestreo.muestrear_dias; 'control' trae las variables de control por día.
+# Con pacientes=True también trae 'pacientes': las filas de
+# exportacion.DTYPE_EXPORTACION de todo el bloque (réplica relativa al bloque).
+
+def motor_vectorizado(semilla, n, metodo='simple', pacientes=False):
+    """n días con el muestreo vectorizado de muestreo.py"""
+    muestras = muestrear_dias(n, np.random.default_rng(semilla), metodo=metodo)
+    dias = estadisticas_dias(muestras)
+    dias['fin_real_min'] = dias['hora_finalizacion_min']
+    dias['control'] = controles_dias(muestras)
+    if pacientes:
+        from exportacion import filas_muestra
+        dias['pacientes'] = filas_muestra(muestras)
+    acumulador = AcumuladorEstadisticas()
+    circuito = np.abs(muestras['desvio']) + muestras['servicio']
+    acumulador.agregar_dias(dias, circuito[muestras['agendado']])
+    return dias, acumulador
+
+
+def _agendas(rng, n, metodo):
+    """Pacientes de cada uno de los n días y las variables de control.
+
+    Con 'simple' se sortea un día por vez, igual que generar_agenda_flexible;
+    los otros métodos necesitan sortear todos los días juntos.
+    """
+    if metodo == 'simple':
+        por_dia = [muestrear_dias(1, rng) for _ in range(n)]
+        lotes = [(m, 0) for m in por_dia]
+        control = np.concatenate([controles_dias(m) for m in por_dia]).reshape(n, len(CONTROLES))
+    else:
+        m = muestrear_dias(n, rng, metodo=metodo)
+        lotes = [(m, dia) for dia in range(n)]
+        control = controles_dias(m)
+    agendas = []
+    for m, dia in lotes:
+        k = int(m['n_pacientes'][dia])
+        agendas.append(pacientes_desde_muestra(m, dia, range(k), m['turno'][dia, :k]))
+    return agendas, control
+
+
+def _estadisticas_simuladas(sim):
+    """obtener_estadisticas_dia más el minuto en que terminó el último paciente"""
+    dia = sim.obtener_estadisticas_dia()
+    fin = sim.pacientes_completados.filas()['t_completado']
+    dia['fin_real_min'] = float(fin.max()) if len(fin) else 0.0
+    return dia
+
+
+def _filas_pacientes(registros):
+    from exportacion import filas_registro
+    return np.concatenate([filas_registro(r.filas(), i) for i, r in enumerate(registros)])
+
+
+def motor_eventos(semilla, n, metodo='simple', pacientes=False):
+    """n días con el motor de eventos discretos"""
+    agendas, control = _agendas(np.random.default_rng(semilla), n, metodo)
+    dias = []
+    registros = []
+    acumulador = AcumuladorEstadisticas()
+    for agenda in agendas:
+        sim = SimuladorEventos(agenda)
+        sim.ejecutar()
+        dias.append(_estadisticas_simuladas(sim))
+        acumulador.agregar_dia(sim.estadisticas)
+        if pacientes:
+            registros.append(sim.pacientes_completados)
+    dias = _estadisticas_a_arrays(dias)
+    dias['control'] = control
+    if pacientes:
+        dias['pacientes'] = _filas_pacientes(registros)
+    return dias, acumulador
+
+
+def motor_cuadros(semilla, n, metodo='simple', pacientes=False):
+    """n días con el SimuladorResonador por cuadros, sin ventana"""
+    rng = np.random.default_rng(semilla)
+    agendas, control = _agendas(rng, n, metodo)
+    dias = []
+    registros = []
+    acumulador = AcumuladorEstadisticas()
+    for agenda in agendas:
+        sim = SimuladorResonador(rng, mostrar_agenda=False, pacientes=agenda)
+        while not sim.finalizada and sim.tiempo_actual < _MAX_MINUTOS_CUADROS:
+            sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+        dias.append(_estadisticas_simuladas(sim))
+        acumulador.agregar_dia(sim.estadisticas)
+        if pacientes:
+            registros.append(sim.pacientes_completados)
+    dias = _estadisticas_a_arrays(dias)
+    dias['control'] = control
+    if pacientes:
+        dias['pacientes'] = _filas_pacientes(registros)
+    return dias, acumulador
+
+
+def motor_recursivo(semilla, n, metodo='simple', pacientes=False):
+    """n días con la recursión de motor_recursivo.py: las reglas del motor
+    de eventos (para los mismos días da los mismos minutos), con todos los
+    días sorteados juntos como en motor_vectorizado"""
+    from motor_recursivo import simular_tandem, estadisticas_tandem
+    muestras = muestrear_dias(n, np.random.default_rng(semilla), metodo=metodo)
+    tiempos = simular_tandem(muestras)
+    dias = estadisticas_tandem(muestras, tiempos)
+    dias['control'] = controles_dias(muestras)
+    if pacientes:
+        from exportacion import filas_tandem
+        dias['pacientes'] = filas_tandem(muestras, tiempos)
+    acumulador = AcumuladorEstadisticas()
+    circuito = np.abs(muestras['desvio']) + muestras['servicio']
+    acumulador.agregar_dias(dias, circuito[muestras['agendado']])
+    return dias, acumulador
+
+
+MOTORES = {
+    'vectorizado': motor_vectorizado,
+    'eventos': motor_eventos,
+    'cuadros': motor_cuadros,
+    'recursivo': motor_recursivo,
+}
+
+
+def semilla_bloque(raiz, indice):
+    """Semilla independiente del bloque `indice` (igual a raiz.spawn(...)[indice])"""
+    return np.random.SeedSequence(raiz.entropy, spawn_key=raiz.spawn_key + (indice,))
+
+
+def _ejecutar_bloque(motor, raiz, indice, n, metodo='simple', pacientes=False):
+    """Trabajo de un proceso: estadísticas por día (y filas de pacientes
+    solo si se exportan, nunca objetos Paciente)"""
+    return MOTORES[motor](semilla_bloque(raiz, indice), n, metodo, pacientes)
+
+
+def intervalo_confianza(valores, metodo='simple', controles=None, confianza=0.95):
+    """Media de `valores` (uno por réplica) con su intervalo de confianza.
+
+    Con 'antiteticas' cada par de días consecutivos cuenta como una sola
+    observación. Con `controles` (matriz de variables de control centradas,
+    ver muestreo.controles_dias) la media se corrige por regresión: es la
+    ordenada al origen del ajuste de los valores contra los controles. Con
+    'lhs' se usa la varianza de réplicas independientes, que para el
+    hipercubo latino es una cota conservadora.
+    """
+    y = np.asarray(valores, dtype=float)
+    c = None if controles is None else np.asarray(controles, dtype=float).reshape(len(y), -1)
+    if metodo == 'antiteticas':
+        y = (y[0::2] + y[1::2]) / 2
+        c = None if c is None else (c[0::2] + c[1::2]) / 2
+    n = len(y)
+    if c is None:
+        media = float(y.mean())
+        varianza = float(y.var(ddof=1)) if n > 1 else np.inf
+    else:
+        x = np.column_stack([np.ones(n), c])
+        coef, *_ = np.linalg.lstsq(x, y, rcond=None)
+        media = float(coef[0])
+        grados = n - x.shape[1]
+        varianza = float(((y - x @ coef) ** 2).sum() / grados) if grados > 0 else np.inf
+    from statistics import NormalDist
+    z = NormalDist().inv_cdf((1 + confianza) / 2)
+    return {
+        'media': media,
+        'semiancho': float(z * np.sqrt(varianza / n)),
+        'replicas': len(valores),
+        'confianza': confianza,
+    }
+
+
+class ResultadoMontecarlo:
+    """Estadísticas por réplica, completadas a medida que llegan los bloques.
+
+    Los acumuladores de cada bloque se combinan apenas se puede respetando el
+    orden de los bloques, así que `acumulador` también es idéntico bit a bit
+    para cualquier cantidad de trabajadores.
+    """
+
+    def __init__(self, n_replicas, motor, entropia, metodo='simple'):
+        self.n_replicas = n_replicas
+        self.motor = motor
+        self.entropia = entropia  # permite repetir la corrida exacta
+        self.metodo = metodo
+        self.completadas = 0
+        self.bloques_en_cache = 0
+        self.interrumpida = False  # Ctrl-C: solo están los bloques que llegaron
+        self.dias = {campo: np.full(n_replicas, np.nan) for campo in CAMPOS}
+        self.dias['estudios_por_tipo'] = np.zeros((n_replicas, len(TIPOS)), dtype=np.int64)
+        self.dias['control'] = np.full((n_replicas, len(CONTROLES)), np.nan)
+        self.acumulador = AcumuladorEstadisticas()
+        self._pendientes = {}
+        self._proximo_bloque = 0
+
+    def agregar(self, indice, inicio, parcial, acumulador):
+        """Copia un bloque en su lugar; el orden de llegada no cambia el resultado"""
+        n = len(parcial['total_pacientes'])
+        for campo, valores in parcial.items():
+            self.dias[campo][inicio:inicio + n] = valores
+        self.completadas += n
+
+        self._pendientes[indice] = acumulador
+        while self._proximo_bloque in self._pendientes:
+            self.acumulador.combinar(self._pendientes.pop(self._proximo_bloque))
+            self._proximo_bloque += 1
+
+    def interrumpir(self):
+        """Marca la corrida como parcial y combina los acumuladores que
+        quedaron esperando un bloque que no va a llegar"""
+        self.interrumpida = True
+        for indice in sorted(self._pendientes):
+            self.acumulador.combinar(self._pendientes.pop(indice))
+
+    def completos(self):
+        """Máscara de las réplicas que ya están (todas salvo en una corrida interrumpida)"""
+        return ~np.isnan(self.dias['total_pacientes'])
+
+    def intervalo(self, campo='hora_finalizacion_min', control=False, confianza=0.95):
+        """Intervalo de confianza de la media de `campo` (ver intervalo_confianza)"""
+        m = self.completos()
+        return intervalo_confianza(self.dias[campo][m], self.metodo,
+                                   self.dias['control'][m] if control else None, confianza)
+
+    def resumen(self):
+        """Media, desvío y percentiles de cada campo entre réplicas"""
+        salida = {}
+        m = self.completos()
+        for campo in CAMPOS:
+            v = self.dias[campo][m]
+            p5, p50, p95 = np.percentile(v, [5, 50, 95])
+            salida[campo] = {
+                'media': float(v.mean()),
+                'desvio': float(v.std(ddof=1)) if len(v) > 1 else 0.0,
+                'p5': float(p5), 'p50': float(p50), 'p95': float(p95),
+            }
+        salida['estudios_por_tipo'] = dict(zip(TIPOS, self.dias['estudios_por_tipo'][m].mean(axis=0).tolist()))
+        # Horas extras con el fin simulado, como en optimizador y horizonte
+        salida['prob_horas_extras'] = float((self.dias['fin_real_min'][m] > JORNADA_MIN).mean())
+        return salida
+
+
+def _validar(motor, metodo, tam_bloque):
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor} (opciones: {', '.join(MOTORES)})")
+    if motor == 'recursivo':
+        from motor_recursivo import verificar_capacidades
+        verificar_capacidades()
+    if metodo not in METODOS_MUESTREO:
+        raise ValueError(f"Método desconocido: {metodo} (opciones: {', '.join(METODOS_MUESTREO)})")
+    if metodo == 'antiteticas' and tam_bloque % 2:
+        raise ValueError("Con variables antitéticas el tamaño de bloque tiene que ser par")
+
+
+def _bloques_calculados(bloques, motor, raiz, metodo, trabajadores, cache, tam_bloque,
+                        pacientes=False):
+    """(indice, inicio, parcial, acumulador, de_cache) de cada bloque, en
+    orden de llegada: primero los que están en la caché, después los que se
+    simulan"""
+    clave = None
+    if cache:
+        from cache_resultados import CacheResultados, clave_escenario
+        if cache is True:
+            cache = CacheResultados()
+        clave = clave_escenario(motor, raiz, tam_bloque, metodo)
+        faltantes = []
+        for i, inicio, n in bloques:
+            guardado = cache.leer(clave, i, n)
+            if guardado is None:
+                faltantes.append((i, inicio, n))
+            else:
+                yield (i, inicio, *guardado, True)
+        bloques = faltantes
+
+    def calculado(i, inicio, parcial, acumulador):
+        if clave is not None:
+            cache.guardar(clave, i, len(parcial['total_pacientes']), parcial, acumulador)
+        return i, inicio, parcial, acumulador, False
+
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    trabajadores = min(trabajadores, len(bloques))
+
+    if trabajadores <= 1:
+        for i, inicio, n in bloques:
+            yield calculado(i, inicio, *_ejecutar_bloque(motor, raiz, i, n, metodo, pacientes))
+        return
+
+    # multiprocessing se importa solo si de verdad se reparte en procesos.
+    # Los procesos nuevos (spawn) importan config.py sin los cambios de un
+    # escenario aplicados en este: se les pasan los parámetros vigentes
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from cache_resultados import parametros_escenario
+    with ProcessPoolExecutor(trabajadores, initializer=_iniciar_trabajador,
+                             initargs=(parametros_escenario(),)) as ejecutor:
+        futuros = {ejecutor.submit(_ejecutar_bloque, motor, raiz, i, n, metodo, pacientes): (i, inicio)
+                   for i, inicio, n in bloques}
+        entregados = set()
+        try:
+            for futuro in as_completed(futuros):
+                entregados.add(futuro)
+                yield calculado(*futuros[futuro], *futuro.result())
+        except KeyboardInterrupt:
+            # Ctrl-C: se descartan los bloques que no empezaron y se esperan
+            # los que están corriendo, que también se devuelven
+            for futuro in futuros:
+                futuro.cancel()
+            for futuro in futuros:
+                if futuro not in entregados and not futuro.cancelled() and futuro.exception() is None:
+                    yield calculado(*futuros[futuro], *futuro.result())
+            raise
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
+
+
+def _iniciar_trabajador(parametros):
+    """Deja config.py de un proceso de trabajo como el del principal
+    (`parametros`: ver cache_resultados.parametros_escenario). Los procesos
+    de trabajo no reciben Ctrl-C: lo atiende el principal"""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for nombre, valor in parametros.items():
+        setattr(config, nombre, valor)
+
+
+def ejecutar_montecarlo(n_replicas, motor='vectorizado', semilla=None, trabajadores=None,
+                        tam_bloque=TAM_BLOQUE, cache=None, metodo='simple', progreso=None,
+                        exportar=None):
+    """Corre `n_replicas` días del escenario actual repartidos en procesos.
+
+    Cada bloque de `tam_bloque` réplicas recibe un hijo propio de
+    SeedSequence(semilla), así que el resultado es el mismo para cualquier
+    `trabajadores`. Con trabajadores=1 se corre en el proceso actual.
+
+    Con `cache` (True para la caché por defecto o un CacheResultados) y una
+    semilla fija, los bloques ya calculados para este escenario se leen de
+    disco y solo se simulan los que faltan.
+
+    `metodo` es el muestreo de cada bloque ('simple', 'antiteticas' o 'lhs',
+    ver muestreo._uniformes).
+
+    `progreso(completadas, n_replicas)` se llama después de cada bloque. Con
+    Ctrl-C se devuelve lo calculado hasta ahí, con resultado.interrumpida.
+
+    `exportar` (un exportacion.EscritorColumnar) recibe las filas de todos
+    los pacientes, en orden de réplica. Exportando no se usa la caché: los
+    bloques guardados no tienen pacientes.
+    """
+    _validar(motor, metodo, tam_bloque)
+    if metodo == 'antiteticas' and n_replicas % 2:
+        raise ValueError("Con variables antitéticas la cantidad de réplicas tiene que ser par")
+
+    raiz = np.random.SeedSequence(semilla)
+    resultado = ResultadoMontecarlo(n_replicas, motor, raiz.entropy, metodo)
+    bloques = [(i, inicio, min(tam_bloque, n_replicas - inicio))
+               for i, inicio in enumerate(range(0, n_replicas, tam_bloque))]
+    # Sin semilla la corrida no se repite: no tiene sentido guardarla
+    if semilla is None or exportar is not None:
+        cache = None
+
+    # Los bloques llegan en cualquier orden; los pacientes se escriben en
+    # orden de bloque (esperan a lo sumo lo que tardan los bloques en curso)
+    por_exportar = {}
+    proximo = 0
+    calculados = _bloques_calculados(bloques, motor, raiz, metodo, trabajadores, cache, tam_bloque,
+                                     pacientes=exportar is not None)
+    try:
+        for *bloque, de_cache in calculados:
+            if exportar is not None:
+                i, inicio, parcial, _ = bloque
+                filas = parcial.pop('pacientes')
+                filas['replica'] += inicio
+                por_exportar[i] = filas
+                while proximo in por_exportar:
+                    exportar.escribir(por_exportar.pop(proximo))
+                    proximo += 1
+            resultado.agregar(*bloque)
+            resultado.bloques_en_cache += de_cache
+            if progreso is not None:
+                progreso(resultado.completadas, n_replicas)
+    except KeyboardInterrupt:
+        calculados.close()
+        resultado.interrumpir()
+        for i in sorted(por_exportar):
+            exportar.escribir(por_exportar.pop(i))
+    return resultado
+
+
+def ejecutar_hasta_precision(semiancho, campo='hora_finalizacion_min', motor='vectorizado',
+                             semilla=None, metodo='simple', control=False, confianza=0.95,
+                             max_replicas=200_000, trabajadores=None, tam_bloque=TAM_BLOQUE,
+                             cache=None):
+    """Agrega bloques de réplicas hasta que el intervalo de confianza de la
+    media de `campo` tenga a lo sumo `semiancho` minutos (o hasta
+    `max_replicas`).
+
+    El criterio se evalúa bloque por bloque en orden, así que la cantidad de
+    réplicas y el resultado no dependen de `trabajadores`: los bloques que
+    se hayan calculado de más en la última tanda se descartan. El intervalo
+    final queda en resultado.intervalo_final.
+    """
+    _validar(motor, metodo, tam_bloque)
+    if metodo == 'antiteticas' and max_replicas % 2:
+        raise ValueError("Con variables antitéticas la cantidad de réplicas tiene que ser par")
+    raiz = np.random.SeedSequence(semilla)
+    if semilla is None:
+        cache = None
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    tanda = max(1, trabajadores)
+
+    calculados = {}
+    valores, controles = [], []
+    intervalo = None
+    proximo = 0
+    while True:
+        inicio = proximo * tam_bloque
+        if inicio >= max_replicas:
+            break
+        bloques = [(i, i * tam_bloque, min(tam_bloque, max_replicas - i * tam_bloque))
+                   for i in range(proximo, proximo + tanda) if i * tam_bloque < max_replicas]
+        for i, _, parcial, acumulador, _ in _bloques_calculados(bloques, motor, raiz, metodo,
+                                                             trabajadores, cache, tam_bloque):
+            calculados[i] = (parcial, acumulador)
+        # Criterio de corte en orden de bloque
+        for i, _, _ in bloques:
+            parcial = calculados[i][0]
+            valores.append(parcial[campo])
+            controles.append(parcial['control'])
+            proximo = i + 1
+            intervalo = intervalo_confianza(np.concatenate(valores), metodo,
+                                            np.concatenate(controles) if control else None, confianza)
+            if intervalo['semiancho'] <= semiancho:
+                break
+        if intervalo['semiancho'] <= semiancho:
+            break
+
+    n_replicas = min(proximo * tam_bloque, max_replicas)
+    resultado = ResultadoMontecarlo(n_replicas, motor, raiz.entropy, metodo)
+    for i in range(proximo):
+        resultado.agregar(i, i * tam_bloque, *calculados[i])
+    resultado.intervalo_final = intervalo
+    return resultado
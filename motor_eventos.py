@@ -0,0 +1,193 @@
+"""Motor de eventos discretos V3.2 - Simulación sin ventana (sin pygame)"""
+import heapq
+from datetime import datetime, timedelta
+import config
+from simulacion import generar_agenda_flexible, calcular_estadisticas_dia
+from registro import RegistroPacientes
+from estadisticas import EstadisticasDia
+from recursos import PoolRecursos
+from llegadas import CalendarioLlegadas
+
+# Tipos de evento (el número desempata eventos simultáneos)
+LLEGADA = 0
+FIN_VALIDACION = 1
+FIN_BOX = 2
+FIN_RESONADOR = 3
+FIN_SALIDA = 4
+
+
+class SimuladorEventos:
+    """Simulador de eventos discretos con calendario en heap.
+
+    Salta de un evento al siguiente en lugar de avanzar el reloj cuadro a
+    cuadro. Cada decisión (próximo evento, puesto libre, próximo de la cola)
+    es una operación de heap, O(log n). Usa los mismos tiempos de Paciente y las mismas reglas de paso que
+    SimuladorResonador._procesar_llegadas y _gestionar_flujo, pero sin
+    animaciones ni tiempos visuales mínimos: los traslados duran
+    config.TIEMPO_CAMINO_VESTUARIO y config.TIEMPO_CAMINO_SALIDA.
+    """
+
+    def __init__(self, pacientes=None, fecha_inicio=None, rng=None, cierre=None):
+        if fecha_inicio is None:
+            fecha_inicio = datetime.now().replace(hour=config.HORA_INICIO, minute=0, second=0, microsecond=0)
+        self.fecha_inicio = fecha_inicio
+        self.tiempo_actual = 0.0
+        # Minuto desde el que no empieza ningún estudio más (None = sin
+        # cierre): los que no llegaron al resonador quedan donde están
+        self.cierre = cierre
+
+        if pacientes is None:
+            pacientes = generar_agenda_flexible(self.fecha_inicio, rng=rng)
+        # Heap por hora de llegada real: admite sobreturnos a mitad del día
+        self.pacientes_programados = CalendarioLlegadas(pacientes)
+
+        self.sala = PoolRecursos(config.CAPACIDAD_SALA_ESPERA)
+        self.mesas = PoolRecursos(config.CAPACIDAD_MESAS)
+        self.boxes = PoolRecursos(config.CAPACIDAD_BOXES)
+        self.resonadores = PoolRecursos(config.CAPACIDAD_RESONADORES)
+        self.pacientes_saliendo = []
+        self.pacientes_completados = RegistroPacientes()
+        self.estadisticas = EstadisticasDia()  # se actualiza en cada completado
+
+        self.finalizada = False
+
+        self._eventos = []
+        self._secuencia = 0
+        self._llegada_agendada = None  # minuto del evento LLEGADA pendiente
+        self._iniciada = False
+
+    def _agendar(self, tiempo, tipo, paciente):
+        heapq.heappush(self._eventos, (tiempo, tipo, self._secuencia, paciente))
+        self._secuencia += 1
+
+    def ejecutar(self, hasta=None):
+        """Procesa eventos hasta vaciar el calendario (o hasta el minuto `hasta`)"""
+        if not self._iniciada:
+            self._iniciada = True
+            self._despachar()
+
+        eventos = self._eventos
+        while eventos:
+            if hasta is not None and eventos[0][0] > hasta:
+                self.tiempo_actual = hasta
+                return self.pacientes_completados
+            tiempo, tipo, _, p = heapq.heappop(eventos)
+            self.tiempo_actual = tiempo
+            self._procesar_evento(tipo, p)
+            self._despachar()
+
+        self.finalizada = not self.pacientes_programados
+        return self.pacientes_completados
+
+    def _procesar_evento(self, tipo, p):
+        t = self.tiempo_actual
+        if tipo == LLEGADA:
+            if self._llegada_agendada is not None and t >= self._llegada_agendada:
+                self._llegada_agendada = None
+        elif tipo == FIN_VALIDACION:
+            self.mesas.encolar_listo(p)
+        elif tipo == FIN_BOX:
+            self.boxes.encolar_listo(p)
+        elif tipo == FIN_RESONADOR:
+            # Resonador → SALIDA (no depende de ningún recurso libre)
+            self.resonadores.liberar(p)
+            p.cambiar_estado('SALIENDO', t)
+            p.ts_fin = self.fecha_inicio + timedelta(minutes=t)
+            p.tiempo_total = t - p.marcas['LLEGADA']
+            self.pacientes_saliendo.append(p)
+            self._agendar(t + config.TIEMPO_CAMINO_SALIDA + p.tiempo_salida, FIN_SALIDA, p)
+        elif tipo == FIN_SALIDA:
+            self.pacientes_saliendo.remove(p)
+            p.cambiar_estado('COMPLETADO', t)
+            self.pacientes_completados.agregar(p)
+            self.estadisticas.registrar(p)
+
+    def _despachar(self):
+        """Aplica las reglas de paso hasta que no se pueda mover a nadie más"""
+        t = self.tiempo_actual
+        movio = True
+        while movio:
+            movio = False
+
+            # Box → Resonador
+            while (self.boxes.hay_listos() and self.resonadores.hay_lugar() and
+                   (self.cierre is None or t < self.cierre)):
+                p = self.boxes.sacar_listo()
+                self.resonadores.ocupar(p)
+                p.cambiar_estado('RESONADOR', t)
+                self._agendar(t + p.tiempo_total_resonador, FIN_RESONADOR, p)
+                movio = True
+
+            # Mesa → Box
+            while self.mesas.hay_listos() and self.boxes.hay_lugar():
+                p = self.mesas.sacar_listo()
+                self.boxes.ocupar(p)
+                p.cambiar_estado('BOX', t)
+                self._agendar(t + config.TIEMPO_CAMINO_VESTUARIO + p.tiempo_box, FIN_BOX, p)
+                movio = True
+
+            # Sala → Mesa (en la sala se está listo apenas se llega)
+            while self.sala.hay_listos() and self.mesas.hay_lugar():
+                p = self.sala.sacar_listo()
+                self.mesas.ocupar(p)
+                p.cambiar_estado('VALIDACION', t)
+                self._agendar(t + p.tiempo_validacion, FIN_VALIDACION, p)
+                movio = True
+
+            if self._procesar_llegadas():
+                movio = True
+
+    def _procesar_llegadas(self):
+        """Misma regla que el simulador por cuadros: llega el siguiente cuando
+        hay alguien EN el resonador o cuando el circuito está vacío"""
+        if not self.pacientes_programados:
+            return False
+
+        # RESTRICCIÓN 1: sala de espera llena
+        if not self.sala.hay_lugar():
+            return False
+
+        # RESTRICCIÓN 2: alguien en el resonador o circuito vacío. A diferencia
+        # del simulador por cuadros no se exige que no haya completados: si el
+        # circuito se vacía a mitad del día el siguiente paciente igual entra.
+        sistema_vacio = (not self.mesas.ocupados and
+                        not self.boxes.ocupados and
+                        not self.resonadores.ocupados and
+                        not self.pacientes_saliendo)
+        if not sistema_vacio and not self.resonadores.ocupados:
+            return False
+
+        proximo = self.pacientes_programados.proximo()
+        if self.tiempo_actual >= proximo.hora_llegada_real:
+            self.pacientes_programados.sacar()
+            proximo.cambiar_estado('LLEGADA', self.tiempo_actual)
+            proximo.ts_inicio = self.fecha_inicio + timedelta(minutes=self.tiempo_actual)
+            self.sala.ocupar(proximo)
+            self.sala.encolar_listo(proximo)
+            return True
+
+        # Un sobreturno puede llegar antes que el evento ya agendado
+        if self._llegada_agendada is None or proximo.hora_llegada_real < self._llegada_agendada:
+            self._llegada_agendada = proximo.hora_llegada_real
+            self._agendar(proximo.hora_llegada_real, LLEGADA, proximo)
+        return False
+
+    def agregar_paciente(self, p):
+        """Suma un paciente que no estaba en la agenda (sobreturno o sin
+        turno); se puede llamar entre dos ejecutar(hasta=...)"""
+        self.pacientes_programados.agregar(p)
+        self.finalizada = False
+        if self._iniciada:
+            self._despachar()
+
+    def obtener_estadisticas_dia(self, pacientes=None):
+        if pacientes is None:
+            return self.estadisticas.como_dict()
+        return calcular_estadisticas_dia(pacientes)
+
+
+def simular_dia(pacientes=None, rng=None):
+    """Simula un día completo sin ventana y devuelve sus estadísticas"""
+    sim = SimuladorEventos(pacientes, rng=rng)
+    sim.ejecutar()
+    return sim.obtener_estadisticas_dia()
@@ -0,0 +1,111 @@
+"""Motor recursivo - tiempos de cada etapa por recursión (Lindley), vectorizado entre días
+
+Con un puesto por etapa la mesa, el box y el resonador forman una línea en
+tándem con bloqueo después del servicio: nadie se adelanta, así que el
+minuto en que cada paciente entra a cada etapa sale de los del paciente
+anterior, sin calendario de eventos:
+
+    mesa       M[i] = max(A[i], B[i-1])          (la mesa se libera cuando el anterior pasa al box)
+    box        B[i] = max(M[i] + validación, R[i-1])
+    resonador  R[i] = max(B[i] + camino + box, S[i-1])
+    salida     S[i] = R[i] + resonador,   C[i] = S[i] + camino + salida
+
+La llegada A[i] sigue la regla de SimuladorEventos._procesar_llegadas: el
+primer minuto desde max(hora de llegada, A[i-1]) con lugar en la sala en
+que el resonador está ocupado o el circuito quedó vacío. Cada paso del
+bucle es un paciente y opera sobre todos los días a la vez, con las mismas
+sumas que el motor de eventos: los minutos salen idénticos.
+"""
+import numpy as np
+import config
+from muestreo import estadisticas_dias
+
+# Minuto de entrada a cada estado (las columnas t_* de registro.DTYPE_REGISTRO)
+MARCAS = ('t_llegada', 't_validacion', 't_box', 't_resonador', 't_saliendo', 't_completado')
+
+
+def verificar_capacidades():
+    """La recursión supone un puesto por etapa (sin adelantamientos)"""
+    capacidades = {'CAPACIDAD_MESAS': config.CAPACIDAD_MESAS, 'CAPACIDAD_BOXES': config.CAPACIDAD_BOXES,
+                   'CAPACIDAD_RESONADORES': config.CAPACIDAD_RESONADORES}
+    distintas = [f"{nombre}={valor}" for nombre, valor in capacidades.items() if valor != 1]
+    if distintas:
+        raise ValueError(f"El motor recursivo necesita un puesto por etapa ({', '.join(distintas)}); "
+                         "usar el motor de eventos")
+
+
+def simular_tandem(muestras):
+    """Minuto de entrada a cada etapa de cada paciente agendado.
+
+    Devuelve un dict de arrays (n_dias, n) en orden de llegada: 'orden' es
+    la columna de la muestra de cada paciente, 'activo' marca los agendados
+    y MARCAS son los minutos (NaN donde no hay paciente).
+    """
+    verificar_capacidades()
+    agendado = muestras['agendado']
+    llegada = np.where(agendado, muestras['llegada'], np.inf)
+    # Orden del calendario de llegadas: por hora y, a igual hora, por agenda
+    orden = np.argsort(llegada, axis=1, kind='stable')
+
+    def ordenar(a):
+        return np.take_along_axis(a, orden, axis=1)
+
+    r = ordenar(llegada)
+    validacion, box = ordenar(muestras['validacion']), ordenar(muestras['box'])
+    resonador, salida = ordenar(muestras['resonador']), ordenar(muestras['salida'])
+    n_dias, n = r.shape
+    a, m, b, rr, s, c = (np.full((n_dias, n), np.inf) for _ in MARCAS)
+
+    sala = config.CAPACIDAD_SALA_ESPERA
+    # Quien puede estar en el resonador cuando llega i: los de la sala, la
+    # mesa y el box delante de él, y uno más
+    ventana = sala + 4
+    menos_inf = np.full(n_dias, -np.inf)
+    a_ant = np.zeros(n_dias)  # el motor de eventos arranca en el minuto 0
+    b_ant, r_ant, s_ant, fin_max = menos_inf, menos_inf, menos_inf, menos_inf
+    for i in range(n):
+        desde = np.maximum(r[:, i], a_ant)
+        if i >= sala:
+            desde = np.maximum(desde, m[:, i - sala])  # lugar en la sala
+        lo = max(0, i - ventana)
+        inicios, fines = rr[:, lo:i], s[:, lo:i]
+        d = desde[:, None]
+        ocupado = ((inicios <= d) & (d < fines)).any(axis=1)
+        proximo_inicio = np.where(inicios > d, inicios, np.inf).min(axis=1, initial=np.inf)
+        a[:, i] = np.where(ocupado | (desde >= fin_max), desde, np.minimum(proximo_inicio, fin_max))
+        m[:, i] = np.maximum(a[:, i], b_ant)
+        b[:, i] = np.maximum(m[:, i] + validacion[:, i], r_ant)
+        rr[:, i] = np.maximum(b[:, i] + config.TIEMPO_CAMINO_VESTUARIO + box[:, i], s_ant)
+        s[:, i] = rr[:, i] + resonador[:, i]
+        c[:, i] = s[:, i] + config.TIEMPO_CAMINO_SALIDA + salida[:, i]
+        a_ant, b_ant, r_ant, s_ant = a[:, i], b[:, i], rr[:, i], s[:, i]
+        fin_max = np.maximum(fin_max, c[:, i])
+
+    activo = ordenar(agendado)
+    tiempos = {'orden': orden, 'activo': activo}
+    for nombre, valores in zip(MARCAS, (a, m, b, rr, s, c)):
+        tiempos[nombre] = np.where(activo, valores, np.nan)
+    return tiempos
+
+
+def orden_completados(tiempos):
+    """Índices (en orden de llegada) de cada día ordenados por minuto de
+    fin: el orden en que el motor de eventos registra a los completados"""
+    fin = np.where(tiempos['activo'], tiempos['t_completado'], np.inf)
+    return np.argsort(fin, axis=1, kind='stable')
+
+
+def estadisticas_tandem(muestras, tiempos):
+    """Como muestreo.estadisticas_dias, pero el último turno y la hora de
+    finalización son los del último paciente en terminar (como en
+    EstadisticasDia), no los del último de la agenda. fin_real_min es el
+    minuto simulado en que termina"""
+    dias = estadisticas_dias(muestras)
+    ultimo_activo = tiempos['activo'].sum(axis=1) - 1
+    filas = np.arange(len(ultimo_activo))
+    ultimo = tiempos['orden'][filas, orden_completados(tiempos)[filas, ultimo_activo]]
+    circuito = np.abs(muestras['desvio']) + muestras['servicio']
+    dias['ultimo_turno_min'] = muestras['turno'][filas, ultimo]
+    dias['hora_finalizacion_min'] = muestras['llegada'][filas, ultimo] + circuito[filas, ultimo]
+    dias['fin_real_min'] = np.where(tiempos['activo'], tiempos['t_completado'], 0.0).max(axis=1)
+    return dias
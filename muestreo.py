@@ -0,0 +1,239 @@
+"""Muestreo vectorizado de días completos (reemplaza simular_dia_completo_rapido)"""
+import math
+import numpy as np
+import config
+
+TIPOS = list(config.TIPOS_ESTUDIO)
+
+
+def min_a_hora(minutos, hora_inicio=None):
+    """Convierte minutos desde la apertura (por defecto HORA_INICIO) a texto HH:MM"""
+    if hora_inicio is None:
+        hora_inicio = config.HORA_INICIO
+    horas = hora_inicio + int(minutos // 60)
+    mins = int(minutos % 60)
+    return f"{horas:02d}:{mins:02d}"
+
+
+def _tablas_estudio():
+    """Probabilidad acumulada y rangos de scan/posicionamiento por tipo"""
+    prob_acum = np.cumsum([config.TIPOS_ESTUDIO[t]['probabilidad'] for t in TIPOS])
+    scan = np.array([config.TIPOS_ESTUDIO[t]['tiempo_scan'] for t in TIPOS], dtype=float)
+    pos = np.array([config.TIPOS_ESTUDIO[t]['tiempo_posicionamiento'] for t in TIPOS], dtype=float)
+    return prob_acum, scan, pos
+
+
+def max_pacientes_dia(limite_turnos=None):
+    """Cota superior de pacientes por día (todos con el servicio más corto,
+    en cada resonador)"""
+    if limite_turnos is None:
+        limite_turnos = config.LIMITE_TURNOS
+    return max(1, math.ceil(limite_turnos / servicio_minimo())) * config.CAPACIDAD_RESONADORES
+
+
+def servicio_minimo():
+    """Tiempo de servicio más corto posible (cada etapa en su mínimo)"""
+    return (
+        config.TIEMPO_VALIDACION[0] +
+        config.TIEMPO_CAMINO_VESTUARIO +
+        config.TIEMPO_BOX[0] +
+        min(d['tiempo_scan'][0] + d['tiempo_posicionamiento'][0] for d in config.TIPOS_ESTUDIO.values()) +
+        config.TIEMPO_CAMINO_SALIDA +
+        config.TIEMPO_SALIDA[0]
+    )
+
+
+def asignar_turnos(servicio, resonadores=None):
+    """Grilla flexible: cada turno es cuando se libera el primer resonador.
+    
+    Con un resonador es la suma de los servicios anteriores. Con varios, la
+    agenda se llena en orden asignando cada paciente al resonador que queda
+    libre antes (vectorizado entre días, un paso por paciente).
+    """
+    resonadores = resonadores or config.CAPACIDAD_RESONADORES
+    if resonadores == 1:
+        return np.cumsum(servicio, axis=1) - servicio
+    
+    n_dias, n = servicio.shape
+    libre = np.zeros((n_dias, resonadores))
+    turno = np.empty_like(servicio)
+    dias = np.arange(n_dias)
+    for i in range(n):
+        r = libre.argmin(axis=1)
+        turno[:, i] = libre[dias, r]
+        libre[dias, r] += servicio[:, i]
+    return turno
+
+
+# Variables aleatorias uniformes que usa cada paciente, en el orden en que
+# se sortean (cada una es un array de forma (n_dias, pacientes_por_dia))
+UNIFORMES = ('llegada', 'tarde', 'validacion', 'box', 'tipo', 'scan', 'posicionamiento', 'salida')
+
+METODOS_MUESTREO = ('simple', 'antiteticas', 'lhs')
+
+
+def _uniformes(rng, forma, metodo='simple'):
+    """Array (len(UNIFORMES), *forma) de uniformes en [0, 1).
+
+      'simple'       independientes (mismo flujo que antes de existir metodo)
+      'antiteticas'  el día 2k+1 usa 1 - u del día 2k (n_dias par)
+      'lhs'          hipercubo latino entre días: para cada paciente y cada
+                     variable, los n_dias valores caen uno en cada estrato
+                     [j/n_dias, (j+1)/n_dias)
+    """
+    k = len(UNIFORMES)
+    n_dias, n = forma
+    if metodo == 'simple':
+        return rng.random((k,) + forma)
+    if metodo == 'antiteticas':
+        if n_dias % 2:
+            raise ValueError(f"Las variables antitéticas van de a pares: n_dias={n_dias} es impar")
+        u = np.empty((k,) + forma)
+        u[:, 0::2] = rng.random((k, n_dias // 2, n))
+        u[:, 1::2] = 1.0 - u[:, 0::2]
+        return u
+    if metodo == 'lhs':
+        estratos = rng.permuted(np.broadcast_to(np.arange(n_dias)[:, None], (k, n_dias, n)), axis=1)
+        return (estratos + rng.random((k,) + forma)) / n_dias
+    raise ValueError(f"Método de muestreo desconocido: {metodo} (opciones: {', '.join(METODOS_MUESTREO)})")
+
+
+def muestrear_dias(n_dias, rng=None, pacientes_por_dia=None, metodo='simple', limite_turnos=None):
+    """Muestrea `n_dias` agendas completas de una vez.
+
+    Devuelve un dict de arrays de forma (n_dias, pacientes_por_dia) con los
+    mismos tiempos que sortea Paciente, más el turno, la hora de llegada real
+    y la máscara `agendado` que marca qué pacientes entran en la grilla de
+    cada día. `tipo` es el índice en TIPOS. Por defecto pacientes_por_dia
+    es max_pacientes_dia(). `metodo` elige cómo se sortean las uniformes
+    (ver _uniformes): las antitéticas y el hipercubo latino reducen la
+    varianza de las medias entre días. `limite_turnos` reemplaza a
+    config.LIMITE_TURNOS (días con otro horario, ver horizonte.py).
+    """
+    rng = np.random.default_rng(rng)
+    if limite_turnos is None:
+        limite_turnos = config.LIMITE_TURNOS
+    forma = (n_dias, pacientes_por_dia or max_pacientes_dia(limite_turnos))
+    prob_acum, rango_scan, rango_pos = _tablas_estudio()
+    u = dict(zip(UNIFORMES, _uniformes(rng, forma, metodo)))
+
+    def uniforme(rango, nombre):
+        return rango[0] + (rango[1] - rango[0]) * u[nombre]
+
+    # Desvío de llegada: -5 (temprano), 0 (puntual) o U(5, 10) (tarde)
+    r = u['llegada']
+    desvio = np.where(r < config.PROB_LLEGADA_TEMPRANO, -5.0,
+                      np.where(r < config.PROB_LLEGADA_TEMPRANO + config.PROB_LLEGADA_PUNTUAL,
+                               0.0, uniforme((5, 10), 'tarde')))
+
+    validacion = uniforme(config.TIEMPO_VALIDACION, 'validacion')
+    box = uniforme(config.TIEMPO_BOX, 'box')
+
+    # Tipo de estudio: primer tipo cuya probabilidad acumulada alcanza r
+    tipo = np.searchsorted(prob_acum, u['tipo'], side='left')
+    tipo = np.where(tipo >= len(TIPOS), TIPOS.index('Otros'), tipo)
+
+    scan = rango_scan[tipo, 0] + (rango_scan[tipo, 1] - rango_scan[tipo, 0]) * u['scan']
+    posicionamiento = rango_pos[tipo, 0] + (rango_pos[tipo, 1] - rango_pos[tipo, 0]) * u['posicionamiento']
+    resonador = scan + posicionamiento
+    salida = uniforme(config.TIEMPO_SALIDA, 'salida')
+
+    servicio = (validacion + config.TIEMPO_CAMINO_VESTUARIO + box + resonador +
+                config.TIEMPO_CAMINO_SALIDA + salida)
+
+    # Turno de cada paciente = suma de los servicios anteriores; el corte de
+    # la agenda es el primer turno que cae fuera de LIMITE_TURNOS
+    turno = asignar_turnos(servicio)
+    agendado = turno < limite_turnos
+
+    return {
+        'desvio': desvio,
+        'validacion': validacion,
+        'box': box,
+        'tipo': tipo,
+        'scan': scan,
+        'posicionamiento': posicionamiento,
+        'resonador': resonador,
+        'salida': salida,
+        'servicio': servicio,
+        'turno': turno,
+        'llegada': turno + desvio,
+        'agendado': agendado,
+        'n_pacientes': agendado.sum(axis=1),
+    }
+
+
+def estadisticas_dias(muestras):
+    """Equivalente vectorizado de obtener_estadisticas_dia: un valor por día"""
+    agendado = muestras['agendado']
+    n = muestras['n_pacientes']
+    circuito = np.abs(muestras['desvio']) + muestras['servicio']
+
+    dias = np.arange(len(n))
+    ultimo = n - 1
+    estudios = ((muestras['tipo'][..., None] == np.arange(len(TIPOS))) & agendado[..., None]).sum(axis=1)
+
+    return {
+        'estudios_por_tipo': estudios,
+        'tiempo_promedio_total': np.where(agendado, circuito, 0.0).sum(axis=1) / n,
+        'total_pacientes': n,
+        'ultimo_turno_min': muestras['turno'][dias, ultimo],
+        'hora_finalizacion_min': muestras['llegada'][dias, ultimo] + circuito[dias, ultimo],
+    }
+
+
+# Variables de control: cantidades de cada día cuya esperanza se conoce
+CONTROLES = ('duracion_agenda', 'tardanza_ultimo')
+
+
+def servicio_esperado():
+    """Esperanza del tiempo de servicio de un paciente (sin sortear nada)"""
+    _, rango_scan, rango_pos = _tablas_estudio()
+    prob = np.array([config.TIPOS_ESTUDIO[t]['probabilidad'] for t in TIPOS])
+    prob[TIPOS.index('Otros')] += 1.0 - prob.sum()  # lo que falta para 1 cae en 'Otros'
+    return (np.mean(config.TIEMPO_VALIDACION) + config.TIEMPO_CAMINO_VESTUARIO + np.mean(config.TIEMPO_BOX) +
+            float(prob @ (rango_scan.mean(axis=1) + rango_pos.mean(axis=1))) +
+            config.TIEMPO_CAMINO_SALIDA + np.mean(config.TIEMPO_SALIDA))
+
+
+def controles_dias(muestras):
+    """Variables de control por día, ya centradas (esperanza cero).
+
+      duracion_agenda  suma de los servicios agendados menos la duración
+                       esperada de la agenda (pacientes x servicio_esperado).
+                       Que un paciente entre en la agenda depende solo de
+                       los anteriores, así que por la identidad de Wald la
+                       esperanza es cero.
+      tardanza_ultimo  lo que llega tarde el último paciente (desvío + |desvío|)
+                       menos su esperanza; el desvío no influye en la agenda.
+    """
+    agendado = muestras['agendado']
+    dias = np.arange(len(agendado))
+    ultimo = muestras['n_pacientes'] - 1
+    desvio = muestras['desvio'][dias, ultimo]
+    prob_tarde = 1.0 - config.PROB_LLEGADA_TEMPRANO - config.PROB_LLEGADA_PUNTUAL
+    return np.column_stack([
+        np.where(agendado, muestras['servicio'] - servicio_esperado(), 0.0).sum(axis=1),
+        desvio + np.abs(desvio) - 2 * prob_tarde * 7.5,
+    ])
+
+
+def estadisticas_dia(estadisticas, dia=0):
+    """Extrae un día de estadisticas_dias con el formato de obtener_estadisticas_dia"""
+    ultimo_turno_min = float(estadisticas['ultimo_turno_min'][dia])
+    hora_fin_min = float(estadisticas['hora_finalizacion_min'][dia])
+    estudios = {TIPOS[i]: int(c) for i, c in enumerate(estadisticas['estudios_por_tipo'][dia]) if c}
+    return {
+        'estudios_por_tipo': estudios,
+        'tiempo_promedio_total': float(estadisticas['tiempo_promedio_total'][dia]),
+        'total_pacientes': int(estadisticas['total_pacientes'][dia]),
+        'ultimo_turno_min': ultimo_turno_min,
+        'ultimo_turno_hora': min_a_hora(ultimo_turno_min),
+        'hora_finalizacion_min': hora_fin_min,
+        'hora_finalizacion_hora': min_a_hora(hora_fin_min)
+    }
+
+
+def simular_dia_rapido(rng=None):
+    """Un día completo muestreado, listo para la pantalla de resumen"""
+    return estadisticas_dia(estadisticas_dias(muestrear_dias(1, rng)))
@@ -0,0 +1,249 @@
+"""Optimizador de agenda - políticas de turnos evaluadas con números aleatorios comunes
+
+La agenda real no conoce el tiempo de servicio de cada paciente (la grilla
+flexible de simulacion.py sí lo usa). Una PoliticaAgenda reserva un turno de
+largo fijo según el tipo de estudio y puede sobreturnar pacientes. Cada
+política se evalúa con el motor de eventos sobre los mismos días sorteados
+(números aleatorios comunes): las diferencias entre políticas no se pierden
+en el ruido del muestreo.
+"""
+import math
+import os
+import numpy as np
+import config
+from muestreo import TIPOS, muestrear_dias, asignar_turnos, servicio_minimo
+from simulacion import pacientes_desde_muestra
+from motor_eventos import SimuladorEventos
+from estadisticas import JORNADA_MIN
+
+POLITICAS_POR_TAREA = 8
+SOBRETURNOS_MAX = 4  # columnas extra que se sortean por día para los sobreturnos
+
+
+class PoliticaAgenda:
+    """Turno de largo fijo por tipo de estudio más `sobreturnos` pacientes
+    agendados en turnos ya ocupados (repartidos a lo largo del día)"""
+
+    def __init__(self, turnos_por_tipo, sobreturnos=0, nombre=None):
+        if sobreturnos > SOBRETURNOS_MAX:
+            raise ValueError(f"Se admiten hasta {SOBRETURNOS_MAX} sobreturnos")
+        self.turnos_por_tipo = {tipo: float(turnos_por_tipo[tipo]) for tipo in TIPOS}
+        self.sobreturnos = sobreturnos
+        self.nombre = nombre or 'personalizada'
+
+    def __repr__(self):
+        largos = ', '.join(f"{tipo}={m:.1f}" for tipo, m in self.turnos_por_tipo.items())
+        return f"PoliticaAgenda({self.nombre}: {largos}, sobreturnos={self.sobreturnos})"
+
+    def agenda(self, tipos):
+        """Turnos de cada día para una matriz de tipos (índices en TIPOS).
+
+        Devuelve (filas, turnos) por día: qué pacientes de la muestra se
+        agendan y en qué minuto, sobreturnos incluidos.
+        """
+        largos = np.array([self.turnos_por_tipo[t] for t in TIPOS])[tipos[:, :-SOBRETURNOS_MAX]]
+        turnos = asignar_turnos(largos)
+        agendas = []
+        for dia in range(len(tipos)):
+            n = int((turnos[dia] < config.LIMITE_TURNOS).sum())
+            filas = list(range(n))
+            minutos = turnos[dia, :n].tolist()
+            # Sobreturnos: comparten turno con pacientes repartidos en el día.
+            # Usan las últimas columnas de la muestra, que la grilla nunca toca.
+            # Un día sin turnos no tiene dónde sobreturnar.
+            for j in range(self.sobreturnos if n else 0):
+                k = min(n - 1, (j + 1) * n // (self.sobreturnos + 1))
+                filas.append(tipos.shape[1] - SOBRETURNOS_MAX + j)
+                minutos.append(minutos[k])
+            agendas.append((filas, minutos))
+        return agendas
+
+
+def percentiles_servicio(percentiles, n_dias=2000, rng=0):
+    """Percentiles del tiempo de servicio de cada tipo de estudio.
+
+    Devuelve {percentil: {tipo: minutos}}.
+    """
+    m = muestrear_dias(n_dias, rng)
+    salida = {q: {} for q in percentiles}
+    for i, tipo in enumerate(TIPOS):
+        servicio = m['servicio'][m['tipo'] == i]
+        for q, valor in zip(percentiles, np.percentile(servicio, percentiles)):
+            salida[q][tipo] = float(valor)
+    return salida
+
+
+def politicas_percentil(percentiles=(50, 60, 70, 75, 80, 85, 90, 95),
+                        colchones=(0, 1, 2, 3, 5), sobreturnos=(0, 1, 2, 3)):
+    """Grilla de políticas: turno = percentil del servicio de su tipo + colchón"""
+    tablas = percentiles_servicio(percentiles)
+    politicas = []
+    for q in percentiles:
+        for colchon in colchones:
+            for extra in sobreturnos:
+                largos = {tipo: minutos + colchon for tipo, minutos in tablas[q].items()}
+                politicas.append(PoliticaAgenda(largos, extra, f"p{q}+{colchon}min/{extra}st"))
+    return politicas
+
+
+# Muestras de números aleatorios comunes ya sorteadas en este proceso
+_cache_muestras = {}
+
+
+def _muestras_comunes(semilla, n_dias):
+    """Los mismos días para todas las políticas (y en todos los procesos).
+    La clave incluye el escenario: con otro config.py son otros días"""
+    from cache_resultados import hash_parametros
+    clave = (semilla.entropy, semilla.spawn_key, n_dias, hash_parametros())
+    if clave not in _cache_muestras:
+        # Alcanza para el turno más corto posible en cada resonador
+        por_dia = (math.ceil(config.LIMITE_TURNOS / servicio_minimo()) + 1) * config.CAPACIDAD_RESONADORES
+        _cache_muestras.clear()
+        _cache_muestras[clave] = muestrear_dias(n_dias, np.random.default_rng(semilla),
+                                                pacientes_por_dia=por_dia + SOBRETURNOS_MAX)
+    return _cache_muestras[clave]
+
+
+def evaluar_dias(politica, muestras):
+    """Simula cada día de `muestras` con la agenda de `politica`.
+
+    Devuelve arrays por día: minutos de horas extras, minutos de resonador
+    ocioso dentro de la jornada y pacientes atendidos.
+    """
+    n_dias = len(muestras['tipo'])
+    horas_extras = np.zeros(n_dias)
+    ocio = np.zeros(n_dias)
+    pacientes = np.zeros(n_dias, dtype=np.int64)
+    capacidad = config.CAPACIDAD_RESONADORES * JORNADA_MIN
+    for dia, (filas, turnos) in enumerate(politica.agenda(muestras['tipo'])):
+        sim = SimuladorEventos(pacientes_desde_muestra(muestras, dia, filas, turnos))
+        sim.ejecutar()
+        f = sim.pacientes_completados.filas()
+        ocupado = (np.clip(f['t_saliendo'], 0, JORNADA_MIN) - np.clip(f['t_resonador'], 0, JORNADA_MIN)).sum()
+        horas_extras[dia] = max(0.0, float(f['t_completado'].max()) - JORNADA_MIN) if len(f) else 0.0
+        ocio[dia] = capacidad - float(ocupado)
+        pacientes[dia] = len(f)
+    return {'horas_extras': horas_extras, 'ocio': ocio, 'pacientes': pacientes}
+
+
+def costo_dias(dias):
+    return config.COSTO_MINUTO_HORA_EXTRA * dias['horas_extras'] + config.COSTO_MINUTO_OCIO * dias['ocio']
+
+
+def resumir(politica, dias):
+    costo = costo_dias(dias)
+    n = len(costo)
+    return {
+        'politica': politica,
+        'costo': float(costo.mean()),
+        'error_estandar': float(costo.std(ddof=1) / math.sqrt(n)) if n > 1 else 0.0,
+        'horas_extras': float(dias['horas_extras'].mean()),
+        'prob_horas_extras': float((dias['horas_extras'] > 0).mean()),
+        'ocio': float(dias['ocio'].mean()),
+        'pacientes': float(dias['pacientes'].mean()),
+        'costo_por_dia': costo,
+    }
+
+
+def _evaluar_tarea(politicas, semilla, n_dias):
+    """Trabajo de un proceso: un grupo de políticas sobre los días comunes"""
+    muestras = _muestras_comunes(semilla, n_dias)
+    return [resumir(p, evaluar_dias(p, muestras)) for p in politicas]
+
+
+def evaluar_politicas(politicas, n_dias=200, semilla=0, trabajadores=None):
+    """Evalúa todas las políticas sobre los mismos `n_dias` días.
+
+    Las políticas se reparten en tareas de POLITICAS_POR_TAREA entre
+    procesos; cada proceso sortea una vez los días comunes a partir de
+    `semilla`. El resultado (en el orden de `politicas`) no depende de la
+    cantidad de trabajadores.
+    """
+    semilla = semilla if isinstance(semilla, np.random.SeedSequence) else np.random.SeedSequence(semilla)
+    tareas = [politicas[i:i + POLITICAS_POR_TAREA] for i in range(0, len(politicas), POLITICAS_POR_TAREA)]
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    trabajadores = min(trabajadores, len(tareas))
+
+    resultados = [None] * len(tareas)
+    if trabajadores <= 1:
+        for i, tarea in enumerate(tareas):
+            resultados[i] = _evaluar_tarea(tarea, semilla, n_dias)
+    else:
+        # Con el config.py de este proceso (ver montecarlo._iniciar_trabajador)
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from cache_resultados import parametros_escenario
+        from montecarlo import _iniciar_trabajador
+        with ProcessPoolExecutor(trabajadores, initializer=_iniciar_trabajador,
+                                 initargs=(parametros_escenario(),)) as ejecutor:
+            futuros = {ejecutor.submit(_evaluar_tarea, tarea, semilla, n_dias): i
+                       for i, tarea in enumerate(tareas)}
+            for futuro in as_completed(futuros):
+                resultados[futuros[futuro]] = futuro.result()
+    return [r for tarea in resultados for r in tarea]
+
+
+def _vecinas(politica, paso):
+    """Políticas que difieren en ±paso minutos en un solo tipo de estudio"""
+    vecinas = []
+    for tipo in TIPOS:
+        for signo in (-1, 1):
+            largos = dict(politica.turnos_por_tipo)
+            largos[tipo] = max(servicio_minimo(), largos[tipo] + signo * paso)
+            vecinas.append(PoliticaAgenda(largos, politica.sobreturnos, f"{politica.nombre}~"))
+    return vecinas
+
+
+def optimizar_agenda(politicas=None, n_dias=200, semilla=0, trabajadores=None,
+                     pasos_refinamiento=(2.0, 1.0, 0.5)):
+    """Busca la política de menor costo esperado (horas extras + ocio).
+
+    Primero evalúa la grilla `politicas` (por defecto politicas_percentil()).
+    Después refina la mejor ajustando el turno de un tipo por vez con pasos
+    cada vez más chicos, evaluando todas las vecinas juntas con los mismos
+    días. Devuelve (mejor resultado, ranking de la grilla); si ninguna
+    vecina mejora, el mejor es ranking[0] tal cual.
+    """
+    if politicas is None:
+        politicas = politicas_percentil()
+    ranking = sorted(evaluar_politicas(politicas, n_dias, semilla, trabajadores),
+                     key=lambda r: r['costo'])
+    mejor = ranking[0]
+    for paso in pasos_refinamiento:
+        while True:
+            vecinas = evaluar_politicas(_vecinas(mejor['politica'], paso), n_dias, semilla, trabajadores)
+            candidata = min(vecinas, key=lambda r: r['costo'])
+            if candidata['costo'] >= mejor['costo']:
+                break
+            mejor = candidata
+    if mejor is not ranking[0]:
+        # Copia: la vecina no es una política del llamador, pero el nombre es de la ganadora
+        politica = mejor['politica']
+        mejor = dict(mejor, politica=PoliticaAgenda(politica.turnos_por_tipo, politica.sobreturnos,
+                                                    f"{ranking[0]['politica'].nombre} refinada"))
+    return mejor, ranking
+
+
+def diferencia_costo(a, b):
+    """Diferencia de costo medio a - b y su error estándar. Como los días
+    son comunes, el error es el de la diferencia día a día (mucho menor
+    que el de cada política por separado)."""
+    d = a['costo_por_dia'] - b['costo_por_dia']
+    return float(d.mean()), float(d.std(ddof=1) / math.sqrt(len(d))) if len(d) > 1 else 0.0
+
+
+if __name__ == "__main__":
+    import time
+    inicio = time.time()
+    mejor, ranking = optimizar_agenda()
+    print(f"Políticas evaluadas en {time.time() - inicio:.1f} s")
+    print()
+    print("Mejores de la grilla (costo = "
+          f"{config.COSTO_MINUTO_HORA_EXTRA} x horas extras + {config.COSTO_MINUTO_OCIO} x ocio):")
+    for r in ranking[:10]:
+        print(f"  {r['politica'].nombre:18s} costo {r['costo']:7.1f} ± {r['error_estandar']:4.1f}  "
+              f"extras {r['horas_extras']:5.1f} min  ocio {r['ocio']:5.1f} min  pacientes {r['pacientes']:4.1f}")
+    dif, err = diferencia_costo(mejor, ranking[0])
+    print()
+    print(mejor['politica'])
+    print(f"  costo {mejor['costo']:.1f} ({dif:+.1f} ± {err:.1f} respecto de la mejor de la grilla)")
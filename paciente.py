@@ -1,125 +1,142 @@
 """Clase Paciente V3.0"""
 import random
-import numpy as np
-from datetime import datetime
+from bisect import bisect_left
 import config
 
+_cache_estudios = {}
+
+
+def _tabla_estudios():
+    """Tipos y probabilidad acumulada de config.TIPOS_ESTUDIO (se calcula una vez)"""
+    clave = id(config.TIPOS_ESTUDIO)
+    if clave not in _cache_estudios:
+        tipos = list(config.TIPOS_ESTUDIO)
+        acum, prob_acum = 0, []
+        for datos in config.TIPOS_ESTUDIO.values():
+            acum += datos['probabilidad']
+            prob_acum.append(acum)
+        _cache_estudios.clear()
+        _cache_estudios[clave] = (tipos, prob_acum)
+    return _cache_estudios[clave]
+
+
 class Paciente:
     contador_id = 0
     
-    def __init__(self, turno_minutos, datetime_inicio):
-        Paciente.contador_id += 1
-        self.id = Paciente.contador_id
+    # Sin __dict__: con cientos de pacientes vivos el ahorro de memoria es notable
+    __slots__ = (
+        'id', 'turno', 'turno_asignado', 'estado', 'posicion', 'ruta', 'moviendo',
+        'desvio_llegada', 'tiempo_validacion', 'tiempo_box', 'tipo_estudio', 'tiempo_scan',
+        'tiempo_posicionamiento', 'tiempo_total_resonador', 'tiempo_salida', 'hora_llegada_real',
+        'ts_inicio', 'ts_fin', 'tiempo_en_etapa', 'tiempo_total', 'marcas', 'tiempo_visual_en_etapa',
+        'puesto', 'listo'
+    )
+    
+    def __init__(self, turno_minutos, datetime_inicio, rng=None, id_paciente=None, muestra=None):
+        # rng: módulo random (por defecto) o cualquier generador con
+        # uniform()/random(), p.ej. numpy.random.Generator.
+        # muestra: (desvio, validacion, box, tipo, scan, posicionamiento, salida)
+        # ya sorteados; si se pasa, no se usa rng
+        if id_paciente is None:
+            Paciente.contador_id += 1
+            id_paciente = Paciente.contador_id
+        self.id = id_paciente
         self.turno = turno_minutos
         self.turno_asignado = turno_minutos
         
-        # Estado y posición
+        # Estado y posición. El avance sobre la ruta lo lleva rutas.Movimientos:
+        # `ruta` es el id de la ruta compilada y `posicion` se actualiza al
+        # llegar o cuando se dibuja
         self.estado = 'ESPERANDO'
         self.posicion = list(config.WAYPOINTS['esperando'])
-        self.ruta = []
-        self.idx_ruta = 0
+        self.ruta = None
         self.moviendo = False
         
+        # Puesto que ocupa en su etapa actual y si ya terminó en él (ver recursos.py)
+        self.puesto = 0
+        self.listo = False
+        
+        if muestra is None:
+            self._sortear_tiempos(rng if rng is not None else random)
+        else:
+            # Fila pre-muestreada en bloque (ver muestreo.muestrear_dias)
+            (self.desvio_llegada, self.tiempo_validacion, self.tiempo_box, self.tipo_estudio,
+             self.tiempo_scan, self.tiempo_posicionamiento, self.tiempo_salida) = muestra
+        self.tiempo_total_resonador = self.tiempo_scan + self.tiempo_posicionamiento
+        
+        # Hora de llegada real (para sistema de grilla flexible)
+        self.hora_llegada_real = 0
+        
+        # Timestamps
+        self.ts_inicio = None
+        self.ts_fin = None
+        self.tiempo_en_etapa = 0
+        self.tiempo_total = 0
+        self.marcas = {}  # estado -> minuto simulado en que empezó
+        
+        # Tiempo visual (en segundos reales para visualización)
+        self.tiempo_visual_en_etapa = 0.0
+        
+    def _sortear_tiempos(self, rng):
+        """Sortea desvío, tiempos de cada etapa y tipo de estudio"""
         # Métricas - usando los nombres correctos de config.py
-        self.desvio_llegada = self._calcular_desvio()
+        self.desvio_llegada = self._calcular_desvio(rng)
         
         # TIEMPO_VALIDACION es una tupla (min, max)
         min_val, max_val = config.TIEMPO_VALIDACION
-        self.tiempo_validacion = random.uniform(min_val, max_val)
+        self.tiempo_validacion = rng.uniform(min_val, max_val)
         
         # TIEMPO_BOX es una tupla (min, max)
         min_box, max_box = config.TIEMPO_BOX
-        self.tiempo_box = random.uniform(min_box, max_box)
+        self.tiempo_box = rng.uniform(min_box, max_box)
         
         # Seleccionar tipo de estudio
-        self.tipo_estudio = self._seleccionar_estudio()
+        self.tipo_estudio = self._seleccionar_estudio(rng)
         
         # Obtener tiempos del estudio
         estudio_config = config.TIPOS_ESTUDIO[self.tipo_estudio]
         min_scan, max_scan = estudio_config['tiempo_scan']
-        self.tiempo_scan = random.uniform(min_scan, max_scan)
+        self.tiempo_scan = rng.uniform(min_scan, max_scan)
         
         min_pos, max_pos = estudio_config['tiempo_posicionamiento']
-        self.tiempo_posicionamiento = random.uniform(min_pos, max_pos)
-        
-        self.tiempo_total_resonador = self.tiempo_scan + self.tiempo_posicionamiento
+        self.tiempo_posicionamiento = rng.uniform(min_pos, max_pos)
         
         # Tiempo de salida
         min_salida, max_salida = config.TIEMPO_SALIDA
-        self.tiempo_salida = random.uniform(min_salida, max_salida)
-        
-        # Hora de llegada real (para sistema de grilla flexible)
-        self.hora_llegada_real = 0
-        
-        # Timestamps
-        self.ts_inicio = None
-        self.ts_fin = None
-        self.tiempo_en_etapa = 0
-        self.tiempo_total = 0
-        
-        # Tiempo visual (en segundos reales para visualización)
-        self.tiempo_visual_en_etapa = 0.0
-        
-    def _calcular_desvio(self):
+        self.tiempo_salida = rng.uniform(min_salida, max_salida)
+    
+    def _calcular_desvio(self, rng):
         """Calcula el desvío de llegada según probabilidades"""
-        r = random.random()
+        r = rng.random()
         if r < config.PROB_LLEGADA_TEMPRANO:
             return -5  # 20% llega 5 min temprano
         elif r < config.PROB_LLEGADA_TEMPRANO + config.PROB_LLEGADA_PUNTUAL:
             return 0   # 30% llega puntual
         else:
-            return random.uniform(5, 10)  # 50% llega 5-10 min tarde
+            return rng.uniform(5, 10)  # 50% llega 5-10 min tarde
     
-    def _seleccionar_estudio(self):
+    def _seleccionar_estudio(self, rng):
         """Selecciona tipo de estudio según probabilidades"""
-        r = random.random()
-        acum = 0
-        for tipo, datos in config.TIPOS_ESTUDIO.items():
-            acum += datos['probabilidad']
-            if r <= acum:
-                return tipo
-        return 'Otros'
+        tipos, prob_acum = _tabla_estudios()
+        i = bisect_left(prob_acum, rng.random())
+        return tipos[i] if i < len(tipos) else 'Otros'
     
-    def definir_ruta(self, waypoints):
-        """Define la ruta del paciente"""
-        self.ruta = [config.WAYPOINTS[wp] for wp in waypoints]
-        self.idx_ruta = 0
-        if self.ruta:
-            self.moviendo = True
+    def cambiar_estado(self, estado, minuto):
+        """Cambia de estado y registra el minuto simulado de la transición"""
+        self.estado = estado
+        self.marcas[estado] = minuto
     
-    def calcular_tiempo_circuito(self):
-        """Calcula el tiempo total en el circuito"""
-        tiempo_total = (
-            abs(self.desvio_llegada) +
+    def calcular_tiempo_servicio(self):
+        """Tiempo estimado de servicio (el que usa la agenda para espaciar turnos)"""
+        return (
             self.tiempo_validacion +
-            2.0 +  # Camino al vestuario
+            config.TIEMPO_CAMINO_VESTUARIO +
             self.tiempo_box +
             self.tiempo_total_resonador +
-            2.0 +  # Camino salida
+            config.TIEMPO_CAMINO_SALIDA +
             self.tiempo_salida
         )
-        return tiempo_total
     
-    def actualizar_movimiento(self, dt, multiplicador_velocidad=1.0):
-        """Actualiza el movimiento del paciente"""
-        if not self.moviendo or not self.ruta:
-            return False
-        
-        objetivo = self.ruta[self.idx_ruta]
-        dx = objetivo[0] - self.posicion[0]
-        dy = objetivo[1] - self.posicion[1]
-        dist = (dx**2 + dy**2)**0.5
-        
-        if dist < 5:
-            self.posicion = list(objetivo)
-            self.idx_ruta += 1
-            if self.idx_ruta >= len(self.ruta):
-                self.moviendo = False
-                return True
-            return False
-        
-        vel = config.VELOCIDAD_PACIENTE * multiplicador_velocidad * dt
-        factor = vel / dist
-        self.posicion[0] += dx * factor
-        self.posicion[1] += dy * factor
-        return False
+    def calcular_tiempo_circuito(self):
+        """Calcula el tiempo total en el circuito"""
+        return abs(self.desvio_llegada) + self.calcular_tiempo_servicio()
@@ -0,0 +1,74 @@
+"""Perfilador por fases - tiempos de cada etapa del paso de simulación y del dibujo
+
+Uso en el código medido (con el perfilador apagado solo cuesta un if):
+
+    medir = PERFILADOR.activo
+    if medir:
+        t = reloj()
+    ...fase...
+    if medir:
+        t = PERFILADOR.registrar('sim.llegadas', t)
+
+Se guardan las últimas config.PERFIL_VENTANA muestras de cada fase, así que
+los percentiles son de la ventana reciente (móviles).
+"""
+import json
+import time
+from collections import deque
+import numpy as np
+import config
+
+reloj = time.perf_counter_ns
+
+FASES = (
+    'sim.llegadas', 'sim.movimiento', 'sim.relojes', 'sim.flujo', 'sim.fin',
+    'dib.header', 'dib.layout', 'dib.pacientes', 'dib.metricas', 'dib.controles', 'dib.flip',
+)
+
+
+class Perfilador:
+    def __init__(self, ventana=None, activo=False):
+        self.ventana = ventana or config.PERFIL_VENTANA
+        self.activo = activo
+        self.muestras = {fase: deque(maxlen=self.ventana) for fase in FASES}
+
+    def registrar(self, fase, inicio):
+        """Anota lo que pasó desde `inicio` (ns) en `fase`; devuelve el ahora,
+        que sirve de inicio para la fase siguiente"""
+        ahora = reloj()
+        self.muestras[fase].append(ahora - inicio)
+        return ahora
+
+    def limpiar(self):
+        for muestras in self.muestras.values():
+            muestras.clear()
+
+    def resumen(self):
+        """{fase: {'n', 'p50_ms', 'p99_ms', 'media_ms', 'max_ms'}} de las fases con muestras"""
+        salida = {}
+        for fase in FASES:
+            muestras = self.muestras[fase]
+            if not muestras:
+                continue
+            ms = np.fromiter(muestras, dtype=np.float64, count=len(muestras)) / 1e6
+            p50, p99 = np.percentile(ms, [50, 99])
+            salida[fase] = {'n': len(ms), 'p50_ms': float(p50), 'p99_ms': float(p99),
+                            'media_ms': float(ms.mean()), 'max_ms': float(ms.max())}
+        return salida
+
+    def volcar(self, ruta=None):
+        """Escribe el resumen (y las muestras crudas, en ns) a un JSON"""
+        ruta = ruta or time.strftime('perfil_%Y%m%d-%H%M%S.json')
+        datos = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ventana': self.ventana,
+            'fases': self.resumen(),
+            'muestras_ns': {fase: list(m) for fase, m in self.muestras.items() if m},
+        }
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2)
+        return ruta
+
+
+# Compartido por el simulador y la ventana (un perfilador por proceso)
+PERFILADOR = Perfilador(activo=config.PERFIL_ACTIVO)
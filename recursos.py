@@ -0,0 +1,101 @@
+"""Pools de recursos con capacidad (mesas, boxes, resonadores, sala de espera)"""
+import heapq
+import config
+
+
+def desplazamiento_puesto(ruta, puesto):
+    """Corrimiento en píxeles del puesto `puesto` de la etapa a la que lleva
+    `ruta`: el 0 queda en el waypoint y los demás se alternan a cada lado"""
+    if not puesto or ruta not in config.PASO_PUESTOS:
+        return 0, 0
+    dx, dy = config.PASO_PUESTOS[ruta]
+    k = (puesto + 1) // 2 * (1 if puesto % 2 else -1)
+    return dx * k, dy * k
+
+
+class PoolRecursos:
+    """`capacidad` puestos iguales y la cola de pacientes que ya terminaron
+    en ellos y esperan lugar en la etapa siguiente (bloqueo: el paciente
+    listo sigue ocupando su puesto hasta que pasa).
+
+    Los puestos libres y la cola son heaps, así que ocupar, liberar y elegir
+    al próximo cuestan O(log n). Disciplina de la cola:
+      'FIFO'   por orden en que quedaron listos
+      'TURNO'  por turno asignado (el de turno más temprano primero)
+    Con capacidad 1 se comporta igual que los antiguos paciente_en_*.
+    """
+
+    def __init__(self, capacidad, disciplina=None):
+        if capacidad < 1:
+            raise ValueError(f"Capacidad inválida: {capacidad}")
+        disciplina = disciplina or config.DISCIPLINA_COLAS
+        if disciplina not in ('FIFO', 'TURNO'):
+            raise ValueError(f"Disciplina desconocida: {disciplina} (opciones: FIFO, TURNO)")
+        self.capacidad = capacidad
+        self.disciplina = disciplina
+        self.puestos = [None] * capacidad
+        self.ocupados = 0
+        self._libres = list(range(capacidad))  # ya es un heap
+        self._listos = []  # (clave, secuencia, paciente)
+        self._secuencia = 0
+
+    def __len__(self):
+        return self.ocupados
+
+    def hay_lugar(self):
+        return self.ocupados < self.capacidad
+
+    def ocupar(self, p, puesto=None):
+        """Ubica a `p` en el puesto libre más bajo (o en `puesto`, al reproducir una traza)"""
+        if puesto is None:
+            puesto = heapq.heappop(self._libres)
+        else:
+            self._libres.remove(puesto)
+            heapq.heapify(self._libres)
+        self.puestos[puesto] = p
+        self.ocupados += 1
+        p.puesto = puesto
+        p.listo = False
+        return puesto
+
+    def liberar(self, p):
+        self.puestos[p.puesto] = None
+        self.ocupados -= 1
+        heapq.heappush(self._libres, p.puesto)
+
+    def ocupantes(self):
+        """Pacientes en orden de puesto"""
+        if self.capacidad == 1:
+            return [self.puestos[0]] if self.ocupados else []
+        return [p for p in self.puestos if p is not None]
+
+    def primero(self):
+        """Ocupante del puesto más bajo (o None)"""
+        for p in self.puestos:
+            if p is not None:
+                return p
+        return None
+
+    def encolar_listo(self, p):
+        """`p` terminó en su puesto: pasa a la cola hacia la etapa siguiente"""
+        clave = self._secuencia if self.disciplina == 'FIFO' else p.turno_asignado
+        heapq.heappush(self._listos, (clave, self._secuencia, p))
+        self._secuencia += 1
+        p.listo = True
+
+    def hay_listos(self):
+        return bool(self._listos)
+
+    def sacar_listo(self):
+        """Saca al próximo de la cola y libera su puesto"""
+        p = heapq.heappop(self._listos)[2]
+        self.liberar(p)
+        return p
+
+    def estado(self):
+        """Copia del estado interno (para keyframes)"""
+        return list(self.puestos), self.ocupados, list(self._libres), list(self._listos), self._secuencia
+
+    def restaurar(self, estado):
+        puestos, self.ocupados, libres, listos, self._secuencia = estado
+        self.puestos, self._libres, self._listos = list(puestos), list(libres), list(listos)
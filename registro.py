@@ -0,0 +1,117 @@
+"""Registro compacto de pacientes completados (una fila de ~57 bytes por paciente)"""
+import numpy as np
+import config
+from muestreo import TIPOS, min_a_hora
+
+# Duraciones sorteadas + minuto de entrada a cada estado. float32 alcanza:
+# a 40.000 minutos (4 semanas) la resolución sigue siendo menor a un segundo.
+DTYPE_REGISTRO = np.dtype([
+    ('id', np.uint32),
+    ('tipo', np.uint8),  # índice en muestreo.TIPOS
+    ('turno', np.float32),
+    ('hora_llegada', np.float32),  # turno + desvío
+    ('desvio', np.float32),
+    ('validacion', np.float32),
+    ('box', np.float32),
+    ('resonador', np.float32),  # scan + posicionamiento
+    ('salida', np.float32),
+    ('t_llegada', np.float32),
+    ('t_validacion', np.float32),
+    ('t_box', np.float32),
+    ('t_resonador', np.float32),
+    ('t_saliendo', np.float32),
+    ('t_completado', np.float32),
+])
+
+# Columna de marca para cada estado de Paciente.marcas
+_MARCAS = {
+    'LLEGADA': 't_llegada',
+    'VALIDACION': 't_validacion',
+    'BOX': 't_box',
+    'RESONADOR': 't_resonador',
+    'SALIENDO': 't_saliendo',
+    'COMPLETADO': 't_completado',
+}
+
+_INDICE_TIPO = {tipo: i for i, tipo in enumerate(TIPOS)}
+
+
+class RegistroPacientes:
+    """Pacientes COMPLETADOS colapsados en un array estructurado que crece
+    por duplicación. Reemplaza a la lista de objetos Paciente: se puede
+    consultar len() y calcular estadísticas sin mantener vivo ningún Paciente.
+    """
+
+    def __init__(self, capacidad=64):
+        self._datos = np.zeros(capacidad, dtype=DTYPE_REGISTRO)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, indice):
+        return self.filas()[indice]
+
+    def filas(self):
+        """Vista (sin copia) de las filas ocupadas"""
+        return self._datos[:self._n]
+
+    def agregar(self, p):
+        """Colapsa un Paciente completado en una fila"""
+        if self._n == len(self._datos):
+            nuevo = np.zeros(max(1, 2 * len(self._datos)), dtype=DTYPE_REGISTRO)
+            nuevo[:self._n] = self._datos
+            self._datos = nuevo
+
+        marcas = p.marcas
+        self._datos[self._n] = (
+            p.id, _INDICE_TIPO[p.tipo_estudio], p.turno_asignado, p.hora_llegada_real,
+            p.desvio_llegada, p.tiempo_validacion, p.tiempo_box, p.tiempo_total_resonador,
+            p.tiempo_salida,
+            *(marcas.get(estado, np.nan) for estado in _MARCAS),
+        )
+        self._n += 1
+
+    def truncar(self, n):
+        """Deja las primeras `n` filas (volver a un keyframe). Las siguientes
+        no se borran: como la simulación es determinista, saltar de nuevo
+        hacia adelante a un keyframe posterior las vuelve a usar tal cual."""
+        self._n = min(n, len(self._datos))
+
+    def bytes_por_paciente(self):
+        return DTYPE_REGISTRO.itemsize
+
+    def tiempos_circuito(self):
+        """Equivalente a Paciente.calcular_tiempo_circuito para cada fila"""
+        f = self.filas()
+        return (np.abs(f['desvio'].astype(float)) + f['validacion'] + config.TIEMPO_CAMINO_VESTUARIO +
+                f['box'] + f['resonador'] + config.TIEMPO_CAMINO_SALIDA + f['salida'])
+
+    def estadisticas(self):
+        """Mismo dict que calcular_estadisticas_dia, sin objetos Paciente"""
+        if not self._n:
+            return {
+                'estudios_por_tipo': {},
+                'tiempo_promedio_total': 0,
+                'total_pacientes': 0,
+                'ultimo_turno_min': 0,
+                'ultimo_turno_hora': '00:00',
+                'hora_finalizacion_min': 0,
+                'hora_finalizacion_hora': '00:00'
+            }
+
+        f = self.filas()
+        tiempos = self.tiempos_circuito()
+        conteo = np.bincount(f['tipo'], minlength=len(TIPOS))
+        ultimo_turno_min = float(f['turno'][-1])
+        hora_fin_min = float(f['hora_llegada'][-1]) + float(tiempos[-1])
+
+        return {
+            'estudios_por_tipo': {TIPOS[i]: int(c) for i, c in enumerate(conteo) if c},
+            'tiempo_promedio_total': float(tiempos.mean()),
+            'total_pacientes': self._n,
+            'ultimo_turno_min': ultimo_turno_min,
+            'ultimo_turno_hora': min_a_hora(ultimo_turno_min),
+            'hora_finalizacion_min': hora_fin_min,
+            'hora_finalizacion_hora': min_a_hora(hora_fin_min)
+        }
@@ -1,32 +1,300 @@
 """
 Generador de Resumen Ejecutivo en PDF
 ======================================
-Crea un documento PDF profesional del proyecto
+Crea el informe de un escenario a partir de una corrida Monte Carlo real:
+distribución de la hora de finalización simulada (la del último paciente en
+terminar, con las esperas), probabilidad de horas extras y estudios por
+tipo, más los parámetros del escenario tomados de config.py.
+
+    python resumen.py                                  escenario de config.py
+    python resumen.py --escenarios escenarios.json     un PDF por escenario + comparativo
+
+escenarios.json es una lista de {"nombre": ..., "config": {NOMBRE: valor}}
+con los cambios de cada escenario respecto de config.py. Los escenarios se
+reparten en procesos y el agregado de cada uno (todo lo que muestra su
+informe) se guarda en disco por hash del escenario: repetir un informe no
+vuelve a simular.
 """
 
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+import argparse
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
 from datetime import datetime
+import numpy as np
+import config
+from muestreo import TIPOS, min_a_hora
+from estadisticas import BORDES_HORAS_EXTRAS, JORNADA_MIN
+from montecarlo import MOTORES, MOTORES_SIN_COLAS, TAM_BLOQUE, ejecutar_montecarlo, intervalo_confianza
+from cache_resultados import clave_escenario, parametros_escenario
+
+ARCHIVO_RESUMEN = "Resumen_Ejecutivo_Simulacion_Resonador.pdf"
+
+# Cambia si cambia lo que guarda agregar_resultado: invalida los agregados guardados
+VERSION_INFORME = 2
+
+PERCENTILES_FIN = (5, 25, 50, 75, 95, 99)
+ANCHO_CLASE_FIN = 10  # minutos por barra del histograma de finalización
+
+CLASES_HORAS_EXTRAS = ['Sin extras', 'Hasta 15 min', '15 a 30 min', '30 a 60 min',
+                       '1 a 2 h', 'Más de 2 h']
+
+# Se leen al importar (JORNADA_MIN, muestreo.TIPOS): un escenario no puede cambiarlos
+_CAMBIOS_FIJOS = ('HORA_INICIO', 'HORA_FIN')
+
+COLOR_TITULO = '#1a5490'
+COLOR_BARRA = '#4678c8'
+COLOR_EXTRA = '#c84646'
+
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+
+@contextmanager
+def escenario_config(cambios):
+    """Aplica `cambios` ({NOMBRE: valor}) a config.py mientras dura el with"""
+    validos = parametros_escenario()
+    for nombre, valor in cambios.items():
+        if nombre not in validos:
+            raise ValueError(f"{nombre} no es un parámetro del escenario")
+        if nombre in _CAMBIOS_FIJOS:
+            raise ValueError(f"{nombre} no se puede cambiar por escenario")
+        if nombre == 'TIPOS_ESTUDIO' and list(valor) != TIPOS:
+            raise ValueError("Un escenario puede cambiar los tiempos de los estudios, no los tipos")
+    previos = {nombre: getattr(config, nombre) for nombre in cambios}
+    try:
+        for nombre, valor in cambios.items():
+            setattr(config, nombre, valor)
+        yield
+    finally:
+        for nombre, valor in previos.items():
+            setattr(config, nombre, valor)
+
+
+def leer_escenarios(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        escenarios = json.load(f)
+    for i, escenario in enumerate(escenarios):
+        escenario.setdefault('nombre', f"Escenario {i + 1}")
+        escenario.setdefault('config', {})
+    return escenarios
+
+
+def _nombre_archivo(nombre):
+    return re.sub(r'[^\w-]+', '_', nombre).strip('_') or 'escenario'
+
+
+# ============================================================================
+# AGREGADO DE RESULTADOS
+# ============================================================================
+
+def agregar_resultado(resultado, nombre='Escenario actual', cambios=None):
+    """Lo que muestra el informe, de un ResultadoMontecarlo del escenario
+    actual: tablas chicas (sin los días), listas para JSON o para otro proceso"""
+    m = resultado.completos()
+    dias = resultado.dias
+    # Fin simulado (con las esperas); con un motor sin colas es el nominal
+    fin = dias['fin_real_min'][m]
+    n = len(fin)
+
+    # Histograma en clases de ANCHO_CLASE_FIN; JORNADA_MIN siempre es un borde
+    desde = np.floor(fin.min() / ANCHO_CLASE_FIN) * ANCHO_CLASE_FIN
+    hasta = np.ceil(fin.max() / ANCHO_CLASE_FIN + 1e-9) * ANCHO_CLASE_FIN
+    bordes = np.arange(desde, hasta + ANCHO_CLASE_FIN / 2, ANCHO_CLASE_FIN)
+    conteos, _ = np.histogram(fin, bordes)
+
+    extra = fin > JORNADA_MIN
+    clases = np.searchsorted(BORDES_HORAS_EXTRAS, np.maximum(0.0, fin - JORNADA_MIN), side='left')
+    prob_extra = intervalo_confianza(extra, resultado.metodo)
+
+    estudios = dias['estudios_por_tipo'][m]
+    p5, p95 = np.percentile(estudios, [5, 95], axis=0)
+
+    return {
+        'escenario': {
+            'nombre': nombre,
+            'cambios': dict(cambios or {}),
+            'motor': resultado.motor,
+            'metodo': resultado.metodo,
+            'semilla': resultado.entropia,
+            'replicas': n,
+            'interrumpida': resultado.interrumpida,
+            'fin_nominal': resultado.motor in MOTORES_SIN_COLAS,
+        },
+        'parametros': parametros_escenario(),
+        'finalizacion': {
+            'media': intervalo_confianza(fin, resultado.metodo),
+            'desvio': float(fin.std(ddof=1)) if n > 1 else 0.0,
+            'percentiles': np.percentile(fin, PERCENTILES_FIN).tolist(),  # los de PERCENTILES_FIN
+            'bordes': bordes.tolist(),
+            'conteos': conteos.tolist(),
+        },
+        'horas_extras': {
+            'probabilidad': prob_extra,
+            'clases': np.bincount(clases, minlength=len(CLASES_HORAS_EXTRAS)).tolist(),
+            'minutos_medios': float(np.maximum(0.0, fin - JORNADA_MIN).mean()),
+        },
+        'estudios': {
+            tipo: {'media': float(estudios[:, i].mean()), 'p5': float(p5[i]), 'p95': float(p95[i])}
+            for i, tipo in enumerate(TIPOS)
+        },
+        'pacientes_por_dia': intervalo_confianza(dias['total_pacientes'][m], resultado.metodo),
+        'tiempo_circuito': float(dias['tiempo_promedio_total'][m].mean()),
+    }
+
+
+def clave_informe(n_replicas, motor, semilla, metodo='simple'):
+    """Hash del escenario actual (ver cache_resultados.clave_escenario) más
+    la cantidad de días: identifica el agregado de un informe"""
+    clave = clave_escenario(motor, np.random.SeedSequence(semilla), TAM_BLOQUE, metodo)
+    return hashlib.sha256(f"{VERSION_INFORME}-{clave}-{n_replicas}".encode()).hexdigest()
+
+
+def simular_escenario(escenario, n_replicas, motor='eventos', semilla=None, metodo='simple',
+                      trabajadores=None, directorio_cache=None):
+    """Corre el escenario ({'nombre', 'config'}) y devuelve su agregado.
+
+    Con semilla fija el agregado se guarda en `directorio_cache` por hash
+    del escenario y la próxima vez se lee de ahí sin simular (los bloques
+    de réplicas, además, quedan en la caché de resultados).
+    """
+    nombre = escenario.get('nombre', 'Escenario actual')
+    with escenario_config(escenario.get('config', {})):
+        ruta = None
+        if semilla is not None:
+            directorio_cache = directorio_cache or config.INFORME_CACHE
+            os.makedirs(directorio_cache, exist_ok=True)
+            ruta = os.path.join(directorio_cache, f"{clave_informe(n_replicas, motor, semilla, metodo)[:32]}.json")
+            try:
+                with open(ruta, encoding='utf-8') as f:
+                    agregado = json.load(f)
+            except (OSError, ValueError):
+                pass
+            else:
+                # Otro escenario con los mismos valores: mismo resultado, otro nombre
+                agregado['escenario'].update(nombre=nombre, cambios=dict(escenario.get('config', {})))
+                return agregado
+        resultado = ejecutar_montecarlo(n_replicas, motor, semilla, trabajadores,
+                                        cache=semilla is not None, metodo=metodo)
+        agregado = agregar_resultado(resultado, nombre, escenario.get('config'))
+    if ruta is not None and not resultado.interrumpida:
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(agregado, f, ensure_ascii=False)
+        os.replace(temporal, ruta)  # otro proceso nunca ve un archivo a medio escribir
+    return agregado
+
+
+# ============================================================================
+# GRÁFICOS (reportlab.graphics: vectoriales, sin dependencias extra)
+# ============================================================================
+
+def _grafico_finalizacion(agregado):
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.lib import colors
+
+    datos = agregado['finalizacion']
+    total = sum(datos['conteos'])
+    bordes = datos['bordes'][:-1]
+    paso = max(1, len(bordes) // 8)  # a lo sumo ~8 etiquetas en el eje
+
+    dibujo = Drawing(460, 220)
+    grafico = VerticalBarChart()
+    grafico.x, grafico.y, grafico.width, grafico.height = 45, 45, 400, 150
+    grafico.data = [[100 * c / total for c in datos['conteos']]]
+    grafico.barSpacing = 0
+    grafico.groupSpacing = 1
+    grafico.categoryAxis.categoryNames = [min_a_hora(b) if i % paso == 0 else ''
+                                          for i, b in enumerate(bordes)]
+    grafico.categoryAxis.labels.fontSize = 7
+    grafico.categoryAxis.labels.angle = 45
+    grafico.categoryAxis.labels.boxAnchor = 'ne'
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.labels.fontSize = 7
+    grafico.valueAxis.labelTextFormat = '%g%%'
+    grafico.bars[0].fillColor = colors.HexColor(COLOR_BARRA)
+    grafico.bars[0].strokeColor = None
+    for i, borde in enumerate(bordes):
+        if borde >= JORNADA_MIN:
+            grafico.bars[(0, i)].fillColor = colors.HexColor(COLOR_EXTRA)
+    dibujo.add(grafico)
+    dibujo.add(String(230, 205, "Días según la hora de finalización (en rojo: después de "
+                      f"{config.HORA_FIN:02d}:00)", fontSize=9, textAnchor='middle'))
+    return dibujo
+
+
+def _grafico_horas_extras(agregado):
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.lib import colors
+
+    clases = agregado['horas_extras']['clases']
+    total = sum(clases)
+
+    dibujo = Drawing(460, 200)
+    grafico = VerticalBarChart()
+    grafico.x, grafico.y, grafico.width, grafico.height = 45, 30, 400, 145
+    grafico.data = [[100 * c / total for c in clases]]
+    grafico.categoryAxis.categoryNames = CLASES_HORAS_EXTRAS
+    grafico.categoryAxis.labels.fontSize = 7
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.labels.fontSize = 7
+    grafico.valueAxis.labelTextFormat = '%g%%'
+    grafico.bars[0].fillColor = colors.HexColor(COLOR_EXTRA)
+    grafico.bars[(0, 0)].fillColor = colors.HexColor(COLOR_BARRA)
+    grafico.barLabelFormat = '%.1f%%'
+    grafico.barLabels.fontSize = 7
+    grafico.barLabels.nudge = 6
+    dibujo.add(grafico)
+    dibujo.add(String(230, 185, "Días según las horas extras del último paciente",
+                      fontSize=9, textAnchor='middle'))
+    return dibujo
+
+
+def _grafico_estudios(agregado):
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.lib import colors
+
+    estudios = agregado['estudios']
+
+    dibujo = Drawing(460, 180)
+    grafico = HorizontalBarChart()
+    grafico.x, grafico.y, grafico.width, grafico.height = 100, 20, 340, 135
+    grafico.data = [[estudios[t]['media'] for t in reversed(TIPOS)]]
+    grafico.categoryAxis.categoryNames = list(reversed(TIPOS))
+    grafico.categoryAxis.labels.fontSize = 8
+    grafico.valueAxis.valueMin = 0
+    grafico.valueAxis.labels.fontSize = 7
+    grafico.bars[0].fillColor = colors.HexColor(COLOR_BARRA)
+    grafico.barLabelFormat = '%.2f'
+    grafico.barLabels.fontSize = 7
+    grafico.barLabels.boxAnchor = 'w'
+    grafico.barLabels.dx = 4
+    dibujo.add(grafico)
+    dibujo.add(String(230, 165, "Estudios por día según el tipo (media entre réplicas)",
+                      fontSize=9, textAnchor='middle'))
+    return dibujo
+
+
+# ============================================================================
+# PDF
+# ============================================================================
+
+def _estilos():
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
 
-def crear_resumen_ejecutivo():
-    """Crea el PDF del resumen ejecutivo"""
-    
-    # Crear documento
-    filename = "Resumen_Ejecutivo_Simulacion_Resonador.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=letter,
-                           topMargin=0.75*inch, bottomMargin=0.75*inch,
-                           leftMargin=0.75*inch, rightMargin=0.75*inch)
-    
-    # Estilos
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(
         name='CustomTitle',
         parent=styles['Heading1'],
         fontSize=24,
-        textColor=colors.HexColor('#1a5490'),
+        textColor=colors.HexColor(COLOR_TITULO),
         spaceAfter=30,
         alignment=1  # Center
     ))
@@ -34,63 +302,127 @@ def crear_resumen_ejecutivo():
         name='SectionHeader',
         parent=styles['Heading2'],
         fontSize=16,
-        textColor=colors.HexColor('#1a5490'),
+        textColor=colors.HexColor(COLOR_TITULO),
         spaceAfter=12,
         spaceBefore=12
     ))
-    
-    # Contenido
+    return styles
+
+
+def _tabla(filas, anchos, fondo='beige', alineacion='CENTER'):
+    """Tabla con el encabezado azul del informe"""
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.lib import colors
+
+    tabla = Table(filas, colWidths=anchos)
+    tabla.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(COLOR_TITULO)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), alineacion),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), getattr(colors, fondo)),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 9)
+    ]))
+    return tabla
+
+
+def _rango(valores):
+    return f"{valores[0]:g} a {valores[1]:g}"
+
+
+def crear_resumen_ejecutivo(agregado, filename=ARCHIVO_RESUMEN):
+    """Crea el PDF del resumen ejecutivo de un escenario (ver agregar_resultado)"""
+    # reportlab se carga recién acá: importar este módulo no lo necesita
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, KeepTogether
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+
+    escenario = agregado['escenario']
+    parametros = agregado['parametros']
+    fin = agregado['finalizacion']
+    extras = agregado['horas_extras']
+    pacientes = agregado['pacientes_por_dia']
+    percentiles = dict(zip(PERCENTILES_FIN, fin['percentiles']))
+
+    # Crear documento
+    doc = SimpleDocTemplate(filename, pagesize=letter,
+                           topMargin=0.75*inch, bottomMargin=0.75*inch,
+                           leftMargin=0.75*inch, rightMargin=0.75*inch)
+    styles = _estilos()
     story = []
-    
+
     # ========================================================================
     # PORTADA
     # ========================================================================
     story.append(Spacer(1, 1.5*inch))
-    
+
     title = Paragraph("SIMULACIÓN DE RESONADOR", styles['CustomTitle'])
     story.append(title)
     story.append(Spacer(1, 0.1*inch))
-    
-    subtitle = Paragraph("Análisis y Optimización del Flujo de Pacientes", 
-                        ParagraphStyle('subtitle', parent=styles['Heading3'], 
+
+    subtitle = Paragraph("Análisis y Optimización del Flujo de Pacientes",
+                        ParagraphStyle('subtitle', parent=styles['Heading3'],
                                      fontSize=14, alignment=1))
     story.append(subtitle)
-    story.append(Spacer(1, 0.5*inch))
-    
-    # Línea divisoria
-    story.append(Spacer(1, 0.3*inch))
-    
+    story.append(Spacer(1, 0.8*inch))
+
     # Info del documento
     info = Paragraph(f"<b>Fecha:</b> {datetime.now().strftime('%d de %B de %Y')}<br/>"
-                    f"<b>Versión:</b> 1.0<br/>"
+                    f"<b>Escenario:</b> {escenario['nombre']}<br/>"
+                    f"<b>Días simulados:</b> {escenario['replicas']:,}<br/>"
+                    f"<b>Motor:</b> {escenario['motor']} (muestreo {escenario['metodo']})<br/>"
+                    f"<b>Semilla:</b> {escenario['semilla']}<br/>"
                     f"<b>Tipo:</b> Resumen Ejecutivo",
                     styles['Normal'])
     story.append(info)
-    
+
     story.append(PageBreak())
-    
+
     # ========================================================================
     # RESUMEN EJECUTIVO
     # ========================================================================
     story.append(Paragraph("RESUMEN EJECUTIVO", styles['SectionHeader']))
-    
+
     texto_resumen = """
-    Este proyecto implementa una <b>simulación avanzada del flujo de pacientes</b> 
-    en el servicio de resonancia magnética de la clínica, utilizando técnicas de 
+    Este proyecto implementa una <b>simulación avanzada del flujo de pacientes</b>
+    en el servicio de resonancia magnética de la clínica, utilizando técnicas de
     <b>simulación de eventos discretos</b> y <b>análisis estadístico de Monte Carlo</b>.
-    <br/><br/>
-    La simulación permite visualizar en tiempo real el recorrido completo de cada 
-    paciente, desde su llegada hasta la finalización del estudio, midiendo métricas 
-    clave para optimizar la operación del servicio.
     """
     story.append(Paragraph(texto_resumen, styles['Normal']))
+    story.append(Spacer(1, 0.15*inch))
+
+    p = extras['probabilidad']
+    texto_cifras = f"""
+    En {escenario['replicas']:,} días simulados el último paciente termina en promedio a las
+    <b>{min_a_hora(fin['media']['media'])}</b> (±{fin['media']['semiancho']:.1f} min con 95% de
+    confianza) y en el 95% de los días antes de las <b>{min_a_hora(percentiles[95])}</b>.
+    La jornada termina a las {config.HORA_FIN:02d}:00 y hay horas extras en el
+    <b>{p['media']:.1%}</b> de los días (±{p['semiancho']:.1%}), con
+    {extras['minutos_medios']:.1f} minutos extra por día en promedio. Se atienden
+    <b>{pacientes['media']:.1f} pacientes por día</b>, que pasan {agregado['tiempo_circuito']:.1f}
+    minutos en el circuito.
+    """
+    story.append(Paragraph(texto_cifras, styles['Normal']))
+    if escenario['interrumpida']:
+        story.append(Spacer(1, 0.1*inch))
+        story.append(Paragraph("<b>Atención:</b> la corrida se interrumpió; el informe usa solo "
+                               "los días completos.", styles['Normal']))
+    if escenario['fin_nominal']:
+        story.append(Spacer(1, 0.1*inch))
+        story.append(Paragraph(f"<b>Atención:</b> el motor '{escenario['motor']}' no simula las colas: "
+                               "la hora de finalización y las horas extras son nominales (sin esperas) "
+                               "y subestiman las reales.", styles['Normal']))
     story.append(Spacer(1, 0.3*inch))
-    
+
     # ========================================================================
     # OBJETIVOS
     # ========================================================================
     story.append(Paragraph("OBJETIVOS DEL PROYECTO", styles['SectionHeader']))
-    
+
     objetivos = [
         "Modelar el flujo completo de pacientes con precisión estadística",
         "Identificar cuellos de botella y tiempos de espera innecesarios",
@@ -98,202 +430,136 @@ def crear_resumen_ejecutivo():
         "Reducir el tiempo ocioso del equipo y mejorar la rentabilidad",
         "Proporcionar datos cuantitativos para la toma de decisiones estratégicas"
     ]
-    
+
     for i, objetivo in enumerate(objetivos, 1):
         story.append(Paragraph(f"{i}. {objetivo}", styles['Normal']))
         story.append(Spacer(1, 0.1*inch))
-    
-    story.append(Spacer(1, 0.3*inch))
-    
+
+    story.append(PageBreak())
+
     # ========================================================================
-    # METODOLOGÍA
+    # RESULTADOS: HORA DE FINALIZACIÓN
     # ========================================================================
-    story.append(Paragraph("METODOLOGÍA", styles['SectionHeader']))
-    
-    texto_metodologia = """
-    <b>1. Simulación de Monte Carlo</b><br/>
-    Se iteraron 10,000 escenarios para obtener distribuciones probabilísticas 
-    realistas de todos los tiempos y eventos del sistema.
-    <br/><br/>
-    <b>2. Eventos Discretos</b><br/>
-    Cada paciente es modelado como una entidad independiente que transita por 
-    diferentes estados y recursos (mesa de atención, cambiador, resonador).
-    <br/><br/>
-    <b>3. Distribuciones Estadísticas</b><br/>
-    Se utilizan distribuciones normales para tiempos de servicio y distribuciones 
-    discretas para tipos de estudios, basadas en datos históricos reales.
-    """
-    story.append(Paragraph(texto_metodologia, styles['Normal']))
-    story.append(Spacer(1, 0.3*inch))
-    
+    titulo_fin = "HORA DE FINALIZACIÓN (NOMINAL)" if escenario['fin_nominal'] else "HORA DE FINALIZACIÓN"
+    story.append(Paragraph(titulo_fin, styles['SectionHeader']))
+
+    data_fin = [['Media'] + [f"P{q}" for q in PERCENTILES_FIN],
+                [min_a_hora(fin['media']['media'])] + [min_a_hora(v) for v in fin['percentiles']]]
+    story.append(_tabla(data_fin, [0.9*inch] * (len(PERCENTILES_FIN) + 1), fondo='lightblue'))
+    story.append(Spacer(1, 0.2*inch))
+    story.append(_grafico_finalizacion(agregado))
+    story.append(Spacer(1, 0.2*inch))
+
     # ========================================================================
-    # MÉTRICAS CLAVE
+    # RESULTADOS: HORAS EXTRAS
     # ========================================================================
-    story.append(Paragraph("MÉTRICAS MEDIDAS", styles['SectionHeader']))
-    
-    # Tabla de métricas por paciente
-    data_metricas_paciente = [
-        ['Métrica', 'Descripción'],
-        ['Tiempo de llegada', 'Desviación del turno asignado (temprano/tarde)'],
-        ['Tiempo de validación', 'Duración en mesa de atención'],
-        ['Tiempo en cambiador', 'Entrada y salida del vestuario'],
-        ['Tiempo de scan', 'Duración del estudio por tipo'],
-        ['Tiempo total', 'Desde llegada hasta salida completa']
-    ]
-    
-    tabla_paciente = Table(data_metricas_paciente, colWidths=[2*inch, 4*inch])
-    tabla_paciente.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 9)
-    ]))
-    
-    story.append(Paragraph("<b>Métricas por Paciente:</b>", styles['Normal']))
-    story.append(Spacer(1, 0.1*inch))
-    story.append(tabla_paciente)
-    story.append(Spacer(1, 0.3*inch))
-    
-    # Tabla de métricas globales
-    data_metricas_globales = [
-        ['Métrica', 'Descripción'],
-        ['Utilización del resonador', 'Porcentaje de tiempo ocupado vs. ocioso'],
-        ['Tiempo de espera promedio', 'Tiempo perdido en colas'],
-        ['Pacientes atendidos/día', 'Throughput del sistema'],
-        ['Eficiencia de turnos', 'Adherencia al horario programado']
-    ]
-    
-    tabla_global = Table(data_metricas_globales, colWidths=[2*inch, 4*inch])
-    tabla_global.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 9)
-    ]))
-    
-    story.append(Paragraph("<b>Métricas Globales del Sistema:</b>", styles['Normal']))
-    story.append(Spacer(1, 0.1*inch))
-    story.append(tabla_global)
-    
+    horas_extras = [Paragraph("HORAS EXTRAS", styles['SectionHeader'])]
+    total_dias = sum(extras['clases'])
+    data_extras = [['Horas extras', 'Días', '% de los días']]
+    data_extras += [[clase, f"{n:,}", f"{n / total_dias:.1%}"]
+                    for clase, n in zip(CLASES_HORAS_EXTRAS, extras['clases'])]
+    horas_extras.append(_tabla(data_extras, [2*inch, 1.3*inch, 1.3*inch]))
+    horas_extras.append(Spacer(1, 0.2*inch))
+    horas_extras.append(_grafico_horas_extras(agregado))
+    story.append(KeepTogether(horas_extras))
+
     story.append(PageBreak())
-    
+
     # ========================================================================
-    # PARÁMETROS ESTADÍSTICOS
+    # RESULTADOS: ESTUDIOS POR TIPO
     # ========================================================================
-    story.append(Paragraph("PARÁMETROS ESTADÍSTICOS", styles['SectionHeader']))
-    
-    # Tabla de tipos de estudios
-    data_estudios = [
-        ['Tipo de Estudio', 'Duración (min)', 'Probabilidad'],
-        ['RMN de Cerebro', '4.45', '25%'],
-        ['RMN de Columna', '5.20', '25%'],
-        ['RMN de Articulaciones', '4.53', '33%'],
-        ['RMN de Cuerpo Completo', '20.00', '2%'],
-        ['Otros Estudios', '5.00', '15%']
-    ]
-    
-    tabla_estudios = Table(data_estudios, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
-    tabla_estudios.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 9)
-    ]))
-    
+    story.append(Paragraph("ESTUDIOS POR TIPO", styles['SectionHeader']))
+    total_estudios = sum(e['media'] for e in agregado['estudios'].values())
+    data_estudios = [['Tipo de Estudio', 'Por día', 'P5 - P95', '% del total']]
+    for tipo, e in agregado['estudios'].items():
+        data_estudios.append([tipo, f"{e['media']:.2f}", f"{e['p5']:.0f} - {e['p95']:.0f}",
+                              f"{e['media'] / total_estudios:.1%}"])
+    data_estudios.append(['Total', f"{pacientes['media']:.2f}", '', '100%'])
+    story.append(_tabla(data_estudios, [2.2*inch, 1.2*inch, 1.2*inch, 1.2*inch], fondo='lightgreen'))
+    story.append(Spacer(1, 0.2*inch))
+    story.append(_grafico_estudios(agregado))
+
+    story.append(PageBreak())
+
+    # ========================================================================
+    # PARÁMETROS DEL ESCENARIO (los de config.py con los que se simuló)
+    # ========================================================================
+    story.append(Paragraph("PARÁMETROS DEL ESCENARIO", styles['SectionHeader']))
+
+    if escenario['cambios']:
+        cambios = '<br/>'.join(f"{nombre} = {valor}" for nombre, valor in escenario['cambios'].items())
+        story.append(Paragraph(f"<b>Cambios respecto de config.py:</b><br/>{cambios}", styles['Normal']))
+        story.append(Spacer(1, 0.2*inch))
+
+    data_tipos = [['Tipo de Estudio', 'Scan (min)', 'Posicionamiento (min)', 'Probabilidad']]
+    for tipo, datos in parametros['TIPOS_ESTUDIO'].items():
+        data_tipos.append([tipo, _rango(datos['tiempo_scan']), _rango(datos['tiempo_posicionamiento']),
+                           f"{datos['probabilidad']:.0%}"])
     story.append(Paragraph("<b>Distribución de Tipos de Estudios:</b>", styles['Normal']))
     story.append(Spacer(1, 0.1*inch))
-    story.append(tabla_estudios)
+    story.append(_tabla(data_tipos, [2*inch, 1.3*inch, 1.7*inch, 1.2*inch], fondo='lightblue'))
     story.append(Spacer(1, 0.3*inch))
-    
-    # Distribuciones normales
-    data_dist = [
-        ['Proceso', 'Media (μ)', 'Desv. Est. (σ)'],
-        ['Validación administrativa', '5 min', '1 min'],
-        ['Cambiador (entrada)', '6 min', '1.5 min'],
-        ['Posicionamiento en resonador', '3 min', '0.5 min'],
-        ['Cambiador (salida)', '4 min', '1 min']
+
+    data_tiempos = [
+        ['Proceso', 'Duración (min)'],
+        ['Validación administrativa', _rango(parametros['TIEMPO_VALIDACION'])],
+        ['Camino al vestuario', f"{parametros['TIEMPO_CAMINO_VESTUARIO']:g}"],
+        ['Box (cambio de ropa)', _rango(parametros['TIEMPO_BOX'])],
+        ['Camino a la salida', f"{parametros['TIEMPO_CAMINO_SALIDA']:g}"],
+        ['Salida', _rango(parametros['TIEMPO_SALIDA'])],
     ]
-    
-    tabla_dist = Table(data_dist, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
-    tabla_dist.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 9)
-    ]))
-    
-    story.append(Paragraph("<b>Distribuciones Normales de Tiempos:</b>", styles['Normal']))
+    story.append(Paragraph("<b>Tiempos de proceso</b> (uniformes entre mínimo y máximo; "
+                           "los caminos son fijos):", styles['Normal']))
     story.append(Spacer(1, 0.1*inch))
-    story.append(tabla_dist)
+    story.append(_tabla(data_tiempos, [2.5*inch, 1.5*inch], fondo='lightgreen'))
     story.append(Spacer(1, 0.3*inch))
-    
-    # ========================================================================
-    # CARACTERÍSTICAS TÉCNICAS
-    # ========================================================================
-    story.append(Paragraph("CARACTERÍSTICAS TÉCNICAS", styles['SectionHeader']))
-    
-    caracteristicas = [
-        "<b>Visualización 2D interactiva</b>: Interfaz gráfica que muestra el plano de la clínica y el movimiento de pacientes en tiempo real",
-        "<b>Panel de métricas en vivo</b>: Monitoreo constante de utilización del resonador y tiempos de espera",
-        "<b>Control de velocidad</b>: Ajuste dinámico de la velocidad de simulación (1x a 960x)",
-        "<b>Código modular</b>: Arquitectura escalable para futuras mejoras",
-        "<b>Exportación de datos</b>: Métricas exportables para análisis posterior"
+
+    data_operacion = [
+        ['Parámetro', 'Valor'],
+        ['Jornada', f"{parametros['HORA_INICIO']:02d}:00 a {parametros['HORA_FIN']:02d}:00"],
+        ['Último turno posible', min_a_hora(parametros['LIMITE_TURNOS'])],
+        ['Llegada temprano / puntual / tarde',
+         f"{parametros['PROB_LLEGADA_TEMPRANO']:.0%} / {parametros['PROB_LLEGADA_PUNTUAL']:.0%} / "
+         f"{parametros['PROB_LLEGADA_TARDE']:.0%}"],
+        ['Mesas / boxes / resonadores',
+         f"{parametros['CAPACIDAD_MESAS']} / {parametros['CAPACIDAD_BOXES']} / "
+         f"{parametros['CAPACIDAD_RESONADORES']}"],
+        ['Disciplina de colas', parametros['DISCIPLINA_COLAS']],
     ]
-    
-    for carac in caracteristicas:
-        story.append(Paragraph(f"• {carac}", styles['Normal']))
-        story.append(Spacer(1, 0.08*inch))
-    
-    story.append(PageBreak())
-    
+    story.append(Paragraph("<b>Operación:</b>", styles['Normal']))
+    story.append(Spacer(1, 0.1*inch))
+    story.append(_tabla(data_operacion, [2.5*inch, 2*inch]))
+    story.append(Spacer(1, 0.3*inch))
+
     # ========================================================================
-    # RESULTADOS ESPERADOS
+    # METODOLOGÍA
     # ========================================================================
-    story.append(Paragraph("RESULTADOS ESPERADOS", styles['SectionHeader']))
-    
-    texto_resultados = """
-    <b>Optimización de Turnos:</b><br/>
-    Reducción del tiempo ocioso del resonador mediante asignación dinámica de turnos 
-    basada en duración real de estudios.<br/><br/>
-    
-    <b>Mejora en la Experiencia del Paciente:</b><br/>
-    Minimización de tiempos de espera innecesarios y mejor predicción de tiempos 
-    de atención.<br/><br/>
-    
-    <b>Aumento de Rentabilidad:</b><br/>
-    Mayor cantidad de estudios por día sin comprometer la calidad del servicio.<br/><br/>
-    
-    <b>Toma de Decisiones Basada en Datos:</b><br/>
-    Métricas cuantitativas para evaluar cambios operacionales antes de implementarlos.
+    story.append(Paragraph("METODOLOGÍA", styles['SectionHeader']))
+
+    texto_metodologia = f"""
+    <b>1. Simulación de Monte Carlo</b><br/>
+    Se simularon {escenario['replicas']:,} días independientes con el motor
+    '{escenario['motor']}'. Los intervalos de confianza son del 95% para la media
+    entre días.
+    <br/><br/>
+    <b>2. Eventos Discretos</b><br/>
+    Cada paciente es modelado como una entidad independiente que transita por
+    diferentes estados y recursos (mesa de atención, cambiador, resonador).
+    <br/><br/>
+    <b>3. Distribuciones Estadísticas</b><br/>
+    Los tiempos de servicio son uniformes entre los mínimos y máximos de la
+    tabla anterior y el tipo de estudio sigue las probabilidades indicadas.
+    La agenda asigna cada turno cuando termina el servicio esperado del
+    paciente anterior.
     """
-    story.append(Paragraph(texto_resultados, styles['Normal']))
+    story.append(Paragraph(texto_metodologia, styles['Normal']))
     story.append(Spacer(1, 0.3*inch))
-    
+
     # ========================================================================
     # PRÓXIMOS PASOS
     # ========================================================================
     story.append(Paragraph("PRÓXIMOS PASOS", styles['SectionHeader']))
-    
+
     proximos_pasos = [
         "<b>Fase 1 (Actual):</b> Validación del modelo 2D con datos reales de la clínica",
         "<b>Fase 2:</b> Implementación de diferentes escenarios de optimización",
@@ -301,39 +567,126 @@ def crear_resumen_ejecutivo():
         "<b>Fase 4:</b> Dashboard web para acceso remoto de directivos",
         "<b>Fase 5:</b> Sistema de predicción y alertas en tiempo real"
     ]
-    
+
     for paso in proximos_pasos:
         story.append(Paragraph(f"• {paso}", styles['Normal']))
         story.append(Spacer(1, 0.12*inch))
-    
-    story.append(Spacer(1, 0.4*inch))
-    
-    # ========================================================================
-    # CONCLUSIÓN
-    # ========================================================================
-    story.append(Paragraph("CONCLUSIÓN", styles['SectionHeader']))
-    
-    texto_conclusion = """
-    Este proyecto representa una <b>herramienta innovadora</b> para la gestión 
-    y optimización del servicio de resonancia magnética. La combinación de análisis 
-    estadístico riguroso con visualización interactiva permite tomar decisiones 
-    informadas para mejorar tanto la eficiencia operativa como la satisfacción 
-    del paciente.
-    <br/><br/>
-    La inversión en esta simulación se traducirá en <b>retornos medibles</b> 
-    mediante el aumento de la utilización del equipo y la reducción de costos 
-    operativos por capacidad ociosa.
-    """
-    story.append(Paragraph(texto_conclusion, styles['Normal']))
-    
+
     # Generar PDF
     doc.build(story)
-    print(f"\n✅ PDF generado exitosamente: {filename}")
     return filename
 
-if __name__ == "__main__":
+
+def crear_comparativo(agregados, filename):
+    """Una tabla con las cifras principales de cada escenario"""
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.units import inch
+
+    doc = SimpleDocTemplate(filename, pagesize=landscape(letter),
+                           topMargin=0.6*inch, bottomMargin=0.6*inch,
+                           leftMargin=0.6*inch, rightMargin=0.6*inch)
+    styles = _estilos()
+    filas = [['Escenario', 'Días', 'Fin medio', 'Fin P95', 'Horas extras', 'Min. extra/día',
+              'Pacientes/día', 'Circuito (min)']]
+    for a in agregados:
+        fin = a['finalizacion']
+        nombre = a['escenario']['nombre'] + (' (nominal)' if a['escenario']['fin_nominal'] else '')
+        filas.append([nombre, f"{a['escenario']['replicas']:,}",
+                      min_a_hora(fin['media']['media']),
+                      min_a_hora(fin['percentiles'][PERCENTILES_FIN.index(95)]),
+                      f"{a['horas_extras']['probabilidad']['media']:.1%}",
+                      f"{a['horas_extras']['minutos_medios']:.1f}",
+                      f"{a['pacientes_por_dia']['media']:.1f}", f"{a['tiempo_circuito']:.1f}"])
+    story = [Paragraph("COMPARACIÓN DE ESCENARIOS", styles['SectionHeader']),
+             Paragraph(f"Fecha: {datetime.now().strftime('%d de %B de %Y')}", styles['Normal']),
+             Spacer(1, 0.2*inch),
+             _tabla(filas, [2.6*inch] + [0.95*inch] * 7, alineacion='CENTER')]
+    doc.build(story)
+    return filename
+
+
+# ============================================================================
+# INFORMES EN LOTE
+# ============================================================================
+
+def _informe(escenario, n_replicas, motor, semilla, metodo, trabajadores, directorio,
+             filename=None):
+    """Trabajo de un proceso: simula un escenario y escribe su PDF"""
+    agregado = simular_escenario(escenario, n_replicas, motor, semilla, metodo, trabajadores)
+    filename = filename or os.path.join(directorio, f"{_nombre_archivo(escenario['nombre'])}.pdf")
+    crear_resumen_ejecutivo(agregado, filename)
+    return agregado, filename
+
+
+def generar_informes(escenarios, n_replicas=None, motor='eventos', semilla=None,
+                     metodo='simple', trabajadores=None, directorio=None):
+    """Un PDF por escenario en `directorio` (más comparativo.pdf si son
+    varios). Devuelve [(agregado, ruta)] en el orden de `escenarios`.
+
+    Los escenarios se reparten en procesos y cada uno corre su Monte Carlo
+    en un solo proceso; un único escenario usa en cambio todos los procesos
+    para sus réplicas. Con semilla fija los agregados se reusan de una
+    corrida a la siguiente (ver simular_escenario).
+    """
+    n_replicas = n_replicas or config.INFORME_DIAS
+    semilla = config.INFORME_SEMILLA if semilla is None else semilla
+    directorio = directorio or config.INFORME_DIRECTORIO
+    os.makedirs(directorio, exist_ok=True)
+    nombres = [_nombre_archivo(e['nombre']) for e in escenarios]
+    if len(set(nombres)) < len(nombres):
+        raise ValueError("Dos escenarios darían el mismo nombre de archivo")
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+
+    if len(escenarios) == 1 or trabajadores <= 1:
+        por_escenario = 1 if len(escenarios) > 1 else trabajadores
+        informes = [_informe(e, n_replicas, motor, semilla, metodo, por_escenario, directorio)
+                    for e in escenarios]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(trabajadores, len(escenarios))) as ejecutor:
+            futuros = [ejecutor.submit(_informe, e, n_replicas, motor, semilla, metodo, 1, directorio)
+                       for e in escenarios]
+            informes = [futuro.result() for futuro in futuros]
+
+    if len(informes) > 1:
+        crear_comparativo([a for a, _ in informes], os.path.join(directorio, 'comparativo.pdf'))
+    return informes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen ejecutivo en PDF con resultados simulados")
+    parser.add_argument('--escenarios', help="JSON con la lista de escenarios (sin él, el de config.py)")
+    parser.add_argument('--dias', type=int, default=config.INFORME_DIAS, help="días simulados por escenario")
+    parser.add_argument('--motor', choices=list(MOTORES), default='eventos',
+                        help="eventos (por defecto) o recursivo simulan las colas; vectorizado da "
+                             "un fin nominal, sin esperas")
+    parser.add_argument('--semilla', type=int, default=config.INFORME_SEMILLA)
+    parser.add_argument('--trabajadores', type=int, default=None, help="procesos (por defecto, uno por CPU)")
+    parser.add_argument('--directorio', default=config.INFORME_DIRECTORIO,
+                        help="dónde escribir los PDF de --escenarios")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("GENERADOR DE RESUMEN EJECUTIVO")
     print("=" * 60)
-    crear_resumen_ejecutivo()
+    if args.escenarios:
+        escenarios = leer_escenarios(args.escenarios)
+        print(f"Simulando {len(escenarios)} escenarios de {args.dias:,} días...")
+        informes = generar_informes(escenarios, args.dias, args.motor, args.semilla,
+                                    trabajadores=args.trabajadores, directorio=args.directorio)
+        for _, ruta in informes:
+            print(f"✅ {ruta}")
+        if len(informes) > 1:
+            print(f"✅ {os.path.join(args.directorio, 'comparativo.pdf')}")
+    else:
+        print(f"Simulando {args.dias:,} días del escenario de config.py...")
+        agregado, ruta = _informe({'nombre': 'Escenario actual', 'config': {}}, args.dias, args.motor,
+                                  args.semilla, 'simple', args.trabajadores, '.', ARCHIVO_RESUMEN)
+        print(f"\n✅ PDF generado exitosamente: {ruta}")
     print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Rutas compiladas - poligonales con largo acumulado y movimiento vectorizado
+
+Cada ruta (clave de config.RUTAS, puesto de destino y punto de origen) se
+compila una sola vez en una poligonal con el largo acumulado de sus tramos.
+La posición de un paciente en camino es una función cerrada de la ruta y
+de la distancia recorrida, así que todos los que caminan avanzan con una
+suma de arrays y sus posiciones salen de una sola operación de NumPy.
+"""
+import numpy as np
+import config
+from recursos import desplazamiento_puesto
+
+
+class TablaRutas:
+    """Rutas compiladas, identificadas por un entero.
+
+    Se rearma sola si cambian config.RUTAS o config.WAYPOINTS (p. ej. en un
+    escenario de resumen.py), como paciente._tabla_estudios.
+    """
+
+    def __init__(self):
+        self._limpiar()
+
+    def _limpiar(self):
+        self._config = (id(config.RUTAS), id(config.WAYPOINTS))
+        self._ids = {}
+        self._puntos = []      # (k, 2) por ruta
+        self._acumulado = []   # (k,) largo desde el origen hasta cada punto
+        self.largos = np.empty(0)
+        self._rellenas = None  # (puntos, acumulado) de todas, del mismo largo
+
+    def compilar(self, ruta, puesto=0, origen=None):
+        """Id de la ruta que sale de `origen` y recorre config.RUTAS[ruta]
+        terminando en el puesto `puesto` de la etapa"""
+        if self._config != (id(config.RUTAS), id(config.WAYPOINTS)):
+            self._limpiar()
+        origen = tuple(origen) if origen is not None else tuple(config.WAYPOINTS['esperando'])
+        clave = (ruta, puesto, origen)
+        id_ruta = self._ids.get(clave)
+        if id_ruta is not None:
+            return id_ruta
+
+        destinos = [config.WAYPOINTS[wp] for wp in config.RUTAS[ruta]]
+        dx, dy = desplazamiento_puesto(ruta, puesto)
+        destinos[-1] = (destinos[-1][0] + dx, destinos[-1][1] + dy)
+        puntos = np.array([origen] + destinos, dtype=float)
+        tramos = np.hypot(*np.diff(puntos, axis=0).T)
+        acumulado = np.concatenate(([0.0], np.cumsum(tramos)))
+
+        id_ruta = len(self._puntos)
+        self._ids[clave] = id_ruta
+        self._puntos.append(puntos)
+        self._acumulado.append(acumulado)
+        self.largos = np.append(self.largos, acumulado[-1])
+        self._rellenas = None
+        return id_ruta
+
+    def destino(self, id_ruta):
+        return self._puntos[id_ruta][-1].tolist()
+
+    def posicion(self, id_ruta, distancia):
+        """[x, y] a `distancia` píxeles del origen de la ruta"""
+        return self.posiciones(np.array([id_ruta]), np.array([distancia], dtype=float))[0].tolist()
+
+    def posiciones(self, ids, distancias):
+        """Array (n, 2) de posiciones: la ruta ids[i] recorrida distancias[i] píxeles"""
+        if self._rellenas is None:
+            # Todas las rutas con la misma cantidad de puntos (repitiendo el
+            # último): un solo array y se indexa por id
+            k = max(len(a) for a in self._acumulado)
+            puntos = np.empty((len(self._puntos), k, 2))
+            acumulado = np.empty((len(self._puntos), k))
+            for i, (p, a) in enumerate(zip(self._puntos, self._acumulado)):
+                puntos[i, :len(p)], puntos[i, len(p):] = p, p[-1]
+                acumulado[i, :len(a)], acumulado[i, len(a):] = a, a[-1]
+            self._rellenas = puntos, acumulado
+        puntos, acumulado = self._rellenas
+        ids = np.asarray(ids, dtype=np.intp)
+        d = np.clip(distancias, 0.0, self.largos[ids])
+        acum = acumulado[ids]
+        # Tramo en el que cae cada distancia y fracción recorrida de ese tramo
+        tramo = np.minimum((acum <= d[:, None]).sum(axis=1) - 1, acumulado.shape[1] - 2)
+        filas = np.arange(len(ids))
+        desde, hasta = acum[filas, tramo], acum[filas, tramo + 1]
+        largo = hasta - desde
+        f = np.divide(d - desde, largo, out=np.zeros_like(d), where=largo > 0)
+        a, b = puntos[ids, tramo], puntos[ids, tramo + 1]
+        return a + (b - a) * f[:, None]
+
+
+# Compartida por los simuladores y el reproductor de trazas (una por proceso)
+TABLA_RUTAS = TablaRutas()
+
+
+class Movimientos:
+    """Pacientes en camino: ruta y distancia recorrida de cada uno en arrays.
+
+    avanzar() mueve a todos con una suma y solo toca en Python a los que
+    llegaron. Las posiciones de los que caminan se calculan cuando alguien
+    las necesita (ubicar), no en cada sub-paso.
+    """
+
+    def __init__(self, tabla=None):
+        self.tabla = tabla or TABLA_RUTAS
+        self.pacientes = []
+        self.rutas = np.empty(0, dtype=np.intp)
+        self.distancias = np.empty(0)
+
+    def __len__(self):
+        return len(self.pacientes)
+
+    def iniciar(self, p, ruta, puesto=0):
+        """`p` sale por config.RUTAS[ruta] desde donde está"""
+        if p.moviendo:
+            self._quitar(self.pacientes.index(p))
+        id_ruta = self.tabla.compilar(ruta, puesto, p.posicion)
+        p.ruta = id_ruta
+        p.moviendo = True
+        self.pacientes.append(p)
+        self.rutas = np.append(self.rutas, id_ruta)
+        self.distancias = np.append(self.distancias, 0.0)
+
+    def _quitar(self, i):
+        del self.pacientes[i]
+        self.rutas = np.delete(self.rutas, i)
+        self.distancias = np.delete(self.distancias, i)
+
+    def avanzar(self, distancia):
+        """Todos recorren `distancia` píxeles; los que llegan quedan en el
+        último punto de su ruta con moviendo=False"""
+        if not self.pacientes:
+            return
+        self.distancias += distancia
+        llegaron = self.distancias >= self.tabla.largos[self.rutas]
+        if not llegaron.any():
+            return
+        for i in np.flatnonzero(llegaron).tolist():
+            p = self.pacientes[i]
+            p.posicion = self.tabla.destino(p.ruta)
+            p.moviendo = False
+        siguen = ~llegaron
+        self.pacientes = [p for p, s in zip(self.pacientes, siguen.tolist()) if s]
+        self.rutas = self.rutas[siguen]
+        self.distancias = self.distancias[siguen]
+
+    def ubicar(self):
+        """Actualiza p.posicion de los que caminan (una operación para todos)"""
+        if not self.pacientes:
+            return
+        for p, xy in zip(self.pacientes, self.tabla.posiciones(self.rutas, self.distancias).tolist()):
+            p.posicion = xy
+
+    def estado(self):
+        """Copia del estado interno (para keyframes)"""
+        return list(self.pacientes), self.rutas.copy(), self.distancias.copy()
+
+    def restaurar(self, estado):
+        pacientes, rutas, distancias = estado
+        self.pacientes, self.rutas, self.distancias = list(pacientes), rutas.copy(), distancias.copy()
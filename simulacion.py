@@ -1,21 +1,117 @@
 """Motor de Simulación V3.1 - Llegadas espaciadas y salida completa"""
+import copy
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
+import numpy as np
 import config
 from paciente import Paciente
+from muestreo import TIPOS, muestrear_dias, min_a_hora
+from registro import RegistroPacientes
+from estadisticas import EstadisticasDia
+from recursos import PoolRecursos
+from llegadas import CalendarioLlegadas
+from rutas import Movimientos
+from perfilador import PERFILADOR, reloj
+
+
+def generar_agenda_flexible(fecha_inicio, estado='PROGRAMADO', rng=None):
+    """Genera la lista de pacientes con grilla flexible (sin imprimir nada).
+    
+    Todos los tiempos se sortean juntos en un bloque vectorizado y cada
+    Paciente se arma desde su fila. rng: semilla, numpy Generator o None.
+    """
+    m = muestrear_dias(1, rng)
+    n = int(m['n_pacientes'][0])
+    return pacientes_desde_muestra(m, 0, range(n), m['turno'][0, :n], fecha_inicio, estado)
+
+
+def pacientes_desde_muestra(muestras, dia, filas, turnos, fecha_inicio=None, estado='PROGRAMADO'):
+    """Arma los Paciente de las `filas` de un día de muestreo.muestrear_dias
+    con los `turnos` dados (la agenda puede no ser la de la muestra)"""
+    filas = list(filas)
+    columnas = [muestras[c][dia, filas].tolist() for c in
+                ('desvio', 'validacion', 'box', 'tipo', 'scan', 'posicionamiento', 'salida')]
+    
+    pacientes = []
+    for i, (turno, desvio, val, box, tipo, scan, pos, salida) in enumerate(zip(np.asarray(turnos).tolist(), *columnas)):
+        p = Paciente(turno, fecha_inicio, id_paciente=i + 1,
+                     muestra=(desvio, val, box, TIPOS[tipo], scan, pos, salida))
+        p.hora_llegada_real = turno + desvio
+        p.estado = estado
+        pacientes.append(p)
+    
+    return pacientes
+
+
+# Lo que cambia de un Paciente durante el día (lo sorteado no se toca)
+_ESTADO_PACIENTE = ('estado', 'posicion', 'ruta', 'moviendo', 'tiempo_en_etapa',
+                    'tiempo_visual_en_etapa', 'marcas', 'ts_inicio', 'ts_fin', 'tiempo_total',
+                    'puesto', 'listo', 'turno_asignado', 'hora_llegada_real')
+
+
+def calcular_estadisticas_dia(pacientes):
+    """Estadísticas de un día a partir de su lista de pacientes"""
+    if not pacientes:
+        return {
+            'estudios_por_tipo': {},
+            'tiempo_promedio_total': 0,
+            'total_pacientes': 0,
+            'ultimo_turno_min': 0,
+            'ultimo_turno_hora': '00:00',
+            'hora_finalizacion_min': 0,
+            'hora_finalizacion_hora': '00:00'
+        }
+    
+    estudios = {}
+    tiempos = []
+    for p in pacientes:
+        estudios[p.tipo_estudio] = estudios.get(p.tipo_estudio, 0) + 1
+        tiempo = p.calcular_tiempo_circuito()
+        tiempos.append(tiempo)
+    
+    ultimo = pacientes[-1]
+    ultimo_turno_min = ultimo.turno_asignado
+    hora_fin_min = ultimo.hora_llegada_real + ultimo.calcular_tiempo_circuito()
+    
+    return {
+        'estudios_por_tipo': estudios,
+        'tiempo_promedio_total': sum(tiempos) / len(tiempos) if tiempos else 0,
+        'total_pacientes': len(pacientes),
+        'ultimo_turno_min': ultimo_turno_min,
+        'ultimo_turno_hora': min_a_hora(ultimo_turno_min),
+        'hora_finalizacion_min': hora_fin_min,
+        'hora_finalizacion_hora': min_a_hora(hora_fin_min)
+    }
+
 
 class SimuladorResonador:
-    def __init__(self):
+    def __init__(self, rng=None, mostrar_agenda=True, traza=None, pacientes=None):
+        # rng: semilla o numpy.random.Generator (None = semilla aleatoria).
+        # reiniciar() sigue usando el mismo generador, así que R da otro día.
+        # pacientes: agenda ya armada (p. ej. con pacientes_desde_muestra);
+        # si es None se sortea con rng.
+        self.rng = np.random.default_rng(rng)
+        self.mostrar_agenda = mostrar_agenda
+        # traza: traza.EscritorTraza opcional; registra agenda y transiciones
+        self.traza = traza
         self.fecha_inicio = datetime.now().replace(hour=config.HORA_INICIO, minute=0, second=0, microsecond=0)
+        # Reloj entero (config.TICKS_POR_MINUTO); tiempo_actual se deriva de él
+        self.ticks = 0
         self.tiempo_actual = 0.0
         self.datetime_actual = self.fecha_inicio
         
-        self.pacientes_programados = []
-        self.pacientes_en_espera = []
-        self.paciente_en_validacion = None
-        self.paciente_en_box = None
-        self.paciente_en_resonador = None
+        # Los que todavía no llegaron, en un heap por hora de llegada
+        self.pacientes_programados = CalendarioLlegadas()
+        # Puestos de cada etapa. La sala de espera también es un pool: su
+        # capacidad limita cuántos pacientes esperan a la vez.
+        self.sala = PoolRecursos(config.CAPACIDAD_SALA_ESPERA)
+        self.mesas = PoolRecursos(config.CAPACIDAD_MESAS)
+        self.boxes = PoolRecursos(config.CAPACIDAD_BOXES)
+        self.resonadores = PoolRecursos(config.CAPACIDAD_RESONADORES)
         self.pacientes_saliendo = []  # NUEVO: pacientes en ruta de salida
-        self.pacientes_completados = []
+        self.movimientos = Movimientos()  # los que caminan, avanzados todos juntos
+        self.pacientes_completados = RegistroPacientes()
+        self.estadisticas = EstadisticasDia()  # se actualiza en cada completado
         
         self.pausada = False
         self.finalizada = False
@@ -23,300 +119,349 @@ class SimuladorResonador:
         # Control de llegadas espaciadas
         self.ultimo_tiempo_llegada = -999  # Tiempo de última llegada
         
-        self._generar_agenda_flexible()
+        self._generar_agenda_flexible(pacientes)
         
-    def _generar_agenda_flexible(self):
-        """Genera turnos con grilla flexible"""
-        turno_actual = 0.0
-        numero_paciente = 1
+        # Fotos del estado cada config.INTERVALO_KEYFRAMES minutos (ver buscar)
+        self.keyframes = []
+        self._minutos_keyframes = []
+        self._guardar_keyframe()
+        # Minuto hasta el que ya se escribió la traza: al volver atrás con
+        # buscar() los pasos repetidos no se graban dos veces
+        self._minuto_grabado = -1.0
+        self._grabar = False
         
-        while turno_actual < 690:
-            p = Paciente(turno_actual, self.fecha_inicio)
-            p.id = numero_paciente
-            p.turno_asignado = turno_actual
-            
-            tiempo_estimado = (
-                p.tiempo_validacion +
-                2.0 +
-                p.tiempo_box +
-                p.tiempo_total_resonador +
-                2.0 +
-                p.tiempo_salida
-            )
-            
-            p.hora_llegada_real = turno_actual + p.desvio_llegada
-            p.estado = 'PROGRAMADO'
-            
-            self.pacientes_programados.append(p)
-            
-            turno_actual += tiempo_estimado
-            numero_paciente += 1
+    def _generar_agenda_flexible(self, pacientes=None):
+        """Genera turnos con grilla flexible"""
+        if pacientes is None:
+            pacientes = generar_agenda_flexible(self.fecha_inicio, rng=self.rng)
+        self._agenda = list(pacientes)
+        self.pacientes_programados = CalendarioLlegadas(self._agenda)
+        if self.traza is not None:
+            self.traza.iniciar_dia(self._agenda)
+        if not self.mostrar_agenda:
+            return
         
-        print(f"✓ Agenda: {len(self.pacientes_programados)} pacientes")
-        print(f"  Turnos: 0 - {self.pacientes_programados[-1].turno_asignado:.0f} min")
+        print(f"✓ Agenda: {len(self._agenda)} pacientes")
+        print(f"  Turnos: 0 - {self._agenda[-1].turno_asignado:.0f} min")
         print(f"\n🎯 Regla de llegadas:")
         print(f"  → Siguiente llega cuando hay alguien EN el RESONADOR (sala celeste)")
         print(f"\n⏱️ Tiempos visuales (con velocidad 5x):")
         print(f"  → Box: ~10 min = 2 segundos visuales")
         print(f"  → Resonador: ~15 min = 3 segundos visuales")
         print(f"\n📊 Ejemplos de llegadas (turno + desvío):")
-        for i in range(min(5, len(self.pacientes_programados))):
-            p = self.pacientes_programados[i]
+        for p in self._agenda[:5]:
             desvio_texto = "temprano" if p.desvio_llegada < 0 else ("puntual" if p.desvio_llegada == 0 else "tarde")
             print(f"  P#{p.id}: Turno {p.turno_asignado:.0f}min + {p.desvio_llegada:+.0f}min = Llega {p.hora_llegada_real:.0f}min ({desvio_texto})")
         
     def actualizar(self, delta_sim, delta_real, multiplicador_velocidad=1.0):
         if self.pausada or self.finalizada:
             return
-        
-        self.tiempo_actual += delta_sim
+        self._paso(delta_sim, delta_real, multiplicador_velocidad)
+    
+    def _paso(self, delta_sim, delta_real, multiplicador_velocidad=1.0):
+        self.ticks += round(delta_sim * config.TICKS_POR_MINUTO)
+        self.tiempo_actual = self.ticks / config.TICKS_POR_MINUTO
         self.datetime_actual = self.fecha_inicio + timedelta(minutes=self.tiempo_actual)
+        self._grabar = self.tiempo_actual > self._minuto_grabado
+        if self._grabar:
+            self._minuto_grabado = self.tiempo_actual
+        
+        medir = PERFILADOR.activo
+        if medir:
+            t = reloj()
         
         # 1. Procesar llegadas (con espaciado)
         self._procesar_llegadas()
+        if medir:
+            t = PERFILADOR.registrar('sim.llegadas', t)
         
         # 2. Actualizar movimientos
-        todos = self.pacientes_en_espera.copy()
-        if self.paciente_en_validacion:
-            todos.append(self.paciente_en_validacion)
-        if self.paciente_en_box:
-            todos.append(self.paciente_en_box)
-        if self.paciente_en_resonador:
-            todos.append(self.paciente_en_resonador)
-        todos.extend(self.pacientes_saliendo)
-        
-        for p in todos:
-            if p.moviendo:
-                p.actualizar_movimiento(delta_real, multiplicador_velocidad)
+        self.movimientos.avanzar(config.VELOCIDAD_PACIENTE * multiplicador_velocidad * delta_real)
+        if medir:
+            t = PERFILADOR.registrar('sim.movimiento', t)
         
         # 3. Actualizar tiempos (simulación y visuales)
-        if self.paciente_en_validacion:
-            self.paciente_en_validacion.tiempo_en_etapa += delta_sim
-            self.paciente_en_validacion.tiempo_visual_en_etapa += delta_real
-        if self.paciente_en_box:
-            self.paciente_en_box.tiempo_en_etapa += delta_sim
-            self.paciente_en_box.tiempo_visual_en_etapa += delta_real
-        if self.paciente_en_resonador:
-            self.paciente_en_resonador.tiempo_en_etapa += delta_sim
-            self.paciente_en_resonador.tiempo_visual_en_etapa += delta_real
+        for pool in (self.mesas, self.boxes, self.resonadores):
+            for p in pool.ocupantes():
+                p.tiempo_en_etapa += delta_sim
+                p.tiempo_visual_en_etapa += delta_real
+        if medir:
+            t = PERFILADOR.registrar('sim.relojes', t)
         
         # 4. Gestionar flujo
         self._gestionar_flujo()
+        if medir:
+            t = PERFILADOR.registrar('sim.flujo', t)
         
         # 5. Verificar fin
         if (not self.pacientes_programados and 
-            not self.pacientes_en_espera and
-            not self.paciente_en_validacion and
-            not self.paciente_en_box and
-            not self.paciente_en_resonador and
+            not self.sala.ocupados and
+            not self.mesas.ocupados and
+            not self.boxes.ocupados and
+            not self.resonadores.ocupados and
             not self.pacientes_saliendo):
             self.finalizada = True
+        if medir:
+            PERFILADOR.registrar('sim.fin', t)
+        
+        # 6. Keyframe (solo la primera vez que se pasa por este tramo del día)
+        if self.tiempo_actual >= self._minutos_keyframes[-1] + config.INTERVALO_KEYFRAMES:
+            self._guardar_keyframe()
+    
+    def _guardar_keyframe(self):
+        """Foto barata del estado: listas, estado mutable de cada paciente que
+        no terminó y la cantidad de completados (el registro solo crece)"""
+        completados = len(self.pacientes_completados)
+        self.keyframes.append({
+            'ticks': self.ticks,
+            'finalizada': self.finalizada,
+            'ultimo_tiempo_llegada': self.ultimo_tiempo_llegada,
+            'programados': self.pacientes_programados.estado(),
+            'pools': [pool.estado() for pool in self._pools()],
+            'saliendo': list(self.pacientes_saliendo),
+            'movimientos': self.movimientos.estado(),
+            'completados': completados,
+            'estadisticas': copy.deepcopy(self.estadisticas),
+            'agenda': len(self._agenda),
+            'pacientes': [(p, self._estado_paciente(p)) for p in self._agenda
+                          if p.estado != 'COMPLETADO'],
+        })
+        self._minutos_keyframes.append(self.tiempo_actual)
+    
+    def _pools(self):
+        return self.sala, self.mesas, self.boxes, self.resonadores
+    
+    @staticmethod
+    def _estado_paciente(p):
+        """{campo: valor} de _ESTADO_PACIENTE, con copias de lo mutable"""
+        estado = {campo: getattr(p, campo) for campo in _ESTADO_PACIENTE}
+        estado['posicion'] = list(p.posicion)
+        estado['marcas'] = dict(p.marcas)
+        return estado
+    
+    def _restaurar_keyframe(self, kf):
+        self.ticks = kf['ticks']
+        self.tiempo_actual = self.ticks / config.TICKS_POR_MINUTO
+        self.datetime_actual = self.fecha_inicio + timedelta(minutes=self.tiempo_actual)
+        self.finalizada = kf['finalizada']
+        self.ultimo_tiempo_llegada = kf['ultimo_tiempo_llegada']
+        self.pacientes_programados.restaurar(kf['programados'])
+        for pool, estado in zip(self._pools(), kf['pools']):
+            pool.restaurar(estado)
+        self.pacientes_saliendo = list(kf['saliendo'])
+        self.movimientos.restaurar(kf['movimientos'])
+        self.pacientes_completados.truncar(kf['completados'])
+        self.estadisticas = copy.deepcopy(kf['estadisticas'])
+        del self._agenda[kf['agenda']:]  # los agregados después de la foto
+        for p, estado in kf['pacientes']:
+            for campo, valor in estado.items():
+                setattr(p, campo, valor)
+            p.posicion = list(p.posicion)
+            p.marcas = dict(p.marcas)
+    
+    def buscar(self, minuto):
+        """Salta a `minuto` del día (hacia adelante o hacia atrás).
+        
+        Restaura el keyframe anterior a `minuto` y avanza el resto con los
+        mismos sub-pasos fijos que la ventana, así que el estado al que se
+        llega es idéntico al de haber visto el día de corrido. La primera vez
+        que se salta más allá de lo simulado se van guardando los keyframes
+        que falten.
+        """
+        k = bisect_right(self._minutos_keyframes, minuto) - 1
+        self._restaurar_keyframe(self.keyframes[max(k, 0)])
+        while not self.finalizada and self.tiempo_actual + config.PASO_SIMULACION / 2 < minuto:
+            self._paso(config.PASO_SIMULACION, config.PASO_VISUAL)
+    
+    def generar_keyframes(self):
+        """Simula el día entero por adelantado para que cualquier salto cueste
+        a lo sumo un intervalo de keyframes. Vuelve al minuto en que estaba y
+        devuelve el minuto en que termina el día."""
+        minuto = self.tiempo_actual
+        self.buscar(float('inf'))
+        fin = self.tiempo_actual
+        self.buscar(minuto)
+        return fin
     
     def _procesar_llegadas(self):
         """Procesar llegadas - Cuando hay alguien EN el RESONADOR (sala celeste)"""
         if not self.pacientes_programados:
             return
         
-        # RESTRICCIÓN 1: Máximo 1 en espera
-        if len(self.pacientes_en_espera) >= 1:
+        # RESTRICCIÓN 1: sala de espera llena (por defecto, máximo 1 en espera)
+        if not self.sala.hay_lugar():
             return
         
-        # RESTRICCIÓN 2: Solo permitir llegada cuando hay alguien EN el RESONADOR
+        # RESTRICCIÓN 2: Solo permitir llegada cuando hay alguien EN algún RESONADOR
         # Es decir, cuando toca la sala de resonancia (cuadro celeste)
         # O cuando el sistema está vacío (primer paciente)
-        sistema_vacio = (not self.paciente_en_validacion and 
-                        not self.paciente_en_box and 
-                        not self.paciente_en_resonador and
+        sistema_vacio = (not self.mesas.ocupados and 
+                        not self.boxes.ocupados and 
+                        not self.resonadores.ocupados and
                         len(self.pacientes_saliendo) == 0 and
                         len(self.pacientes_completados) == 0)
         
-        tiene_alguien_en_resonador = self.paciente_en_resonador is not None
+        tiene_alguien_en_resonador = self.resonadores.ocupados > 0
         
         if not sistema_vacio and not tiene_alguien_en_resonador:
             return  # Nadie está en el resonador (sala celeste), esperar
         
-        # Ordenar por hora de llegada real (turno + desvío)
-        self.pacientes_programados.sort(key=lambda p: p.hora_llegada_real)
-        
-        if not self.pacientes_programados:
-            return
-        
-        proximo = self.pacientes_programados[0]
-        
-        # El siguiente paciente llega en su hora_llegada_real (turno + desvío)
-        # SI el tiempo actual ya pasó esa hora
+        # El siguiente (el de hora_llegada_real más temprana: turno + desvío)
+        # llega SI el tiempo actual ya pasó esa hora
+        proximo = self.pacientes_programados.proximo()
         if self.tiempo_actual >= proximo.hora_llegada_real:
-            p = self.pacientes_programados.pop(0)
-            p.estado = 'LLEGADA'
+            p = self.pacientes_programados.sacar()
+            self.sala.ocupar(p)
+            self._transicion(p, 'LLEGADA', 'llegada')
             p.ts_inicio = self.datetime_actual
-            p.definir_ruta(['esperando', 'entrada', 'sala_espera'])
-            self.pacientes_en_espera.append(p)
             self.ultimo_tiempo_llegada = self.tiempo_actual
     
+    def agregar_paciente(self, p):
+        """Suma a la agenda del día un paciente que no estaba (sobreturno o
+        paciente sin turno); llega a su hora_llegada_real"""
+        if self.traza is not None:
+            raise ValueError("La traza guarda la agenda al empezar el día: no se pueden agregar pacientes")
+        self.pacientes_programados.agregar(p)
+        self._agenda.append(p)
+        self._agenda_modificada()
+    
+    def reprogramar_turno(self, p, turno):
+        """Mueve el turno de un paciente que todavía no llegó (mismo desvío)"""
+        self.pacientes_programados.reprogramar(p, turno + p.desvio_llegada)
+        p.turno_asignado = turno
+        self._agenda_modificada()
+    
+    def cancelar_turno(self, p):
+        """Saca de la agenda a un paciente que todavía no llegó"""
+        self.pacientes_programados.cancelar(p)
+        p.estado = 'CANCELADO'
+        self._agenda_modificada()
+    
+    def _agenda_modificada(self):
+        """Los keyframes desde el minuto actual son de la agenda vieja: se
+        descartan y se toma uno nuevo. Volver con buscar() a antes del cambio
+        lo deshace."""
+        k = bisect_left(self._minutos_keyframes, self.tiempo_actual)
+        del self.keyframes[k:], self._minutos_keyframes[k:]
+        self._guardar_keyframe()
+    
     def _gestionar_flujo(self):
-        """Gestiona el flujo incluyendo SALIDA completa"""
+        """Gestiona el flujo incluyendo SALIDA completa.
+        
+        En cada etapa, quien terminó (y ya no camina) pasa a la cola de su
+        pool y sigue ocupando el puesto hasta que se libera uno en la etapa
+        siguiente. Las etapas se recorren de la sala hacia la salida, como
+        con un solo puesto por etapa.
+        """
         
         # Sala → Mesa
-        if not self.paciente_en_validacion and self.pacientes_en_espera:
-            for p in self.pacientes_en_espera:
-                if not p.moviendo and p.estado == 'LLEGADA':
-                    self.pacientes_en_espera.remove(p)
-                    p.estado = 'VALIDACION'
-                    p.tiempo_en_etapa = 0
-                    p.definir_ruta(['sala_espera', 'mesa'])
-                    self.paciente_en_validacion = p
-                    break
+        for p in self.sala.ocupantes():
+            if not p.listo and not p.moviendo and p.estado == 'LLEGADA':
+                self.sala.encolar_listo(p)
+        while self.mesas.hay_lugar() and self.sala.hay_listos():
+            p = self.sala.sacar_listo()
+            self.mesas.ocupar(p)
+            self._transicion(p, 'VALIDACION', 'validacion')
+            p.tiempo_en_etapa = 0
         
         # Mesa → Box
-        if self.paciente_en_validacion and not self.paciente_en_validacion.moviendo:
-            p = self.paciente_en_validacion
-            if p.tiempo_en_etapa >= p.tiempo_validacion:
-                if not self.paciente_en_box:
-                    self.paciente_en_validacion = None
-                    p.estado = 'BOX'
-                    p.tiempo_en_etapa = 0
-                    p.tiempo_visual_en_etapa = 0  # Reset tiempo visual
-                    p.definir_ruta(['salida_sala', 'pasillo_v', 'pasillo_v_arriba', 
-                                   'pasillo_h', 'pasillo_h_derecha', 'entrada_vestuario', 
-                                   'vestuario', 'box'])
-                    self.paciente_en_box = p
+        for p in self.mesas.ocupantes():
+            if not p.listo and not p.moviendo and p.tiempo_en_etapa >= p.tiempo_validacion:
+                self.mesas.encolar_listo(p)
+        while self.boxes.hay_lugar() and self.mesas.hay_listos():
+            p = self.mesas.sacar_listo()
+            self.boxes.ocupar(p)
+            self._transicion(p, 'BOX', 'box')
+            p.tiempo_en_etapa = 0
+            p.tiempo_visual_en_etapa = 0  # Reset tiempo visual
         
         # Box → Resonador (con tiempo visual mínimo)
-        if self.paciente_en_box and not self.paciente_en_box.moviendo:
-            p = self.paciente_en_box
+        for p in self.boxes.ocupantes():
             # Verificar AMBOS: tiempo simulado Y tiempo visual mínimo
-            tiempo_simulado_cumplido = p.tiempo_en_etapa >= p.tiempo_box
-            tiempo_visual_cumplido = p.tiempo_visual_en_etapa >= config.TIEMPO_VISUAL_MINIMO_BOX
-            
-            if tiempo_simulado_cumplido and tiempo_visual_cumplido:
-                if not self.paciente_en_resonador:
-                    self.paciente_en_box = None
-                    p.estado = 'RESONADOR'
-                    p.tiempo_en_etapa = 0
-                    p.tiempo_visual_en_etapa = 0  # Reset tiempo visual
-                    p.definir_ruta(['vuelta_vestuario', 'entrada_resonancia', 
-                                   'resonancia', 'resonador'])
-                    self.paciente_en_resonador = p
-        
-        # Resonador → SALIDA (con tiempo visual mínimo)
-        if self.paciente_en_resonador and not self.paciente_en_resonador.moviendo:
-            p = self.paciente_en_resonador
-            # Verificar AMBOS: tiempo simulado Y tiempo visual mínimo
-            tiempo_simulado_cumplido = p.tiempo_en_etapa >= p.tiempo_total_resonador
-            tiempo_visual_cumplido = p.tiempo_visual_en_etapa >= config.TIEMPO_VISUAL_MINIMO_RESONADOR
-            
-            if tiempo_simulado_cumplido and tiempo_visual_cumplido:
-                self.paciente_en_resonador = None
-                p.estado = 'SALIENDO'
+            if (not p.listo and not p.moviendo and p.tiempo_en_etapa >= p.tiempo_box and
+                    p.tiempo_visual_en_etapa >= config.TIEMPO_VISUAL_MINIMO_BOX):
+                self.boxes.encolar_listo(p)
+        while self.resonadores.hay_lugar() and self.boxes.hay_listos():
+            p = self.boxes.sacar_listo()
+            self.resonadores.ocupar(p)
+            self._transicion(p, 'RESONADOR', 'resonador')
+            p.tiempo_en_etapa = 0
+            p.tiempo_visual_en_etapa = 0  # Reset tiempo visual
+        
+        # Resonador → SALIDA (con tiempo visual mínimo; la salida no tiene cupo)
+        for p in self.resonadores.ocupantes():
+            if (not p.moviendo and p.tiempo_en_etapa >= p.tiempo_total_resonador and
+                    p.tiempo_visual_en_etapa >= config.TIEMPO_VISUAL_MINIMO_RESONADOR):
+                self.resonadores.liberar(p)
+                # Ruta de salida completa
+                self._transicion(p, 'SALIENDO', 'salida')
                 p.ts_fin = self.datetime_actual
                 if p.ts_inicio:
                     p.tiempo_total = (p.ts_fin - p.ts_inicio).total_seconds() / 60
-                # Ruta de salida completa
-                p.definir_ruta(['salida_resonancia', 'salida_vestuario', 
-                               'salida_pasillo_h', 'salida_pasillo_v', 
-                               'retorno_sala', 'salida_final'])
                 self.pacientes_saliendo.append(p)
         
         # Saliendo → Completado (NUEVO)
         for p in self.pacientes_saliendo[:]:
             if not p.moviendo:
                 self.pacientes_saliendo.remove(p)
-                p.estado = 'COMPLETADO'
-                self.pacientes_completados.append(p)
+                self._transicion(p, 'COMPLETADO')
+                self.pacientes_completados.agregar(p)
+                self.estadisticas.registrar(p)
+    
+    def _transicion(self, p, estado, ruta=None):
+        """Cambia de estado, arranca la ruta (clave de config.RUTAS) y lo anota en la traza"""
+        p.cambiar_estado(estado, self.tiempo_actual)
+        if ruta is not None:
+            self.movimientos.iniciar(p, ruta, p.puesto)
+        if self.traza is not None and self._grabar:
+            self.traza.transicion(p.id, estado, self.tiempo_actual, ruta, p.puesto)
     
     def simular_dia_completo_rapido(self):
         """Simula el resto del día rápidamente (para tecla S)"""
-        pacientes_simulados = []
-        turno_actual = 0.0
-        numero = 1
-        
-        while turno_actual < 690:
-            p = Paciente(turno_actual, self.fecha_inicio)
-            p.id = numero
-            p.turno_asignado = turno_actual
-            
-            tiempo_servicio = (
-                p.tiempo_validacion +
-                2.0 +
-                p.tiempo_box +
-                p.tiempo_total_resonador +
-                2.0 +
-                p.tiempo_salida
-            )
-            
-            p.hora_llegada_real = turno_actual + p.desvio_llegada
-            p.estado = 'COMPLETADO'
-            pacientes_simulados.append(p)
-            
-            turno_actual += tiempo_servicio
-            numero += 1
-        
-        return pacientes_simulados
+        return generar_agenda_flexible(self.fecha_inicio, estado='COMPLETADO', rng=self.rng)
+    
+    # Vistas de la versión con un solo puesto por etapa (el de puesto más bajo)
+    @property
+    def pacientes_en_espera(self):
+        return self.sala.ocupantes()
+    
+    @property
+    def paciente_en_validacion(self):
+        return self.mesas.primero()
+    
+    @property
+    def paciente_en_box(self):
+        return self.boxes.primero()
+    
+    @property
+    def paciente_en_resonador(self):
+        return self.resonadores.primero()
     
     def obtener_paciente_activo(self):
-        if self.paciente_en_resonador:
-            return self.paciente_en_resonador
-        if self.paciente_en_box:
-            return self.paciente_en_box
-        if self.paciente_en_validacion:
-            return self.paciente_en_validacion
-        if self.pacientes_en_espera:
-            return self.pacientes_en_espera[0]
+        for pool in (self.resonadores, self.boxes, self.mesas, self.sala):
+            p = pool.primero()
+            if p:
+                return p
         if self.pacientes_saliendo:
             return self.pacientes_saliendo[0]
         return None
     
+    def ubicar_pacientes(self):
+        """Pone al día la posición de los que caminan (antes de dibujarlos)"""
+        self.movimientos.ubicar()
+    
     def todos_los_pacientes(self):
-        pacientes = self.pacientes_en_espera.copy()
-        if self.paciente_en_validacion:
-            pacientes.append(self.paciente_en_validacion)
-        if self.paciente_en_box:
-            pacientes.append(self.paciente_en_box)
-        if self.paciente_en_resonador:
-            pacientes.append(self.paciente_en_resonador)
+        pacientes = self.sala.ocupantes()
+        pacientes.extend(self.mesas.ocupantes())
+        pacientes.extend(self.boxes.ocupantes())
+        pacientes.extend(self.resonadores.ocupantes())
         pacientes.extend(self.pacientes_saliendo)
         return pacientes
     
     def obtener_estadisticas_dia(self, pacientes=None):
         if pacientes is None:
-            pacientes = self.pacientes_completados
-        
-        if not pacientes:
-            return {
-                'estudios_por_tipo': {},
-                'tiempo_promedio_total': 0,
-                'total_pacientes': 0,
-                'ultimo_turno_min': 0,
-                'ultimo_turno_hora': '00:00',
-                'hora_finalizacion_min': 0,
-                'hora_finalizacion_hora': '00:00'
-            }
-        
-        estudios = {}
-        tiempos = []
-        for p in pacientes:
-            estudios[p.tipo_estudio] = estudios.get(p.tipo_estudio, 0) + 1
-            tiempo = p.calcular_tiempo_circuito()
-            tiempos.append(tiempo)
-        
-        ultimo = pacientes[-1]
-        ultimo_turno_min = ultimo.turno_asignado
-        hora_fin_min = ultimo.hora_llegada_real + ultimo.calcular_tiempo_circuito()
-        
-        def min_a_hora(minutos):
-            horas = 8 + int(minutos // 60)
-            mins = int(minutos % 60)
-            return f"{horas:02d}:{mins:02d}"
-        
-        return {
-            'estudios_por_tipo': estudios,
-            'tiempo_promedio_total': sum(tiempos) / len(tiempos) if tiempos else 0,
-            'total_pacientes': len(pacientes),
-            'ultimo_turno_min': ultimo_turno_min,
-            'ultimo_turno_hora': min_a_hora(ultimo_turno_min),
-            'hora_finalizacion_min': hora_fin_min,
-            'hora_finalizacion_hora': min_a_hora(hora_fin_min)
-        }
+            return self.estadisticas.como_dict()
+        return calcular_estadisticas_dia(pacientes)
     
     def pausar(self):
         self.pausada = True
@@ -325,4 +470,4 @@ class SimuladorResonador:
         self.pausada = False
     
     def reiniciar(self):
-        self.__init__()
+        self.__init__(self.rng, self.mostrar_agenda, self.traza)
@@ -0,0 +1,17 @@
+"""Los módulos del proyecto están en la raíz del repositorio"""
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def spawn():
+    """Procesos nuevos que importan config.py de cero (como en Windows y macOS)"""
+    previo = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method('spawn', force=True)
+    yield
+    multiprocessing.set_start_method(previo, force=True)
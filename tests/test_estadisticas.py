@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from estadisticas import AcumuladorEstadisticas, EstadisticasDia, Welford
+from montecarlo import _estadisticas_a_arrays
+from muestreo import TIPOS
+
+
+def _dia(pacientes):
+    dia = EstadisticasDia()
+    for tipo, circuito, turno, fin in pacientes:
+        dia.registrar_valores(tipo, circuito, turno, fin)
+    return dia
+
+
+def test_welford_combinado_igual_a_una_pasada():
+    valores = np.random.default_rng(0).normal(50, 10, 1001)
+    entero, a, b = Welford(), Welford(), Welford()
+    entero.agregar_lote(valores)
+    for x in valores[:400]:
+        a.agregar(x)
+    b.agregar_lote(valores[400:])
+    a.combinar(b)
+    assert a.n == entero.n
+    assert a.media == pytest.approx(valores.mean())
+    assert a.varianza() == pytest.approx(valores.var(ddof=1))
+
+
+def test_dia_a_dia_y_en_lote_cuentan_igual():
+    """Los motores que suman EstadisticasDia y los que suman arrays por día
+    dan el mismo resumen, también con un día sin pacientes"""
+    dias = [
+        _dia([(TIPOS[0], 40.0, 0, 45.0), (TIPOS[1], 50.0, 600, 700.0)]),
+        _dia([]),
+        _dia([(TIPOS[2], 45.0, 0, 50.0)]),
+    ]
+    uno_por_uno = AcumuladorEstadisticas()
+    for dia in dias:
+        uno_por_uno.agregar_dia(dia)
+    en_lote = AcumuladorEstadisticas()
+    filas = [dict(d.como_dict(), fin_real_min=d.hora_finalizacion_min) for d in dias]
+    en_lote.agregar_dias(_estadisticas_a_arrays(filas), [40.0, 50.0, 45.0])
+
+    a, b = uno_por_uno.resumen(), en_lote.resumen()
+    assert a['dias'] == b['dias'] == 3
+    assert a['horas_extras'] == b['horas_extras']
+    assert a['prob_horas_extras'] == b['prob_horas_extras']
+    assert a['estudios_por_tipo'] == b['estudios_por_tipo']
+    for campo in ('hora_finalizacion_min', 'tiempo_promedio_total', 'total_pacientes', 'tiempo_circuito'):
+        assert a[campo]['media'] == pytest.approx(b[campo]['media']), campo
+        assert a[campo]['desvio'] == pytest.approx(b[campo]['desvio']), campo
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from exportacion import DTYPE_EXPORTACION, EscritorColumnar, LectorColumnar, filas_muestra
+from montecarlo import ejecutar_montecarlo
+from muestreo import muestrear_dias
+
+
+@pytest.mark.parametrize('formato', ['npy', 'csv'])
+def test_escribir_y_leer(tmp_path, formato):
+    filas = filas_muestra(muestrear_dias(40, np.random.default_rng(0)))
+    with EscritorColumnar(tmp_path / 'lote', formato, filas_por_parte=100) as escritor:
+        escritor.escribir(filas[:150])
+        escritor.escribir(filas[150:])
+    assert escritor.partes == [100] * (len(filas) // 100) + ([len(filas) % 100] if len(filas) % 100 else [])
+
+    lector = LectorColumnar(tmp_path / 'lote')
+    assert len(lector) == len(filas)
+    assert lector.columnas == list(DTYPE_EXPORTACION.names)
+    for columna in ('replica', 'id', 'tipo', 'turno', 'tiempo_circuito', 't_completado'):
+        np.testing.assert_array_equal(lector.columna(columna), filas[columna], err_msg=columna)
+    np.testing.assert_array_equal(np.isnan(lector.columna('t_box')), np.isnan(filas['t_box']))
+
+
+@pytest.mark.parametrize('formato', ['npy', 'csv'])
+def test_ultima_parte_de_una_fila(tmp_path, formato):
+    filas = filas_muestra(muestrear_dias(5, np.random.default_rng(1)))
+    with EscritorColumnar(tmp_path / 'lote', formato, filas_por_parte=len(filas) - 1) as escritor:
+        escritor.escribir(filas)
+    assert escritor.partes == [len(filas) - 1, 1]
+    lector = LectorColumnar(tmp_path / 'lote')
+    for columna in ('id', 'turno', 'tiempo_circuito'):
+        np.testing.assert_array_equal(lector.columna(columna), filas[columna], err_msg=columna)
+
+
+def test_no_pisa_una_exportacion(tmp_path):
+    EscritorColumnar(tmp_path, filas_por_parte=10).cerrar()
+    with pytest.raises(FileExistsError):
+        EscritorColumnar(tmp_path)
+
+
+def test_exportar_no_depende_de_los_trabajadores(tmp_path):
+    directorios = []
+    for trabajadores in (1, 2):
+        directorio = tmp_path / str(trabajadores)
+        with EscritorColumnar(directorio, filas_por_parte=500) as escritor:
+            ejecutar_montecarlo(40, 'eventos', semilla=2, trabajadores=trabajadores, tam_bloque=10,
+                                exportar=escritor)
+        directorios.append(LectorColumnar(directorio))
+    uno, dos = directorios
+    assert len(uno) == len(dos) > 0
+    for columna in uno.columnas:
+        np.testing.assert_array_equal(uno.columna(columna), dos.columna(columna), err_msg=columna)
+    assert (np.diff(uno.columna('replica').astype(np.int64)) >= 0).all()
@@ -0,0 +1,30 @@
+import numpy as np
+
+import config
+from simulacion import SimuladorResonador
+
+
+def _hasta(sim, minuto):
+    while not sim.finalizada and sim.tiempo_actual < minuto:
+        sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+
+
+def test_volver_atras_y_seguir_repite_el_dia():
+    sim = SimuladorResonador(3, mostrar_agenda=False)
+    _hasta(sim, 24 * 60)
+    completo = sim.pacientes_completados.filas().copy()
+
+    sim.buscar(120)
+    assert abs(sim.tiempo_actual - 120) < config.INTERVALO_KEYFRAMES + 1
+    assert len(sim.pacientes_completados) < len(completo)
+    _hasta(sim, 24 * 60)
+    np.testing.assert_array_equal(sim.pacientes_completados.filas(), completo)
+
+
+def test_estado_paciente_por_nombre_y_con_copias():
+    sim = SimuladorResonador(1, mostrar_agenda=False)
+    _hasta(sim, 90)
+    p = next(p for p in sim.todos_los_pacientes() if p.marcas)
+    estado = sim._estado_paciente(p)
+    assert estado['posicion'] == list(p.posicion) and estado['posicion'] is not p.posicion
+    assert estado['marcas'] == p.marcas and estado['marcas'] is not p.marcas
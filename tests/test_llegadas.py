@@ -0,0 +1,66 @@
+import pytest
+
+from llegadas import CalendarioLlegadas
+
+
+class _Paciente:
+    def __init__(self, id, hora):
+        self.id = id
+        self.hora_llegada_real = hora
+
+
+def _vaciar(calendario):
+    salida = []
+    while calendario.proximo() is not None:
+        salida.append(calendario.sacar().id)
+    return salida
+
+
+def test_orden_por_hora_y_empates_por_orden_de_agregado():
+    pacientes = [_Paciente(i, hora) for i, hora in enumerate([30, 10, 30, 0, 10])]
+    calendario = CalendarioLlegadas(pacientes)
+    assert len(calendario) == 5
+    assert [p.id for p in calendario] == [3, 1, 4, 0, 2]
+    assert _vaciar(calendario) == [3, 1, 4, 0, 2]
+    assert len(calendario) == 0
+
+
+def test_agregar_cancelar_y_reprogramar():
+    a, b, c = _Paciente(1, 10), _Paciente(2, 20), _Paciente(3, 30)
+    calendario = CalendarioLlegadas([a, b])
+    calendario.agregar(c)
+    calendario.cancelar(a)
+    assert a not in calendario and b in calendario
+    calendario.reprogramar(c, 5)
+    assert c.hora_llegada_real == 5
+    assert _vaciar(calendario) == [3, 2]
+
+
+def test_errores():
+    a = _Paciente(1, 10)
+    calendario = CalendarioLlegadas([a])
+    with pytest.raises(ValueError):
+        calendario.agregar(a)
+    calendario.cancelar(a)
+    with pytest.raises(ValueError):
+        calendario.cancelar(a)
+
+
+def test_muchas_cancelaciones_no_acumulan_entradas():
+    pacientes = [_Paciente(i, i) for i in range(1000)]
+    calendario = CalendarioLlegadas(pacientes)
+    for p in pacientes[:990]:
+        calendario.cancelar(p)
+    assert len(calendario._heap) < 100
+    assert _vaciar(calendario) == list(range(990, 1000))
+
+
+def test_estado_y_restaurar():
+    pacientes = [_Paciente(i, 10 * i) for i in range(4)]
+    calendario = CalendarioLlegadas(pacientes)
+    calendario.sacar()
+    estado = calendario.estado()
+    calendario.sacar()
+    calendario.cancelar(pacientes[3])
+    calendario.restaurar(estado)
+    assert _vaciar(calendario) == [1, 2, 3]
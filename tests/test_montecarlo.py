@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from montecarlo import ejecutar_montecarlo
+from resumen import escenario_config
+
+
+def test_escenario_llega_a_los_procesos(spawn):
+    with escenario_config({'TIEMPO_BOX': (20, 30)}):
+        uno = ejecutar_montecarlo(400, 'vectorizado', semilla=7, trabajadores=1, tam_bloque=100)
+        dos = ejecutar_montecarlo(400, 'vectorizado', semilla=7, trabajadores=2, tam_bloque=100)
+    base = ejecutar_montecarlo(400, 'vectorizado', semilla=7, trabajadores=1, tam_bloque=100)
+    np.testing.assert_array_equal(uno.dias['total_pacientes'], dos.dias['total_pacientes'])
+    assert uno.dias['total_pacientes'].mean() < base.dias['total_pacientes'].mean()
+
+
+@pytest.mark.parametrize('motor', ['vectorizado', 'eventos', 'recursivo'])
+def test_identico_para_cualquier_cantidad_de_trabajadores(motor):
+    uno = ejecutar_montecarlo(600, motor, semilla=3, trabajadores=1, tam_bloque=100)
+    tres = ejecutar_montecarlo(600, motor, semilla=3, trabajadores=3, tam_bloque=100)
+    for campo, valores in uno.dias.items():
+        np.testing.assert_array_equal(valores, tres.dias[campo], err_msg=campo)
+    assert uno.acumulador.resumen() == tres.acumulador.resumen()
+
+
+def test_misma_semilla_mismo_resultado_y_otra_semilla_otro():
+    a = ejecutar_montecarlo(200, 'vectorizado', semilla=5, trabajadores=1, tam_bloque=100)
+    b = ejecutar_montecarlo(200, 'vectorizado', semilla=5, trabajadores=1, tam_bloque=100)
+    c = ejecutar_montecarlo(200, 'vectorizado', semilla=6, trabajadores=1, tam_bloque=100)
+    np.testing.assert_array_equal(a.dias['hora_finalizacion_min'], b.dias['hora_finalizacion_min'])
+    assert not np.array_equal(a.dias['hora_finalizacion_min'], c.dias['hora_finalizacion_min'])
+
+
+@pytest.mark.parametrize('motor', ['eventos', 'recursivo'])
+def test_fin_real_es_el_ultimo_completado(motor, tmp_path):
+    from exportacion import EscritorColumnar, LectorColumnar
+    with EscritorColumnar(tmp_path, filas_por_parte=1000) as escritor:
+        resultado = ejecutar_montecarlo(30, motor, semilla=4, trabajadores=1, tam_bloque=10, exportar=escritor)
+    lector = LectorColumnar(tmp_path)
+    replica, fin = lector.columna('replica'), lector.columna('t_completado')
+    ultimo = np.zeros(30)
+    np.maximum.at(ultimo, replica, fin)
+    np.testing.assert_allclose(resultado.dias['fin_real_min'], ultimo, rtol=1e-6)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import config
+from simulacion import SimuladorResonador
+from motor_eventos import SimuladorEventos
+
+MARCAS = ('t_llegada', 't_validacion', 't_box', 't_resonador', 't_saliendo', 't_completado')
+
+
+def _dia_cuadros(semilla):
+    sim = SimuladorResonador(semilla, mostrar_agenda=False)
+    while not sim.finalizada and sim.tiempo_actual < 24 * 60:
+        sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+    assert sim.finalizada
+    return np.sort(sim.pacientes_completados.filas(), order='id')
+
+
+def _dia_eventos(semilla):
+    sim = SimuladorEventos(rng=semilla)
+    sim.ejecutar()
+    return np.sort(sim.pacientes_completados.filas(), order='id')
+
+
+@pytest.mark.parametrize('semilla', range(4))
+def test_misma_agenda_y_mismos_servicios(semilla):
+    cuadros, eventos = _dia_cuadros(semilla), _dia_eventos(semilla)
+    for campo in ('id', 'tipo', 'turno', 'desvio', 'validacion', 'box', 'resonador', 'salida'):
+        np.testing.assert_array_equal(cuadros[campo], eventos[campo])
+
+
+@pytest.mark.parametrize('semilla', range(4))
+def test_mismo_orden_y_nunca_antes_que_cuadros(semilla):
+    """Sin los mínimos visuales el motor de eventos atiende en el mismo
+    orden y ningún paciente termina más tarde que en la ventana"""
+    cuadros, eventos = _dia_cuadros(semilla), _dia_eventos(semilla)
+    np.testing.assert_array_equal(np.argsort(cuadros['t_resonador']), np.argsort(eventos['t_resonador']))
+    assert (eventos['t_completado'] <= cuadros['t_completado'] + 1e-4).all()
+
+
+@pytest.mark.parametrize('semilla', range(4))
+def test_marcas_en_orden(semilla):
+    eventos = _dia_eventos(semilla)
+    marcas = np.column_stack([eventos[m] for m in MARCAS])
+    assert (np.diff(marcas, axis=1) >= 0).all()
+    assert (eventos['t_llegada'] >= eventos['hora_llegada'] - 1e-4).all()
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import config
+from muestreo import muestrear_dias
+from simulacion import pacientes_desde_muestra
+from motor_eventos import SimuladorEventos
+from motor_recursivo import MARCAS, simular_tandem, verificar_capacidades
+from exportacion import filas_tandem
+from montecarlo import ejecutar_montecarlo
+
+
+@pytest.mark.parametrize('sala', [1, 2, 3])
+def test_mismos_minutos_que_el_motor_de_eventos(monkeypatch, sala):
+    monkeypatch.setattr(config, 'CAPACIDAD_SALA_ESPERA', sala)
+    muestras = muestrear_dias(60, np.random.default_rng(sala))
+    filas = filas_tandem(muestras, simular_tandem(muestras))
+    for dia in range(60):
+        k = int(muestras['n_pacientes'][dia])
+        sim = SimuladorEventos(pacientes_desde_muestra(muestras, dia, range(k), muestras['turno'][dia, :k]))
+        sim.ejecutar()
+        eventos = sim.pacientes_completados.filas()
+        recursivo = filas[filas['replica'] == dia]
+        # Mismo orden de finalización, mismos pacientes, mismos minutos
+        np.testing.assert_array_equal(recursivo['id'], eventos['id'])
+        for marca in MARCAS:
+            np.testing.assert_array_equal(recursivo[marca], eventos[marca], err_msg=f"día {dia}, {marca}")
+
+
+@pytest.mark.parametrize('nombre', ['CAPACIDAD_MESAS', 'CAPACIDAD_BOXES', 'CAPACIDAD_RESONADORES'])
+def test_rechaza_mas_de_un_puesto(monkeypatch, nombre):
+    verificar_capacidades()
+    monkeypatch.setattr(config, nombre, 2)
+    with pytest.raises(ValueError, match=nombre):
+        verificar_capacidades()
+    with pytest.raises(ValueError):
+        simular_tandem(muestrear_dias(2, np.random.default_rng(0)))
+    with pytest.raises(ValueError):
+        ejecutar_montecarlo(10, 'recursivo', semilla=0, trabajadores=1)
@@ -0,0 +1,29 @@
+import numpy as np
+
+import config
+from optimizador import PoliticaAgenda, _muestras_comunes, evaluar_politicas, politicas_percentil
+from muestreo import TIPOS
+from resumen import escenario_config
+
+
+def test_escenario_llega_a_los_procesos(spawn):
+    politicas = politicas_percentil((80,), (0, 2), (0,))
+    with escenario_config({'TIEMPO_BOX': (20, 30)}):
+        uno = evaluar_politicas(politicas, n_dias=8, semilla=1, trabajadores=1)
+        dos = evaluar_politicas(politicas * 5, n_dias=8, semilla=1, trabajadores=2)[:len(politicas)]
+    for a, b in zip(uno, dos):
+        np.testing.assert_array_equal(a['costo_por_dia'], b['costo_por_dia'])
+
+
+def test_dias_comunes_cambian_con_el_escenario(monkeypatch):
+    semilla = np.random.SeedSequence(0)
+    antes = _muestras_comunes(semilla, 5)['box'].copy()
+    monkeypatch.setattr(config, 'TIEMPO_BOX', (20, 30))
+    despues = _muestras_comunes(semilla, 5)['box']
+    assert despues.min() >= 20 and not np.array_equal(antes, despues)
+
+
+def test_dia_sin_turnos_no_sobreturna(monkeypatch):
+    monkeypatch.setattr(config, 'LIMITE_TURNOS', -1)
+    politica = PoliticaAgenda({tipo: 30 for tipo in TIPOS}, sobreturnos=2)
+    assert politica.agenda(np.zeros((2, 10), dtype=int)) == [([], []), ([], [])]
@@ -0,0 +1,75 @@
+import pytest
+
+import config
+from recursos import PoolRecursos
+from motor_eventos import SimuladorEventos
+
+
+class _Paciente:
+    def __init__(self, turno):
+        self.turno_asignado = turno
+        self.puesto = None
+        self.listo = False
+
+
+def test_ocupa_el_puesto_libre_mas_bajo():
+    pool = PoolRecursos(3, 'FIFO')
+    a, b, c = _Paciente(0), _Paciente(1), _Paciente(2)
+    assert [pool.ocupar(p) for p in (a, b, c)] == [0, 1, 2]
+    assert not pool.hay_lugar()
+    pool.liberar(b)
+    assert pool.hay_lugar() and len(pool) == 2
+    assert pool.ocupantes() == [a, c]
+    assert pool.ocupar(_Paciente(3)) == 1
+
+
+@pytest.mark.parametrize('disciplina, esperado', [('FIFO', [2, 0, 1]), ('TURNO', [0, 1, 2])])
+def test_disciplina_de_la_cola(disciplina, esperado):
+    pool = PoolRecursos(3, disciplina)
+    pacientes = [_Paciente(turno) for turno in (0, 30, 60)]
+    for p in pacientes:
+        pool.ocupar(p)
+    for i in (2, 0, 1):
+        pool.encolar_listo(pacientes[i])
+    salen = []
+    while pool.hay_listos():
+        salen.append(pacientes.index(pool.sacar_listo()))
+    assert salen == esperado
+    assert len(pool) == 0
+
+
+def test_estado_y_restaurar():
+    pool = PoolRecursos(2, 'FIFO')
+    a, b = _Paciente(0), _Paciente(1)
+    pool.ocupar(a)
+    pool.encolar_listo(a)
+    estado = pool.estado()
+    pool.ocupar(b)
+    pool.sacar_listo()
+    pool.restaurar(estado)
+    assert pool.ocupantes() == [a] and pool.hay_listos() and pool.hay_lugar()
+    assert pool.sacar_listo() is a
+
+
+def test_capacidad_y_disciplina_invalidas():
+    with pytest.raises(ValueError):
+        PoolRecursos(0)
+    with pytest.raises(ValueError):
+        PoolRecursos(1, 'LIFO')
+
+
+@pytest.mark.parametrize('mesas, boxes, resonadores', [(1, 1, 1), (2, 3, 1), (2, 4, 2)])
+def test_motor_de_eventos_con_varios_puestos(monkeypatch, mesas, boxes, resonadores):
+    monkeypatch.setattr(config, 'CAPACIDAD_MESAS', mesas)
+    monkeypatch.setattr(config, 'CAPACIDAD_BOXES', boxes)
+    monkeypatch.setattr(config, 'CAPACIDAD_RESONADORES', resonadores)
+    for semilla in range(5):
+        sim = SimuladorEventos(rng=semilla)
+        agendados = len(sim.pacientes_programados)
+        sim.ejecutar()
+        filas = sim.pacientes_completados.filas()
+        assert len(filas) == agendados
+        # Nunca hay más pacientes en el resonador que resonadores
+        inicio, fin = filas['t_resonador'], filas['t_saliendo']
+        en_resonador = ((inicio[:, None] <= inicio[None, :]) & (inicio[None, :] < fin[:, None])).sum(axis=0)
+        assert en_resonador.max() <= resonadores
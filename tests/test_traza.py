@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+import config
+from simulacion import SimuladorResonador
+from traza import EXTENSION_INDICE, EscritorTraza, LectorTraza, ReproductorTraza, grabar_dias
+
+
+def _grabar_dia(ruta, semilla):
+    with EscritorTraza(ruta) as traza:
+        sim = SimuladorResonador(semilla, mostrar_agenda=False, traza=traza)
+        while not sim.finalizada:
+            sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+    return sim
+
+
+def test_agenda_y_transiciones(tmp_path):
+    ruta = str(tmp_path / 'dia.trz')
+    sim = _grabar_dia(ruta, 4)
+    lector = LectorTraza(ruta)
+    assert lector.n_dias == 1
+    dia = lector.dia(0)
+    pacientes = dia.pacientes()
+    completados = np.sort(sim.pacientes_completados.filas(), order='id')
+    assert [p.id for p in pacientes] == completados['id'].tolist()
+    for p, fila in zip(pacientes, completados):
+        assert p.turno_asignado == fila['turno']
+        assert p.tiempo_total_resonador == pytest.approx(fila['resonador'], abs=1e-4)
+    # Seis transiciones por paciente, en orden de tiempo
+    assert len(dia) == 6 * len(pacientes)
+    assert (np.diff(dia.transiciones['tiempo']) >= 0).all()
+
+
+def test_reproducir_da_los_mismos_completados(tmp_path):
+    ruta = str(tmp_path / 'dia.trz')
+    sim = _grabar_dia(ruta, 2)
+    reproductor = ReproductorTraza(LectorTraza(ruta))
+    reproductor.buscar(reproductor.generar_keyframes())
+    assert reproductor.finalizada
+    grabados, reproducidos = sim.pacientes_completados.filas(), reproductor.pacientes_completados.filas()
+    np.testing.assert_array_equal(reproducidos['id'], grabados['id'])
+    np.testing.assert_allclose(reproducidos['t_completado'], grabados['t_completado'], atol=1e-3)
+    assert reproductor.obtener_estadisticas_dia()['total_pacientes'] == len(grabados)
+
+    # Hacia atrás rearma el día
+    reproductor.buscar(60.0)
+    assert not reproductor.finalizada
+    assert len(reproductor.pacientes_completados) < len(grabados)
+
+
+def test_agrega_dias_y_reconstruye_el_indice(tmp_path):
+    ruta = str(tmp_path / 'dias.trz')
+    grabar_dias(ruta, 2, rng=0)
+    grabar_dias(ruta, 1, rng=1)
+    lector = LectorTraza(ruta)
+    assert lector.n_dias == 3
+    inicios = lector.inicios_dia.copy()
+    del lector
+    os.remove(ruta + EXTENSION_INDICE)
+    np.testing.assert_array_equal(LectorTraza(ruta).inicios_dia, inicios)
@@ -0,0 +1,325 @@
+"""Traza binaria de transiciones: grabación compacta y reproducción sin re-simular"""
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import numpy as np
+import config
+from paciente import Paciente
+from muestreo import TIPOS
+from simulacion import SimuladorResonador
+from registro import RegistroPacientes
+from estadisticas import EstadisticasDia
+from recursos import PoolRecursos
+from llegadas import CalendarioLlegadas
+from rutas import TABLA_RUTAS
+
+# Un registro de 8 bytes. Según `codigo`:
+#   0..5      transición al estado ESTADOS[codigo]; dato = ruta iniciada (3 bits,
+#             0 = ninguna) + puesto ocupado en la etapa (5 bits altos)
+#   DIA       comienzo de día; tiempo = número de día, paciente = pacientes agendados
+#   ATRIBUTO  dato de agenda; paciente = id, dato = índice en ATRIBUTOS, tiempo = valor
+DTYPE_TRAZA = np.dtype([
+    ('tiempo', '<f4'),
+    ('paciente', '<u2'),
+    ('codigo', 'u1'),
+    ('dato', 'u1'),
+])
+
+MAGIA = b'TRZRES01'
+EXTENSION_INDICE = '.idx'
+
+ESTADOS = ('LLEGADA', 'VALIDACION', 'BOX', 'RESONADOR', 'SALIENDO', 'COMPLETADO')
+RUTAS = list(config.RUTAS)  # código de ruta = posición + 1
+DIA = 0xF0
+ATRIBUTO = 0xF1
+
+# Lo que se guarda de cada paciente al comienzo del día (tipo como índice en TIPOS)
+ATRIBUTOS = ('turno_asignado', 'desvio_llegada', 'tiempo_validacion', 'tiempo_box',
+             'tipo_estudio', 'tiempo_scan', 'tiempo_posicionamiento', 'tiempo_salida')
+
+_CODIGO_ESTADO = {estado: i for i, estado in enumerate(ESTADOS)}
+_CODIGO_RUTA = {ruta: i + 1 for i, ruta in enumerate(RUTAS)}
+_MAX_PUESTO = 31
+
+# Margen para comparar minutos guardados en float32 con el reloj en float64
+_TOLERANCIA = 1e-3
+
+# Píxeles recorridos por minuto simulado (igual que en la ventana a velocidad normal)
+PIXELES_POR_MINUTO = config.VELOCIDAD_PACIENTE * config.PASO_VISUAL / config.PASO_SIMULACION
+
+
+class EscritorTraza:
+    """Escribe la traza en modo append: si el archivo ya existe, los días
+    nuevos se agregan al final. Los registros se juntan en un buffer y se
+    escriben de a bloques. Al cerrar se guarda el índice de días al lado
+    (`<archivo>.idx`) para que abrirla no requiera recorrerla."""
+
+    def __init__(self, ruta_archivo, tam_buffer=4096):
+        self.ruta_archivo = ruta_archivo
+        if os.path.exists(ruta_archivo) and os.path.getsize(ruta_archivo) > 0:
+            lector = LectorTraza(ruta_archivo)
+            self._inicios_dia = lector.inicios_dia.tolist()
+            self._registros = len(lector)
+            del lector
+        else:
+            with open(ruta_archivo, 'wb') as f:
+                f.write(MAGIA)
+            self._inicios_dia = []
+            self._registros = 0
+        self._archivo = open(ruta_archivo, 'ab')
+        self._buffer = np.zeros(tam_buffer, dtype=DTYPE_TRAZA)
+        self._n = 0
+
+    @property
+    def dias(self):
+        return len(self._inicios_dia)
+
+    def _escribir(self, tiempo, paciente, codigo, dato=0):
+        if self._n == len(self._buffer):
+            self.vaciar()
+        self._buffer[self._n] = (tiempo, paciente, codigo, dato)
+        self._n += 1
+        self._registros += 1
+
+    def iniciar_dia(self, pacientes):
+        """Abre un día nuevo y guarda la agenda (lo que muestra el panel de métricas)"""
+        self._inicios_dia.append(self._registros)
+        self._escribir(len(self._inicios_dia) - 1, len(pacientes), DIA)
+        for p in pacientes:
+            valores = (p.turno_asignado, p.desvio_llegada, p.tiempo_validacion, p.tiempo_box,
+                       TIPOS.index(p.tipo_estudio), p.tiempo_scan, p.tiempo_posicionamiento,
+                       p.tiempo_salida)
+            for i, valor in enumerate(valores):
+                self._escribir(valor, p.id, ATRIBUTO, i)
+
+    def transicion(self, id_paciente, estado, minuto, ruta=None, puesto=0):
+        """Registra un cambio de estado, la ruta que arranca (clave de
+        config.RUTAS) y el puesto que ocupa en la nueva etapa"""
+        if puesto > _MAX_PUESTO:
+            raise ValueError(f"La traza admite hasta {_MAX_PUESTO + 1} puestos por etapa")
+        codigo_ruta = _CODIGO_RUTA[ruta] if ruta is not None else 0
+        self._escribir(minuto, id_paciente, _CODIGO_ESTADO[estado], codigo_ruta | puesto << 3)
+
+    def vaciar(self):
+        if self._n:
+            self._archivo.write(self._buffer[:self._n].tobytes())
+            self._n = 0
+
+    def cerrar(self):
+        if self._archivo.closed:
+            return
+        self.vaciar()
+        self._archivo.close()
+        # Índice: cantidad de registros (para validarlo) + inicio de cada día
+        np.array([self._registros] + self._inicios_dia, dtype='<i8').tofile(
+            self.ruta_archivo + EXTENSION_INDICE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class DiaTraza:
+    """Un día de la traza: agenda y transiciones (vistas sobre el mmap)"""
+
+    def __init__(self, numero, agenda, transiciones):
+        self.numero = numero
+        self.agenda = agenda                # registros ATRIBUTO, forma (pacientes, len(ATRIBUTOS))
+        self.transiciones = transiciones    # registros de transición, ordenados por tiempo
+
+    def __len__(self):
+        return len(self.transiciones)
+
+    def buscar(self, minuto):
+        """Cantidad de transiciones ocurridas hasta `minuto` inclusive (búsqueda binaria)"""
+        return int(np.searchsorted(self.transiciones['tiempo'], minuto, side='right'))
+
+    def pacientes(self, fecha_inicio=None):
+        """Pacientes de la agenda, reconstruidos con sus tiempos sorteados"""
+        pacientes = []
+        for fila in self.agenda:
+            turno, desvio, val, box, tipo, scan, pos, salida = fila['tiempo'].tolist()
+            p = Paciente(turno, fecha_inicio, id_paciente=int(fila['paciente'][0]),
+                         muestra=(desvio, val, box, TIPOS[int(tipo)], scan, pos, salida))
+            p.hora_llegada_real = turno + desvio
+            p.estado = 'PROGRAMADO'
+            pacientes.append(p)
+        return pacientes
+
+
+class LectorTraza:
+    """Abre una traza con memoria mapeada: abrirla no lee los registros.
+
+    El índice de días sale de `<archivo>.idx` si coincide con el archivo; si
+    no (traza sin cerrar o recortada) se reconstruye con una pasada vectorizada.
+    """
+
+    def __init__(self, ruta_archivo):
+        self.ruta_archivo = ruta_archivo
+        with open(ruta_archivo, 'rb') as f:
+            if f.read(len(MAGIA)) != MAGIA:
+                raise ValueError(f"{ruta_archivo} no es una traza de simulación")
+        n = (os.path.getsize(ruta_archivo) - len(MAGIA)) // DTYPE_TRAZA.itemsize
+        if n:
+            self.registros = np.memmap(ruta_archivo, dtype=DTYPE_TRAZA, mode='r',
+                                       offset=len(MAGIA), shape=(n,))
+        else:
+            self.registros = np.zeros(0, dtype=DTYPE_TRAZA)
+        self.inicios_dia = self._leer_indice()
+
+    def _leer_indice(self):
+        ruta_indice = self.ruta_archivo + EXTENSION_INDICE
+        if os.path.exists(ruta_indice):
+            indice = np.fromfile(ruta_indice, dtype='<i8')
+            if len(indice) and indice[0] == len(self.registros):
+                return indice[1:]
+        return np.flatnonzero(self.registros['codigo'] == DIA)
+
+    def __len__(self):
+        return len(self.registros)
+
+    @property
+    def n_dias(self):
+        return len(self.inicios_dia)
+
+    def dia(self, numero):
+        inicio = int(self.inicios_dia[numero])
+        fin = int(self.inicios_dia[numero + 1]) if numero + 1 < self.n_dias else len(self.registros)
+        n_pacientes = int(self.registros[inicio]['paciente'])
+        fin_agenda = inicio + 1 + n_pacientes * len(ATRIBUTOS)
+        agenda = self.registros[inicio + 1:fin_agenda].reshape(n_pacientes, len(ATRIBUTOS))
+        return DiaTraza(numero, agenda, self.registros[fin_agenda:fin])
+
+
+class ReproductorTraza(SimuladorResonador):
+    """Reproduce un día grabado con la misma interfaz que SimuladorResonador,
+    así que Visualizador lo muestra sin cambios. No sortea ni aplica reglas:
+    solo avanza un cursor sobre las transiciones y ubica a cada paciente
+    sobre su ruta según el tiempo desde que la empezó. R pasa al día siguiente.
+    """
+
+    def __init__(self, lector, dia=0):
+        self.lector = lector
+        self.numero_dia = dia % lector.n_dias
+        self.dia = lector.dia(self.numero_dia)
+        # La traza no guarda la semilla: el resumen (S) se sortea con el
+        # número de día, así reproducir la misma traza da el mismo resumen
+        self.rng = np.random.default_rng(self.numero_dia)
+        self.traza = None
+        self.mostrar_agenda = False
+        self.pausada = False
+        t = self.dia.transiciones
+        self._tiempos = t['tiempo'].tolist()
+        self._ids = t['paciente'].tolist()
+        self._codigos = t['codigo'].tolist()
+        self._rutas = t['dato'].tolist()
+        self.buscar(0.0, desde_cero=True)
+
+    def _reiniciar_estado(self):
+        self.fecha_inicio = datetime.now().replace(hour=config.HORA_INICIO, minute=0, second=0, microsecond=0)
+        self.tiempo_actual = 0.0
+        self.datetime_actual = self.fecha_inicio
+        pacientes = self.dia.pacientes(self.fecha_inicio)
+        self.pacientes_programados = CalendarioLlegadas(pacientes)
+        self._por_id = {p.id: p for p in pacientes}
+        # Tantos puestos por etapa como el más alto que aparece en el día
+        puestos = {}
+        for codigo, dato in zip(self._codigos, self._rutas):
+            puestos[codigo] = max(puestos.get(codigo, 0), dato >> 3)
+        self.sala, self.mesas, self.boxes, self.resonadores = (
+            PoolRecursos(puestos.get(_CODIGO_ESTADO[estado], 0) + 1)
+            for estado in ('LLEGADA', 'VALIDACION', 'BOX', 'RESONADOR'))
+        self.pacientes_saliendo = []
+        self.pacientes_completados = RegistroPacientes()
+        self.estadisticas = EstadisticasDia()
+        self.finalizada = False
+        self._cursor = 0
+        self._en_ruta = {}  # id -> (minuto de inicio, id de la ruta compilada)
+
+    def actualizar(self, delta_sim, delta_real=0.0, multiplicador_velocidad=1.0):
+        if self.pausada or self.finalizada:
+            return
+        self._avanzar_hasta(self.tiempo_actual + delta_sim)
+
+    def buscar(self, minuto, desde_cero=False):
+        """Salta a `minuto`: hacia atrás rearma el día y reaplica las transiciones"""
+        if desde_cero or minuto < self.tiempo_actual:
+            self._reiniciar_estado()
+        self._avanzar_hasta(minuto)
+
+    def generar_keyframes(self):
+        """Nada que precalcular: la traza ya tiene todo el día. Devuelve el
+        minuto de la última transición."""
+        return self._tiempos[-1] if self._tiempos else 0.0
+    
+    def _avanzar_hasta(self, minuto):
+        self.tiempo_actual = minuto
+        self.datetime_actual = self.fecha_inicio + timedelta(minutes=minuto)
+        fin = bisect_right(self._tiempos, minuto + _TOLERANCIA)
+        while self._cursor < fin:
+            self._aplicar(self._cursor)
+            self._cursor += 1
+        self.ubicar_pacientes()
+        self.finalizada = self._cursor >= len(self._tiempos)
+
+    def _aplicar(self, k):
+        p = self._por_id[self._ids[k]]
+        estado = ESTADOS[self._codigos[k]]
+        t = self._tiempos[k]
+        codigo_ruta, puesto = self._rutas[k] & 7, self._rutas[k] >> 3
+        p.cambiar_estado(estado, t)
+
+        if estado == 'LLEGADA':
+            self.pacientes_programados.cancelar(p)
+            self.sala.ocupar(p, puesto)
+        elif estado == 'VALIDACION':
+            self.sala.liberar(p)
+            self.mesas.ocupar(p, puesto)
+        elif estado == 'BOX':
+            self.mesas.liberar(p)
+            self.boxes.ocupar(p, puesto)
+        elif estado == 'RESONADOR':
+            self.boxes.liberar(p)
+            self.resonadores.ocupar(p, puesto)
+        elif estado == 'SALIENDO':
+            self.resonadores.liberar(p)
+            self.pacientes_saliendo.append(p)
+        elif estado == 'COMPLETADO':
+            self.pacientes_saliendo.remove(p)
+            self.pacientes_completados.agregar(p)
+            self.estadisticas.registrar(p)
+            self._en_ruta.pop(p.id, None)
+
+        if codigo_ruta:
+            # Cada ruta arranca donde terminó la anterior (las mismas rutas
+            # compiladas que usa el simulador)
+            anterior = self._en_ruta.get(p.id)
+            origen = TABLA_RUTAS.destino(anterior[1]) if anterior else None
+            self._en_ruta[p.id] = (t, TABLA_RUTAS.compilar(RUTAS[codigo_ruta - 1], puesto, origen))
+
+    def ubicar_pacientes(self):
+        """Todos los que tienen ruta, ubicados en una sola operación"""
+        if not self._en_ruta:
+            return
+        ids = list(self._en_ruta)
+        inicios, rutas = np.array([self._en_ruta[i] for i in ids]).T
+        distancias = (self.tiempo_actual - inicios) * PIXELES_POR_MINUTO
+        for id_paciente, xy in zip(ids, TABLA_RUTAS.posiciones(rutas, distancias).tolist()):
+            self._por_id[id_paciente].posicion = xy
+
+    def reiniciar(self):
+        self.__init__(self.lector, self.numero_dia + 1)
+
+
+def grabar_dias(ruta_archivo, n_dias, rng=None):
+    """Simula `n_dias` sin ventana (mismos sub-pasos que la ventana) y los agrega a la traza"""
+    with EscritorTraza(ruta_archivo) as traza:
+        sim = SimuladorResonador(rng, mostrar_agenda=False, traza=traza)
+        for dia in range(n_dias):
+            if dia:
+                sim.reiniciar()
+            while not sim.finalizada and sim.tiempo_actual < 24 * 60:
+                sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+    return ruta_archivo
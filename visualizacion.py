@@ -1,7 +1,38 @@
 """Visualización V3.1 - Con salida completa y resumen automático"""
 import pygame
 import sys
+from collections import OrderedDict
 import config
+from muestreo import simular_dia_rapido, min_a_hora
+from perfilador import PERFILADOR, FASES, reloj
+
+RADIO_PACIENTE = 16
+ZONA_METRICAS = pygame.Rect(980, 70, 284, 604)  # panel + sombra
+ZONA_CONTROLES = pygame.Rect(0, config.VENTANA_ALTO - 55, config.VENTANA_ANCHO, 60)
+ZONA_RELOJ = pygame.Rect(config.VENTANA_ANCHO - 110, 0, 110, 50)
+LINEA_TIEMPO = pygame.Rect(200, 6, config.VENTANA_ANCHO - 230, 12)  # local a la barra inferior
+LINEA_TIEMPO_PANTALLA = LINEA_TIEMPO.move(ZONA_CONTROLES.x, ZONA_CONTROLES.y).inflate(0, 10)
+ZONA_PERFIL = pygame.Rect(10, 60, 290, 42 + 16 * len(FASES))
+REFRESCO_PERFIL_MS = 500  # el panel de perfilado se re-renderiza a lo sumo 2 veces por segundo
+
+
+class CacheLRU:
+    """Diccionario acotado que descarta lo usado hace más tiempo"""
+    
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+    
+    def obtener(self, clave, crear):
+        try:
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+        except KeyError:
+            valor = self._datos[clave] = crear()
+            if len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+            return valor
+
 
 class Visualizador:
     def __init__(self, simulador):
@@ -14,12 +45,39 @@ class Visualizador:
         self.fuente_pequena = pygame.font.Font(None, 18)
         self.fuente_titulo = pygame.font.Font(None, 28)
         self.ejecutando = True
+        # velocidad en minutos simulados por segundo real
         self.velocidad_normal = config.VELOCIDAD_SIMULACION_DEFAULT
         self.velocidad_rapida = self.velocidad_normal * 2
         self.velocidad = self.velocidad_normal
         self.modo_rapido = False
+        
+        # Minutos simulados pendientes de consumir en sub-pasos fijos y
+        # posiciones antes del último sub-paso (para interpolar el dibujo)
+        self.acumulador_sim = 0.0
+        self.alfa = 0.0
+        self.posiciones_previas = {}
         self.mostrar_resumen = False
-        self.pacientes_dia_completo = []
+        self.estadisticas_dia_completo = None
+        self.resumen_dibujado = False
+        
+        # Textos y sprites ya renderizados; los paneles se vuelven a
+        # renderizar solo cuando cambia su contenido
+        self.cache_textos = CacheLRU(512)
+        self.cache_sprites = CacheLRU(1024)
+        self.paneles = {}  # nombre -> (clave de contenido, superficie)
+        self.texto_reloj = None
+        # Panel de perfilado (F3); si el perfilador arrancó prendido se muestra
+        self.mostrar_perfil = PERFILADOR.activo
+        
+        # El plano no cambia: se dibuja una vez y cada cuadro solo se
+        # repintan las zonas que cambian (pygame.display.update(rects))
+        self.fondo = self._crear_fondo()
+        self.rects_pacientes = []
+        self.redibujar_todo = True
+        
+        # Keyframes de todo el día: saltar en la línea de tiempo es instantáneo.
+        # La línea cubre la jornada más una hora, o el día entero si termina después.
+        self.minutos_linea = self._preparar_linea_tiempo()
     
     def ejecutar(self):
         while self.ejecutando:
@@ -27,14 +85,11 @@ class Visualizador:
             self._procesar_eventos()
             
             if not self.sim.pausada and not self.sim.finalizada and not self.mostrar_resumen:
-                dt_sim = self.velocidad / config.FPS
-                mult_vel = 2.0 if self.modo_rapido else 1.0
-                self.sim.actualizar(dt_sim, dt_real, mult_vel)
+                self._avanzar(dt_real)
             
             if self.sim.finalizada and not self.mostrar_resumen:
                 # Simular día completo antes de mostrar resumen
-                self.pacientes_dia_completo = self.sim.simular_dia_completo_rapido()
-                self.mostrar_resumen = True
+                self._abrir_resumen()
             
             if self.mostrar_resumen:
                 self._dibujar_resumen()
@@ -48,11 +103,19 @@ class Visualizador:
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 self.ejecutando = False
+            elif ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
+                if LINEA_TIEMPO_PANTALLA.collidepoint(ev.pos):
+                    self._buscar(self._minuto_en_linea(ev.pos[0]))
+            elif ev.type == pygame.MOUSEMOTION and ev.buttons[0]:
+                # Arrastrar sobre la línea de tiempo
+                if LINEA_TIEMPO_PANTALLA.collidepoint(ev.pos):
+                    self._buscar(self._minuto_en_linea(ev.pos[0]))
             elif ev.type == pygame.KEYDOWN:
                 if ev.key == pygame.K_RETURN:
                     if self.mostrar_resumen:
                         self.mostrar_resumen = False
-                        self.pacientes_dia_completo = []
+                        self.estadisticas_dia_completo = None
+                        self.redibujar_todo = True
                 elif ev.key == pygame.K_SPACE:
                     if self.sim.pausada:
                         self.sim.reanudar()
@@ -61,185 +124,428 @@ class Visualizador:
                 elif ev.key == pygame.K_v:
                     self.modo_rapido = not self.modo_rapido
                     self.velocidad = self.velocidad_rapida if self.modo_rapido else self.velocidad_normal
+                elif ev.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS, pygame.K_UP):
+                    self._ajustar_velocidad(config.FACTOR_AJUSTE_VELOCIDAD)
+                elif ev.key in (pygame.K_MINUS, pygame.K_KP_MINUS, pygame.K_DOWN):
+                    self._ajustar_velocidad(1 / config.FACTOR_AJUSTE_VELOCIDAD)
                 elif ev.key == pygame.K_s:
                     # Simular día completo y mostrar resumen
-                    self.pacientes_dia_completo = self.sim.simular_dia_completo_rapido()
-                    self.mostrar_resumen = True
+                    self._abrir_resumen()
+                elif ev.key == pygame.K_LEFT:
+                    self._buscar(self.sim.tiempo_actual - config.SALTO_LINEA_TIEMPO)
+                elif ev.key == pygame.K_RIGHT:
+                    self._buscar(self.sim.tiempo_actual + config.SALTO_LINEA_TIEMPO)
+                elif ev.key == pygame.K_HOME:
+                    self._buscar(0)
                 elif ev.key == pygame.K_r:
                     self.sim.reiniciar()
+                    self.minutos_linea = self._preparar_linea_tiempo()
+                    self.acumulador_sim = 0.0
+                    self.posiciones_previas = {}
                     self.mostrar_resumen = False
-                    self.pacientes_dia_completo = []
+                    self.estadisticas_dia_completo = None
+                    self.redibujar_todo = True
+                elif ev.key == pygame.K_F3:
+                    self._alternar_perfil()
+                elif ev.key == pygame.K_F4:
+                    print(f"✓ Perfil guardado en {PERFILADOR.volcar()}")
                 elif ev.key == pygame.K_ESCAPE:
                     self.ejecutando = False
     
+    def _avanzar(self, dt_real):
+        """Consume el tiempo simulado acumulado en sub-pasos de PASO_SIMULACION.
+        
+        La cantidad de sub-pasos por cuadro depende de la velocidad y del
+        tiempo real transcurrido, no de los FPS: un cuadro perdido se
+        recupera en el siguiente. Si haría falta más de
+        MAX_SUBPASOS_POR_CUADRO el exceso se descarta para no alargar el cuadro.
+        """
+        self.acumulador_sim += dt_real * self.velocidad
+        pasos = int(self.acumulador_sim / config.PASO_SIMULACION)
+        if pasos > config.MAX_SUBPASOS_POR_CUADRO:
+            pasos = config.MAX_SUBPASOS_POR_CUADRO
+            self.acumulador_sim = pasos * config.PASO_SIMULACION
+        self.acumulador_sim -= pasos * config.PASO_SIMULACION
+        
+        for i in range(pasos):
+            if i == pasos - 1:
+                self.sim.ubicar_pacientes()
+                self.posiciones_previas = {p.id: (p.posicion[0], p.posicion[1])
+                                           for p in self.sim.todos_los_pacientes()}
+            self.sim.actualizar(config.PASO_SIMULACION, config.PASO_VISUAL)
+            if self.sim.finalizada:
+                self.acumulador_sim = 0.0
+                break
+        self.alfa = self.acumulador_sim / config.PASO_SIMULACION
+    
+    def _buscar(self, minuto):
+        """Salta a un minuto del día (keyframe anterior + avance del resto)"""
+        if self.mostrar_resumen:
+            return
+        minuto = min(max(0.0, minuto), self.minutos_linea)
+        self.sim.buscar(minuto)
+        self.acumulador_sim = 0.0
+        self.alfa = 0.0
+        self.posiciones_previas = {}
+    
+    def _preparar_linea_tiempo(self):
+        return max(config.LINEA_TIEMPO_MAX_MIN, self.sim.generar_keyframes())
+    
+    def _minuto_en_linea(self, x):
+        """Minuto del día que corresponde a una coordenada x de la línea de tiempo"""
+        fraccion = (x - LINEA_TIEMPO_PANTALLA.x) / LINEA_TIEMPO_PANTALLA.width
+        return fraccion * self.minutos_linea
+    
+    def _ajustar_velocidad(self, factor):
+        """Cambia la velocidad de forma continua entre VELOCIDAD_MIN_X y VELOCIDAD_MAX_X"""
+        minimo = config.VELOCIDAD_MIN_X / 60
+        maximo = config.VELOCIDAD_MAX_X / 60
+        self.velocidad = min(maximo, max(minimo, self.velocidad * factor))
+        self.modo_rapido = False
+    
+    def _posicion_dibujo(self, p):
+        """Posición interpolada entre el penúltimo y el último sub-paso"""
+        previa = self.posiciones_previas.get(p.id)
+        if previa is None:
+            return int(p.posicion[0]), int(p.posicion[1])
+        a = self.alfa
+        return (int(previa[0] + (p.posicion[0] - previa[0]) * a),
+                int(previa[1] + (p.posicion[1] - previa[1]) * a))
+    
+    def _abrir_resumen(self):
+        # Con el rng de la simulación: una corrida con semilla se repite entera
+        self.estadisticas_dia_completo = simular_dia_rapido(self.sim.rng)
+        self.mostrar_resumen = True
+        self.resumen_dibujado = False
+    
+    def _texto(self, fuente, texto, color):
+        """font.render con caché: el mismo texto no se vuelve a rasterizar"""
+        return self.cache_textos.obtener((id(fuente), texto, color),
+                                         lambda: fuente.render(texto, True, color))
+    
+    def _sprite_paciente(self, id_paciente, color):
+        """Círculo con sombra, borde y número, renderizado una sola vez"""
+        def crear():
+            r = RADIO_PACIENTE
+            sprite = pygame.Surface((2 * r + 4, 2 * r + 4), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (180, 180, 180), (r+2, r+2), r)
+            pygame.draw.circle(sprite, color, (r, r), r)
+            pygame.draw.circle(sprite, config.COLOR_TEXTO, (r, r), r, 2)
+            t = self._texto(self.fuente_pequena, f"#{id_paciente}", (255, 255, 255))
+            sprite.blit(t, t.get_rect(center=(r, r)))
+            return sprite
+        return self.cache_sprites.obtener((id_paciente, color), crear)
+    
+    def _blit_panel(self, nombre, zona, clave, renderizar):
+        """Copia a pantalla un panel cacheado; lo re-renderiza si cambió `clave`.
+        Devuelve la zona si hay que actualizarla en pantalla, si no None."""
+        anterior = self.paneles.get(nombre)
+        if anterior is not None and anterior[0] == clave and not self.redibujar_todo:
+            return None
+        if anterior is None or anterior[0] != clave:
+            sup = pygame.Surface(zona.size).convert()
+            sup.blit(self.fondo, (0, 0), zona)
+            renderizar(sup)
+            self.paneles[nombre] = (clave, sup)
+        self.pantalla.blit(self.paneles[nombre][1], zona)
+        return zona
+    
+    def _crear_fondo(self):
+        """Pre-renderiza lo estático: fondo, barra del header y plano"""
+        fondo = pygame.Surface((config.VENTANA_ANCHO, config.VENTANA_ALTO)).convert()
+        fondo.fill(config.COLOR_FONDO)
+        pygame.draw.rect(fondo, (60, 90, 140), (0, 0, config.VENTANA_ANCHO, 50))
+        t = self._texto(self.fuente_titulo, "SIMULACIÓN RESONADOR V3.1 - GRILLA FLEXIBLE", (255, 255, 255))
+        fondo.blit(t, (10, 12))
+        self._dibujar_layout(fondo)
+        return fondo
+    
+    def _restaurar_fondo(self, rect):
+        self.pantalla.blit(self.fondo, rect, rect)
+    
     def _dibujar(self):
-        self.pantalla.fill(config.COLOR_FONDO)
-        self._dibujar_header()
-        self._dibujar_layout()
-        self._dibujar_pacientes()
-        self._dibujar_metricas()
-        self._dibujar_controles()
-        pygame.display.flip()
+        medir = PERFILADOR.activo
+        if medir:
+            t = reloj()
+        if self.redibujar_todo:
+            self.pantalla.blit(self.fondo, (0, 0))
+        else:
+            # Borrar pacientes del cuadro anterior
+            for r in self.rects_pacientes:
+                self._restaurar_fondo(r)
+        if medir:
+            t = PERFILADOR.registrar('dib.layout', t)
+        
+        rects_previos = self.rects_pacientes
+        zonas = [self._dibujar_header()]
+        if medir:
+            t = PERFILADOR.registrar('dib.header', t)
+        self.rects_pacientes = self._dibujar_pacientes()
+        if medir:
+            t = PERFILADOR.registrar('dib.pacientes', t)
+        zonas.append(self._dibujar_metricas())
+        if medir:
+            t = PERFILADOR.registrar('dib.metricas', t)
+        zona_controles = self._dibujar_controles()
+        if zona_controles is None and ZONA_CONTROLES.collidelist(rects_previos + self.rects_pacientes) >= 0:
+            # Un paciente pasó por encima de la barra inferior: reponerla
+            self.pantalla.blit(self.paneles['controles'][1], ZONA_CONTROLES)
+            zona_controles = ZONA_CONTROLES
+        zonas.append(zona_controles)
+        if medir:
+            t = PERFILADOR.registrar('dib.controles', t)
+        if self.mostrar_perfil:
+            zonas.append(self._dibujar_perfil())
+        
+        if self.redibujar_todo:
+            pygame.display.flip()
+            self.redibujar_todo = False
+        else:
+            pygame.display.update(rects_previos + self.rects_pacientes + [z for z in zonas if z])
+        if medir:
+            PERFILADOR.registrar('dib.flip', t)
     
     def _dibujar_header(self):
-        pygame.draw.rect(self.pantalla, (60, 90, 140), (0, 0, config.VENTANA_ANCHO, 50))
-        t = self.fuente_titulo.render("SIMULACIÓN RESONADOR V3.1 - GRILLA FLEXIBLE", True, (255, 255, 255))
-        self.pantalla.blit(t, (10, 12))
-        
-        horas = 8 + int(self.sim.tiempo_actual // 60)
-        minutos = int(self.sim.tiempo_actual % 60)
-        t_tiempo = self.fuente.render(f"{horas:02d}:{minutos:02d}", True, (255, 255, 255))
+        """Solo el reloj: la barra y el título están en el fondo"""
+        texto = min_a_hora(self.sim.tiempo_actual, self.sim.fecha_inicio.hour)
+        if texto == self.texto_reloj and not self.redibujar_todo:
+            return None
+        self.texto_reloj = texto
+        
+        self._restaurar_fondo(ZONA_RELOJ)
+        t_tiempo = self._texto(self.fuente, texto, (255, 255, 255))
         self.pantalla.blit(t_tiempo, (config.VENTANA_ANCHO - 100, 14))
+        return ZONA_RELOJ
     
-    def _dibujar_layout(self):
+    def _dibujar_layout(self, superficie):
         def dibujar_area(key, nombre, color):
             l = config.LAYOUT[key]
-            pygame.draw.rect(self.pantalla, (200, 200, 200), (l['x']+3, l['y']+3, l['ancho'], l['alto']), 0, 8)
-            pygame.draw.rect(self.pantalla, color, (l['x'], l['y'], l['ancho'], l['alto']), 0, 8)
-            pygame.draw.rect(self.pantalla, config.COLOR_BORDE, (l['x'], l['y'], l['ancho'], l['alto']), 2, 8)
-            t = self.fuente_pequena.render(nombre, True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (l['x']+10, l['y']+10))
+            pygame.draw.rect(superficie, (200, 200, 200), (l['x']+3, l['y']+3, l['ancho'], l['alto']), 0, 8)
+            pygame.draw.rect(superficie, color, (l['x'], l['y'], l['ancho'], l['alto']), 0, 8)
+            pygame.draw.rect(superficie, config.COLOR_BORDE, (l['x'], l['y'], l['ancho'], l['alto']), 2, 8)
+            t = self._texto(self.fuente_pequena, nombre, config.COLOR_TEXTO)
+            superficie.blit(t, (l['x']+10, l['y']+10))
         
         dibujar_area('sala_espera', 'SALA DE ESPERA', config.COLOR_SALA_ESPERA)
         dibujar_area('mesa_atencion', 'Mesa', config.COLOR_MESA)
         
         l = config.LAYOUT['pasillo_vertical']
-        pygame.draw.rect(self.pantalla, config.COLOR_PASILLO, (l['x'], l['y'], l['ancho'], l['alto']))
+        pygame.draw.rect(superficie, config.COLOR_PASILLO, (l['x'], l['y'], l['ancho'], l['alto']))
         l = config.LAYOUT['pasillo_horizontal']
-        pygame.draw.rect(self.pantalla, config.COLOR_PASILLO, (l['x'], l['y'], l['ancho'], l['alto']))
+        pygame.draw.rect(superficie, config.COLOR_PASILLO, (l['x'], l['y'], l['ancho'], l['alto']))
         
         dibujar_area('vestuario', 'VESTUARIO', config.COLOR_VESTUARIO)
         dibujar_area('box', 'Box', config.COLOR_BOX)
         dibujar_area('sala_resonancia', 'SALA DE RESONANCIA', config.COLOR_SALA_RESONANCIA)
         
         l = config.LAYOUT['resonador']
-        pygame.draw.rect(self.pantalla, (80, 80, 80), (l['x']+4, l['y']+4, l['ancho'], l['alto']), 0, 10)
-        pygame.draw.rect(self.pantalla, config.COLOR_RESONADOR, (l['x'], l['y'], l['ancho'], l['alto']), 0, 10)
-        pygame.draw.rect(self.pantalla, (70, 120, 200), (l['x'], l['y'], l['ancho'], l['alto']), 3, 10)
-        t = self.fuente_titulo.render("RESONADOR", True, (255, 255, 255))
+        pygame.draw.rect(superficie, (80, 80, 80), (l['x']+4, l['y']+4, l['ancho'], l['alto']), 0, 10)
+        pygame.draw.rect(superficie, config.COLOR_RESONADOR, (l['x'], l['y'], l['ancho'], l['alto']), 0, 10)
+        pygame.draw.rect(superficie, (70, 120, 200), (l['x'], l['y'], l['ancho'], l['alto']), 3, 10)
+        n = config.CAPACIDAD_RESONADORES
+        t = self._texto(self.fuente_titulo, "RESONADOR" if n == 1 else f"RESONADORES x{n}", (255, 255, 255))
         r = t.get_rect(center=(l['x']+l['ancho']//2, l['y']+l['alto']//2))
-        self.pantalla.blit(t, r)
+        superficie.blit(t, r)
     
     def _dibujar_pacientes(self):
+        """Todos los pacientes en un solo Surface.blits con sprites cacheados"""
+        activo = self.sim.obtener_paciente_activo()
+        r = RADIO_PACIENTE
+        lote = []
+        rects = []
+        self.sim.ubicar_pacientes()
         for p in self.sim.todos_los_pacientes():
-            x, y = int(p.posicion[0]), int(p.posicion[1])
-            pygame.draw.circle(self.pantalla, (180, 180, 180), (x+2, y+2), 16)
+            x, y = self._posicion_dibujo(p)
             
             # Color diferente para pacientes saliendo
             if p.estado == 'SALIENDO':
                 color = (100, 255, 100)  # Verde para saliendo
-            elif p == self.sim.obtener_paciente_activo():
+            elif p is activo:
                 color = config.COLOR_PACIENTE_ACTIVO
             else:
                 color = config.COLOR_PACIENTE
             
-            pygame.draw.circle(self.pantalla, color, (x, y), 16)
-            pygame.draw.circle(self.pantalla, config.COLOR_TEXTO, (x, y), 16, 2)
-            t = self.fuente_pequena.render(f"#{p.id}", True, (255, 255, 255))
-            r = t.get_rect(center=(x, y))
-            self.pantalla.blit(t, r)
+            rect = pygame.Rect(x - r, y - r, 2 * r + 4, 2 * r + 4)
+            lote.append((self._sprite_paciente(p.id, color), rect))
+            rects.append(rect)
+        self.pantalla.blits(lote, doreturn=False)
+        return rects
     
     def _dibujar_metricas(self):
-        px, py = 980, 70
-        pw, ph = 280, 600
+        """Vuelve a renderizar el panel solo si cambió lo que muestra"""
+        p_act = self.sim.obtener_paciente_activo()
+        clave = (p_act.id if p_act else None, p_act.estado if p_act else None,
+                 len(self.sim.pacientes_programados), len(self.sim.pacientes_en_espera),
+                 len(self.sim.pacientes_completados))
+        return self._blit_panel('metricas', ZONA_METRICAS, clave, self._renderizar_metricas)
+    
+    def _renderizar_metricas(self, sup):
+        px, py = 0, 0  # coordenadas locales a la superficie del panel
+        pw, ph = ZONA_METRICAS.width - 4, ZONA_METRICAS.height - 4
         
-        pygame.draw.rect(self.pantalla, (200, 200, 200), (px+4, py+4, pw, ph), 0, 10)
-        pygame.draw.rect(self.pantalla, config.COLOR_PANEL, (px, py, pw, ph), 0, 10)
-        pygame.draw.rect(self.pantalla, config.COLOR_BORDE, (px, py, pw, ph), 2, 10)
+        pygame.draw.rect(sup, (200, 200, 200), (px+4, py+4, pw, ph), 0, 10)
+        pygame.draw.rect(sup, config.COLOR_PANEL, (px, py, pw, ph), 0, 10)
+        pygame.draw.rect(sup, config.COLOR_BORDE, (px, py, pw, ph), 2, 10)
         
-        pygame.draw.rect(self.pantalla, (60, 90, 140), (px, py, pw, 40), 0, 10)
-        t = self.fuente_titulo.render("MÉTRICAS", True, (255, 255, 255))
-        self.pantalla.blit(t, (px+85, py+8))
+        pygame.draw.rect(sup, (60, 90, 140), (px, py, pw, 40), 0, 10)
+        t = self._texto(self.fuente_titulo, "MÉTRICAS", (255, 255, 255))
+        sup.blit(t, (px+85, py+8))
         
         y = py + 55
         
         p_act = self.sim.obtener_paciente_activo()
         if p_act:
-            t = self.fuente.render(f"Paciente #{p_act.id}", True, (60, 90, 140))
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente, f"Paciente #{p_act.id}", (60, 90, 140))
+            sup.blit(t, (px+15, y))
             y += 35
             
-            t = self.fuente_pequena.render(f"Turno: {p_act.turno_asignado:.0f} min", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Turno: {p_act.turno_asignado:.0f} min", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 22
             
-            t = self.fuente_pequena.render(f"Llegada: {p_act.desvio_llegada:.1f} min", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Llegada: {p_act.desvio_llegada:.1f} min", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 22
             
-            t = self.fuente_pequena.render(f"Validación: {p_act.tiempo_validacion:.1f} min", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Validación: {p_act.tiempo_validacion:.1f} min", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 22
             
-            t = self.fuente_pequena.render(f"Tiempo en box: {p_act.tiempo_box:.1f} min", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Tiempo en box: {p_act.tiempo_box:.1f} min", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 25
             
-            t = self.fuente_pequena.render("Tipo de estudio:", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, "Tipo de estudio:", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 20
-            t = self.fuente.render(p_act.tipo_estudio, True, (0, 100, 200))
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente, p_act.tipo_estudio, (0, 100, 200))
+            sup.blit(t, (px+15, y))
             y += 30
             
-            t = self.fuente_pequena.render(f"Tiempo estudio: {p_act.tiempo_scan:.1f} min", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Tiempo estudio: {p_act.tiempo_scan:.1f} min", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 22
             
-            t = self.fuente_pequena.render(f"Tiempo salida: {p_act.tiempo_salida:.1f} min", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Tiempo salida: {p_act.tiempo_salida:.1f} min", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 25
             
-            t = self.fuente_pequena.render(f"Tiempo en circuito:", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, f"Tiempo en circuito:", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 20
-            t = self.fuente.render(f"{p_act.calcular_tiempo_circuito():.1f} min", True, (0, 150, 0))
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente, f"{p_act.calcular_tiempo_circuito():.1f} min", (0, 150, 0))
+            sup.blit(t, (px+15, y))
             y += 30
             
-            t = self.fuente_pequena.render("Estado actual:", True, config.COLOR_TEXTO)
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, "Estado actual:", config.COLOR_TEXTO)
+            sup.blit(t, (px+15, y))
             y += 20
             estado_txt = config.ESTADOS_PACIENTE.get(p_act.estado, p_act.estado)
-            t = self.fuente_pequena.render(estado_txt, True, (200, 50, 50))
-            self.pantalla.blit(t, (px+15, y))
+            t = self._texto(self.fuente_pequena, estado_txt, (200, 50, 50))
+            sup.blit(t, (px+15, y))
             y += 35
         
-        pygame.draw.line(self.pantalla, (150, 150, 150), (px+10, y), (px+pw-10, y), 1)
+        pygame.draw.line(sup, (150, 150, 150), (px+10, y), (px+pw-10, y), 1)
         y += 15
         
-        t = self.fuente_pequena.render(f"Programados: {len(self.sim.pacientes_programados)}", True, (100, 100, 100))
-        self.pantalla.blit(t, (px+15, y))
+        t = self._texto(self.fuente_pequena, f"Programados: {len(self.sim.pacientes_programados)}", (100, 100, 100))
+        sup.blit(t, (px+15, y))
         y += 25
         
-        t = self.fuente_pequena.render(f"En espera: {len(self.sim.pacientes_en_espera)}", True, (0, 100, 200))
-        self.pantalla.blit(t, (px+15, y))
+        t = self._texto(self.fuente_pequena, f"En espera: {len(self.sim.pacientes_en_espera)}", (0, 100, 200))
+        sup.blit(t, (px+15, y))
         y += 25
         
-        t = self.fuente_pequena.render(f"Completados: {len(self.sim.pacientes_completados)}", True, (0, 150, 0))
-        self.pantalla.blit(t, (px+15, y))
+        t = self._texto(self.fuente_pequena, f"Completados: {len(self.sim.pacientes_completados)}", (0, 150, 0))
+        sup.blit(t, (px+15, y))
+    
+    def _alternar_perfil(self):
+        """F3: prende el perfilador y muestra el panel, o apaga los dos"""
+        self.mostrar_perfil = not self.mostrar_perfil
+        PERFILADOR.activo = self.mostrar_perfil
+        if self.mostrar_perfil:
+            PERFILADOR.limpiar()
+        self.redibujar_todo = True  # borra el panel al ocultarlo
+    
+    def _dibujar_perfil(self):
+        """Panel de p50/p99 por fase, encima de todo; se copia cada cuadro
+        porque los pacientes pasan por debajo"""
+        clave = pygame.time.get_ticks() // REFRESCO_PERFIL_MS
+        anterior = self.paneles.get('perfil')
+        if anterior is None or anterior[0] != clave:
+            sup = pygame.Surface(ZONA_PERFIL.size).convert()
+            self._renderizar_perfil(sup)
+            self.paneles['perfil'] = (clave, sup)
+        self.pantalla.blit(self.paneles['perfil'][1], ZONA_PERFIL)
+        return ZONA_PERFIL
+    
+    def _renderizar_perfil(self, sup):
+        sup.fill((25, 30, 45))
+        blanco, gris = (255, 255, 255), (170, 170, 190)
+        columnas = (120, 180, 240)
+        for x, titulo in zip(columnas, ("p50 ms", "p99 ms", "n")):
+            sup.blit(self._texto(self.fuente_pequena, titulo, gris), (x, 6))
+        sup.blit(self._texto(self.fuente_pequena, "PERFIL", blanco), (8, 6))
+        resumen = PERFILADOR.resumen()
+        y = 24
+        for fase in FASES:
+            sup.blit(self._texto(self.fuente_pequena, fase, gris), (8, y))
+            r = resumen.get(fase)
+            valores = (f"{r['p50_ms']:.3f}", f"{r['p99_ms']:.3f}", str(r['n'])) if r else ("-", "-", "-")
+            for x, valor in zip(columnas, valores):
+                # Los números cambian todo el tiempo: no pasan por la caché de textos
+                sup.blit(self.fuente_pequena.render(valor, True, blanco), (x, y))
+            y += 16
+        sup.blit(self._texto(self.fuente_pequena, "F3: ocultar | F4: volcar a archivo", gris), (8, y + 2))
     
     def _dibujar_controles(self):
-        y = config.VENTANA_ALTO - 50
-        pygame.draw.rect(self.pantalla, (250, 250, 250), (0, y-5, config.VENTANA_ANCHO, 60))
+        x_linea = int(LINEA_TIEMPO.width * min(1.0, self.sim.tiempo_actual / self.minutos_linea))
+        clave = (self.sim.pausada, self.sim.finalizada, round(self.velocidad * 60), x_linea)
+        return self._blit_panel('controles', ZONA_CONTROLES, clave, self._renderizar_controles)
+    
+    def _renderizar_controles(self, sup):
+        y = 5  # coordenadas locales a la barra
+        pygame.draw.rect(sup, (250, 250, 250), (0, y-5, config.VENTANA_ANCHO, 60))
         
         if self.sim.pausada:
-            t = self.fuente.render("⏸ PAUSADO", True, (255, 0, 0))
+            t = self._texto(self.fuente, "⏸ PAUSADO", (255, 0, 0))
         elif self.sim.finalizada:
-            t = self.fuente.render("✓ FINALIZADO", True, (0, 150, 0))
+            t = self._texto(self.fuente, "✓ FINALIZADO", (0, 150, 0))
         else:
-            t = self.fuente.render("▶ EJECUTANDO", True, (0, 200, 0))
-        self.pantalla.blit(t, (15, y))
-        
-        vel_texto = "Velocidad: Normal" if not self.modo_rapido else "Velocidad: 2x 🚀"
-        t = self.fuente_pequena.render(vel_texto, True, config.COLOR_TEXTO)
-        self.pantalla.blit(t, (15, y+25))
-        
-        controles = "ESPACIO: Pausa | V: Velocidad | S: Resumen día completo | R: Reiniciar | ESC: Salir"
-        t = self.fuente_pequena.render(controles, True, config.COLOR_TEXTO)
-        self.pantalla.blit(t, (200, y+25))
+            t = self._texto(self.fuente, "▶ EJECUTANDO", (0, 200, 0))
+        sup.blit(t, (15, y))
+        
+        vel_x = round(self.velocidad * 60)
+        if self.velocidad == self.velocidad_normal:
+            vel_texto = f"Velocidad: Normal ({vel_x}x)"
+        elif self.modo_rapido:
+            vel_texto = f"Velocidad: 2x 🚀 ({vel_x}x)"
+        else:
+            vel_texto = f"Velocidad: {vel_x}x"
+        t = self._texto(self.fuente_pequena, vel_texto, config.COLOR_TEXTO)
+        sup.blit(t, (15, y+25))
+        
+        controles = ("ESPACIO: Pausa | V: x2 | +/-: Velocidad | ←/→: ±15 min | Clic: ir a hora | "
+                     "S: Resumen | R: Reiniciar | ESC: Salir")
+        t = self._texto(self.fuente_pequena, controles, config.COLOR_TEXTO)
+        sup.blit(t, (200, y+25))
+        
+        # Línea de tiempo: avance del día y marcas por hora
+        l = LINEA_TIEMPO
+        pygame.draw.rect(sup, (220, 220, 220), l, 0, 4)
+        avance = min(1.0, self.sim.tiempo_actual / self.minutos_linea)
+        pygame.draw.rect(sup, (60, 90, 140), (l.x, l.y, int(l.width * avance), l.height), 0, 4)
+        for hora in range(int(self.minutos_linea // 60) + 1):
+            x = l.x + int(l.width * hora * 60 / self.minutos_linea)
+            pygame.draw.line(sup, config.COLOR_BORDE, (x, l.bottom), (x, l.bottom + 3))
+        pygame.draw.rect(sup, config.COLOR_BORDE, l, 1, 4)
     
     def _dibujar_resumen(self):
+        """El resumen es estático: se dibuja una vez por cada día simulado"""
+        if self.resumen_dibujado:
+            return
+        self.resumen_dibujado = True
+        
         overlay = pygame.Surface((config.VENTANA_ANCHO, config.VENTANA_ALTO))
         overlay.set_alpha(250)
         overlay.fill((245, 245, 250))
@@ -252,60 +558,60 @@ class Visualizador:
         pygame.draw.rect(self.pantalla, (255, 255, 255), (px, py, pw, ph), 0, 15)
         pygame.draw.rect(self.pantalla, (60, 90, 140), (px, py, pw, 60), 0, 15)
         
-        t = self.fuente_titulo.render("RESUMEN DEL DÍA COMPLETO - GRILLA FLEXIBLE", True, (255, 255, 255))
+        t = self._texto(self.fuente_titulo, "RESUMEN DEL DÍA COMPLETO - GRILLA FLEXIBLE", (255, 255, 255))
         r = t.get_rect(center=(px+pw//2, py+30))
         self.pantalla.blit(t, r)
         
         y = py + 90
         
-        # Usar pacientes simulados del día completo
-        stats = self.sim.obtener_estadisticas_dia(self.pacientes_dia_completo)
+        # Usar el día completo muestreado
+        stats = self.estadisticas_dia_completo
         
-        t = self.fuente.render(f"Total de pacientes: {stats['total_pacientes']}", True, config.COLOR_TEXTO)
+        t = self._texto(self.fuente, f"Total de pacientes: {stats['total_pacientes']}", config.COLOR_TEXTO)
         self.pantalla.blit(t, (px+50, y))
         y += 40
         
-        t = self.fuente_pequena.render("Jornada laboral: 08:00 - 20:00 (720 min)", True, (100, 100, 100))
+        t = self._texto(self.fuente_pequena, "Jornada laboral: 08:00 - 20:00 (720 min)", (100, 100, 100))
         self.pantalla.blit(t, (px+50, y))
         y += 35
         
-        t = self.fuente.render(f"Último turno dado: {stats['ultimo_turno_hora']} ({stats['ultimo_turno_min']:.0f} min)", 
-                              True, (200, 100, 0))
+        t = self._texto(self.fuente, f"Último turno dado: {stats['ultimo_turno_hora']} ({stats['ultimo_turno_min']:.0f} min)", 
+                              (200, 100, 0))
         self.pantalla.blit(t, (px+50, y))
         y += 30
         
-        t = self.fuente.render(f"Finalización: {stats['hora_finalizacion_hora']} ({stats['hora_finalizacion_min']:.0f} min)", 
-                              True, (200, 0, 0))
+        t = self._texto(self.fuente, f"Finalización: {stats['hora_finalizacion_hora']} ({stats['hora_finalizacion_min']:.0f} min)", 
+                              (200, 0, 0))
         self.pantalla.blit(t, (px+50, y))
         y += 40
         
         if stats['hora_finalizacion_min'] > 720:
             minutos_extra = stats['hora_finalizacion_min'] - 720
-            t = self.fuente.render(f"⚠️ HORAS EXTRAS: {minutos_extra:.0f} minutos", True, (255, 0, 0))
+            t = self._texto(self.fuente, f"⚠️ HORAS EXTRAS: {minutos_extra:.0f} minutos", (255, 0, 0))
             self.pantalla.blit(t, (px+70, y))
             y += 40
         else:
-            t = self.fuente_pequena.render("✓ Sin horas extras", True, (0, 150, 0))
+            t = self._texto(self.fuente_pequena, "✓ Sin horas extras", (0, 150, 0))
             self.pantalla.blit(t, (px+70, y))
             y += 35
         
-        t = self.fuente.render("Estudios realizados:", True, (60, 90, 140))
+        t = self._texto(self.fuente, "Estudios realizados:", (60, 90, 140))
         self.pantalla.blit(t, (px+50, y))
         y += 35
         
         for tipo, cant in stats['estudios_por_tipo'].items():
-            t = self.fuente_pequena.render(f"  • {tipo}: {cant}", True, config.COLOR_TEXTO)
+            t = self._texto(self.fuente_pequena, f"  • {tipo}: {cant}", config.COLOR_TEXTO)
             self.pantalla.blit(t, (px+70, y))
             y += 28
         
         y += 20
         
-        t = self.fuente.render(f"Tiempo promedio por paciente: {stats['tiempo_promedio_total']:.1f} min", 
-                              True, config.COLOR_TEXTO)
+        t = self._texto(self.fuente, f"Tiempo promedio por paciente: {stats['tiempo_promedio_total']:.1f} min", 
+                              config.COLOR_TEXTO)
         self.pantalla.blit(t, (px+50, y))
         
         y = py + ph - 50
-        t = self.fuente_pequena.render("Presiona ENTER para continuar o R para reiniciar", True, (100, 100, 100))
+        t = self._texto(self.fuente_pequena, "Presiona ENTER para continuar o R para reiniciar", (100, 100, 100))
         r = t.get_rect(center=(px+pw//2, y))
         self.pantalla.blit(t, r)
         